@@ -0,0 +1,34 @@
+"""add partial index for expiry sweeper
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # New audit event types (DRAFT_SAVED was never added to the enum type)
+    op.execute("ALTER TYPE eventtype ADD VALUE IF NOT EXISTS 'DRAFT_SAVED'")
+    op.execute("ALTER TYPE eventtype ADD VALUE IF NOT EXISTS 'EXPIRED'")
+
+    # Partial index: the sweeper only looks at open requests ordered by deadline
+    op.create_index(
+        'ix_macro_periods_deadline_aguardando',
+        'macro_periods',
+        ['deadline'],
+        postgresql_where=sa.text("status = 'AGUARDANDO'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_macro_periods_deadline_aguardando', table_name='macro_periods')
+    # Enum values cannot be removed from a Postgres type; they are left in place
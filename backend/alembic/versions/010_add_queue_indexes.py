@@ -0,0 +1,38 @@
+"""add indexes for the follow-up queue
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Open requests with every column the urgency score needs
+    op.create_index(
+        'ix_macro_periods_open_queue',
+        'macro_periods',
+        ['priority', 'deadline', 'created_at', 'doctor_id'],
+        postgresql_where=sa.text("status = 'AGUARDANDO'")
+    )
+
+    # Doctor response history
+    op.create_index(
+        'ix_macro_periods_doctor_history',
+        'macro_periods',
+        ['doctor_id'],
+        postgresql_include=['status', 'created_at', 'responded_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_macro_periods_doctor_history', table_name='macro_periods')
+    op.drop_index('ix_macro_periods_open_queue', table_name='macro_periods')
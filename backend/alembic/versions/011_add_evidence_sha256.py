@@ -0,0 +1,26 @@
+"""add content hash to admin edit evidences
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows keep their random file names and a NULL hash
+    op.add_column('admin_edit_evidences', sa.Column('sha256', sa.String(64), nullable=True))
+    op.create_index('ix_admin_edit_evidences_sha256', 'admin_edit_evidences', ['sha256'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_admin_edit_evidences_sha256', table_name='admin_edit_evidences')
+    op.drop_column('admin_edit_evidences', 'sha256')
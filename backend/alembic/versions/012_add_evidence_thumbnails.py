@@ -0,0 +1,27 @@
+"""add thumbnails to admin edit evidences
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('admin_edit_evidences', sa.Column('thumbnail_path', sa.String(500), nullable=True))
+    op.add_column('admin_edit_evidences', sa.Column('thumbnail_width', sa.Integer(), nullable=True))
+    op.add_column('admin_edit_evidences', sa.Column('thumbnail_height', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('admin_edit_evidences', 'thumbnail_height')
+    op.drop_column('admin_edit_evidences', 'thumbnail_width')
+    op.drop_column('admin_edit_evidences', 'thumbnail_path')
@@ -0,0 +1,40 @@
+"""add admin users
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The first account is created from ADMIN_EMAIL/ADMIN_PASSWORD on startup
+    op.create_table(
+        'admin_users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(255), nullable=False),
+        sa.Column('password_hash', sa.String(255), nullable=False),
+        sa.Column('role', sa.String(50), nullable=False, server_default='admin'),
+        sa.Column('active', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('login_attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('login_window_started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_login_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_admin_users_id', 'admin_users', ['id'])
+    op.create_index('ix_admin_users_email', 'admin_users', ['email'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_admin_users_email', table_name='admin_users')
+    op.drop_index('ix_admin_users_id', table_name='admin_users')
+    op.drop_table('admin_users')
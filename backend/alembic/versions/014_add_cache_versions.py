@@ -0,0 +1,61 @@
+"""add cache version counters for conditional GETs
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+# table -> cache versions its writes invalidate (list views show doctor and unit names)
+TRIGGERS = {
+    'macro_periods': ['macro_periods'],
+    'macro_period_units': ['macro_periods'],
+    'macro_period_selections': ['macro_periods'],
+    'audit_events': ['macro_periods'],
+    'admin_edit_evidences': ['macro_periods'],
+    'doctors': ['doctors', 'macro_periods'],
+    'units': ['units', 'macro_periods'],
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        'cache_versions',
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO cache_versions (name, version) VALUES ('macro_periods', 0), ('doctors', 0), ('units', 0)")
+
+    # Statement-level: one bump per INSERT/UPDATE/DELETE statement, however many rows.
+    # The UPDATE is transactional, so readers never see a version before its data.
+    op.execute("""
+        CREATE FUNCTION bump_cache_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE cache_versions SET version = version + 1 WHERE name = ANY(TG_ARGV);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table, names in TRIGGERS.items():
+        args = ", ".join(f"'{name}'" for name in names)
+        op.execute(f"""
+            CREATE TRIGGER {table}_bump_cache_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_cache_version({args})
+        """)
+
+
+def downgrade() -> None:
+    for table in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_bump_cache_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_cache_version()")
+    op.drop_table('cache_versions')
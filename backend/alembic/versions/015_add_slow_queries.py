@@ -0,0 +1,44 @@
+"""add slow query log
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Rolling log: the app prunes it to SLOW_QUERY_LOG_MAX_ROWS
+    op.create_table(
+        'slow_queries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('captured_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('duration_ms', sa.Float(), nullable=False),
+        sa.Column('engine', sa.String(20), nullable=False),
+        sa.Column('route', sa.String(255), nullable=True),
+        sa.Column('statement', sa.Text(), nullable=False),
+        sa.Column('statement_hash', sa.String(32), nullable=False),
+        sa.Column('parameters', sa.JSON(), nullable=True),
+        sa.Column('plan', sa.JSON(), nullable=True),
+        sa.Column('explain_error', sa.Text(), nullable=True),
+        sa.Column('worker', sa.String(255), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_slow_queries_id', 'slow_queries', ['id'])
+    op.create_index('ix_slow_queries_route', 'slow_queries', ['route'])
+    op.create_index('ix_slow_queries_statement_hash', 'slow_queries', ['statement_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_slow_queries_statement_hash', table_name='slow_queries')
+    op.drop_index('ix_slow_queries_route', table_name='slow_queries')
+    op.drop_index('ix_slow_queries_id', table_name='slow_queries')
+    op.drop_table('slow_queries')
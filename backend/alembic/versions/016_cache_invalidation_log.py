@@ -0,0 +1,57 @@
+"""replace cache version row bumps with an insert-only log
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The triggers of 014 UPDATEd one cache_versions row per resource, so every write
+    # (doctor submissions and LINK_VIEWED audit events included) held that row lock until
+    # commit and concurrent writers ran one at a time. They now INSERT into a log instead:
+    # inserts never wait on each other. A resource's version is its cache_versions counter
+    # plus its committed log rows, and a scheduler job folds the log into the counters.
+    op.create_table(
+        'cache_invalidations',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_cache_invalidations_name', 'cache_invalidations', ['name'])
+    # Same function name and arguments, so the triggers of 014 stay as they are
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_cache_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO cache_invalidations (name) SELECT unnest(TG_ARGV);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_cache_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE cache_versions SET version = version + 1 WHERE name = ANY(TG_ARGV);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        UPDATE cache_versions v SET version = v.version + pending.n
+        FROM (SELECT name, count(*) AS n FROM cache_invalidations GROUP BY name) pending
+        WHERE v.name = pending.name
+    """)
+    op.drop_index('ix_cache_invalidations_name', table_name='cache_invalidations')
+    op.drop_table('cache_invalidations')
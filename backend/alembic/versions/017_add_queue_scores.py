@@ -0,0 +1,50 @@
+"""persist follow-up queue urgency scores
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '017'
+down_revision = '016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The queue pages on (urgency_score, id); a computed score meant scoring and sorting
+    # every open period on every page. Scores are stored here and kept fresh by the
+    # refresh_queue_scores job, so a page is a backward range scan of the index below.
+    op.create_table(
+        'macro_period_queue_scores',
+        sa.Column('macro_period_id', sa.Integer(), nullable=False),
+        sa.Column('urgency_score', sa.Integer(), nullable=False),
+        sa.Column('scored_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['macro_period_id'], ['macro_periods.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('macro_period_id')
+    )
+    op.create_index(
+        'ix_macro_period_queue_scores_rank',
+        'macro_period_queue_scores',
+        ['urgency_score', 'macro_period_id']
+    )
+
+    # Score refreshes change the queue without touching macro_periods
+    op.execute("INSERT INTO cache_versions (name, version) VALUES ('queue_scores', 0)")
+    op.execute("""
+        CREATE TRIGGER macro_period_queue_scores_bump_cache_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON macro_period_queue_scores
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_cache_version('queue_scores')
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS macro_period_queue_scores_bump_cache_version ON macro_period_queue_scores")
+    op.execute("DELETE FROM cache_invalidations WHERE name = 'queue_scores'")
+    op.execute("DELETE FROM cache_versions WHERE name = 'queue_scores'")
+    op.drop_index('ix_macro_period_queue_scores_rank', table_name='macro_period_queue_scores')
+    op.drop_table('macro_period_queue_scores')
@@ -0,0 +1,74 @@
+"""Manage admin accounts from the command line.
+
+    python -m app.admin_users add EMAIL [--role ROLE]    (prompts for the password)
+    python -m app.admin_users set-password EMAIL
+    python -m app.admin_users deactivate EMAIL
+    python -m app.admin_users list
+
+Running workers pick up role/deactivation changes once their role cache
+entry expires (ADMIN_ROLE_CACHE_TTL_SECONDS).
+"""
+import argparse
+import getpass
+import sys
+from datetime import datetime, timezone
+from sqlalchemy import select, update
+from .auth import get_password_hash
+from .database import SessionLocal
+from .models import AdminUser
+
+
+def _prompt_password() -> str:
+    password = getpass.getpass("Password: ")
+    if len(password) < 8:
+        sys.exit("Password must have at least 8 characters")
+    if password != getpass.getpass("Repeat password: "):
+        sys.exit("Passwords do not match")
+    return password
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.admin_users")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add")
+    add.add_argument("email")
+    add.add_argument("--role", default="admin")
+    commands.add_parser("set-password").add_argument("email")
+    commands.add_parser("deactivate").add_argument("email")
+    commands.add_parser("list")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "list":
+            for user in db.execute(select(AdminUser).order_by(AdminUser.email)).scalars():
+                print(f"{user.email}\t{user.role}\t{'active' if user.active else 'inactive'}\t{user.last_login_at or '-'}")
+            return
+
+        email = args.email.strip().lower()
+        if args.command == "add":
+            if db.execute(select(AdminUser.id).where(AdminUser.email == email)).first():
+                sys.exit(f"{email} already exists")
+            db.add(AdminUser(
+                email=email,
+                password_hash=get_password_hash(_prompt_password()),
+                role=args.role,
+                active=True,
+                created_at=datetime.now(timezone.utc)
+            ))
+        else:
+            values = {"active": False} if args.command == "deactivate" else {
+                "password_hash": get_password_hash(_prompt_password()),
+                "login_attempts": 0,
+                "login_window_started_at": None
+            }
+            if db.execute(update(AdminUser).where(AdminUser.email == email).values(**values)).rowcount == 0:
+                sys.exit(f"{email} not found")
+        db.commit()
+        print(f"{args.command}: {email}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..auth import get_current_user
+from ..http_cache import conditional_get
 from ..models.doctor import Doctor
 from ..schemas.doctor import Doctor as DoctorSchema, DoctorCreate, DoctorUpdate
 
@@ -14,8 +15,9 @@ def list_doctors(
     skip: int = 0,
     limit: int = 100,
     active_only: bool = True,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user),
+    not_modified: None = Depends(conditional_get("doctors"))
 ):
     query = db.query(Doctor)
     if active_only:
@@ -45,7 +47,7 @@ def create_doctor(
 @router.get("/{doctor_id}", response_model=DoctorSchema)
 def get_doctor(
     doctor_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
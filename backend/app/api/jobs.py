@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import desc
+from typing import List, Optional
+from ..database import get_db
+from ..auth import get_current_user
+from ..models.job_run import JobRun
+from ..schemas.job_run import JobRun as JobRunSchema, JobInfo
+from ..jobs import scheduler
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("", response_model=List[JobInfo])
+def list_jobs(
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Registered periodic jobs with their last recorded run"""
+    jobs = []
+    for job in scheduler.jobs.values():
+        last_run = db.query(JobRun).filter(
+            JobRun.job_name == job.name
+        ).order_by(desc(JobRun.started_at)).first()
+        jobs.append(JobInfo(
+            name=job.name,
+            interval_seconds=job.interval_seconds,
+            last_run=last_run
+        ))
+    return jobs
+
+
+@router.get("/runs", response_model=List[JobRunSchema])
+def list_job_runs(
+    job_name: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    query = db.query(JobRun)
+    if job_name:
+        if job_name not in scheduler.jobs:
+            raise HTTPException(status_code=404, detail="Job not found")
+        query = query.filter(JobRun.job_name == job_name)
+    return query.order_by(desc(JobRun.started_at)).offset(skip).limit(limit).all()
@@ -1,30 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, File, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, File, UploadFile, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_, func, case
-from typing import List, Optional, Dict, Any
+from sqlalchemy import desc, or_, func, cast, tuple_, Integer
+from typing import Iterable, List, Optional, Dict, Any
 from datetime import datetime, date, timedelta, timezone
 from io import StringIO
+from collections import defaultdict
+import base64
 import csv
 import secrets
 import os
 from pathlib import Path
-from ..database import get_db
+from ..config import get_settings
+from ..database import get_db, get_read_db
 from ..auth import get_current_user
-from ..models import MacroPeriod, Unit, Doctor, AuditEvent, MacroPeriodSelection, AdminEditEvidence
+from ..models import MacroPeriod, Unit, Doctor, AuditEvent, MacroPeriodSelection, AdminEditEvidence, MacroPeriodQueueScore
 from ..models.macro_period import MacroPeriodStatus
 from ..models.audit import EventType
 from ..schemas.macro_period import (
     MacroPeriodCreate, MacroPeriodResponse, MacroPeriodDetail,
-    MacroPeriodListItem
+    MacroPeriodListItem, MacroPeriodQueueItem, MacroPeriodQueuePage
 )
 from ..schemas.admin_edit_evidence import (
     AdminEditEvidenceCreate, AdminEditEvidenceResponse,
     EnableAdminEditRequest, EnableAdminEditResponse
 )
 from ..utils import generate_public_token
+from ..responses import FastJSONResponse
+from ..tracing import span
+from ..serializers import (
+    units_query, selections_query, audit_events_query,
+    unit_dict, selection_dict, audit_event_dict
+)
+from ..evidence_storage import store_upload, iter_zip_bundle, UploadTooLarge
+from ..thumbnails import generate_evidence_thumbnail
+from ..http_cache import conditional_get
+from .. import follow_up_queue
+from ..file_responses import RangeFileResponse, RangeNotSatisfiable, parse_range_header, etag_matches
 
 router = APIRouter(prefix="/macro-periods", tags=["macro-periods"])
-
+settings = get_settings()
 
 def calculate_dias_em_aberto(macro_period: MacroPeriod) -> Optional[int]:
     """Calculate total hours open if status is AGUARDANDO"""
@@ -41,6 +57,55 @@ def calculate_tempo_ate_resposta(macro_period: MacroPeriod) -> Optional[int]:
     return None
 
 
+def weekly_trend(dates: Iterable[date], max_weeks: int = 12) -> List[Dict[str, Any]]:
+    """Distinct selected days per week (Monday to Sunday), first `max_weeks` weeks in date order"""
+    weeks = defaultdict(set)
+    for day in dates:
+        weeks[day - timedelta(days=day.weekday())].add(day)
+    return [
+        {
+            "periodo": f"{week_start.strftime('%d/%m')} - {(week_start + timedelta(days=6)).strftime('%d/%m')}",
+            "total": len(days)
+        }
+        for week_start, days in sorted(weeks.items(), key=lambda item: item[0])[:max_weeks]
+    ]
+
+
+def selection_csv_fields(selection) -> List[str]:
+    """Date, part of day and custom start/end of a selection, as exported"""
+    return [
+        str(selection.date),
+        selection.part_of_day.value,
+        str(selection.custom_start) if selection.custom_start else "-",
+        str(selection.custom_end) if selection.custom_end else "-",
+    ]
+
+
+def export_csv_rows(selections, unit_names: Dict[int, str]) -> List[List[str]]:
+    """export.csv rows: Data, Unidade, Período, Início, Fim"""
+    rows = []
+    for selection in selections:
+        day, part, start, end = selection_csv_fields(selection)
+        rows.append([day, unit_names.get(selection.macro_period_unit_id, "-"), part, start, end])
+    return rows
+
+
+def batch_export_csv_rows(macro_period, doctor_name: str, selections, unit_names: Dict[int, str]) -> List[list]:
+    """export-batch.csv rows for one period: one per selection, or a single row of placeholders"""
+    def row(unit_name, selection_fields):
+        return [
+            macro_period.id, unit_name, doctor_name, str(macro_period.start_date), str(macro_period.end_date),
+            macro_period.status.value, macro_period.priority.value, *selection_fields
+        ]
+
+    if not selections:
+        return [row(", ".join(unit_names.values()) or "-", ["-"] * 4)]
+    return [
+        row(unit_names.get(selection.macro_period_unit_id, "-"), selection_csv_fields(selection))
+        for selection in selections
+    ]
+
+
 @router.post("", response_model=MacroPeriodResponse)
 def create_macro_period(
     macro_period: MacroPeriodCreate,
@@ -102,6 +167,8 @@ def create_macro_period(
         }
     )
     db.add(audit_event)
+    db.flush()
+    follow_up_queue.score_periods(db, [db_macro_period.id])
     db.commit()
     db.refresh(db_macro_period)
 
@@ -173,6 +240,8 @@ def update_macro_period(
         }
     )
     db.add(audit_event)
+    db.flush()
+    follow_up_queue.score_periods(db, [macro_period_id])
     db.commit()
     db.refresh(db_macro_period)
 
@@ -189,17 +258,30 @@ def list_macro_periods(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     sort_by_dias_aberto: bool = False,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user),
+    not_modified: None = Depends(conditional_get("macro_periods", time_bucket=True))
 ):
     from ..models.macro_period_unit import MacroPeriodUnit
 
-    query = db.query(MacroPeriod, Doctor.name.label("doctor_name")).join(Doctor)
+    # Plain columns instead of ORM objects: rows go straight into response dicts
+    query = db.query(
+        MacroPeriod.id,
+        Doctor.name.label("doctor_name"),
+        MacroPeriod.start_date,
+        MacroPeriod.end_date,
+        MacroPeriod.status,
+        MacroPeriod.priority,
+        MacroPeriod.deadline,
+        MacroPeriod.public_token,
+        MacroPeriod.created_at,
+        MacroPeriod.responded_at
+    ).join(Doctor, MacroPeriod.doctor_id == Doctor.id)
 
     # Filters
     if unit_id:
         # Filter by macro periods that have this specific unit
-        query = query.join(MacroPeriodUnit).filter(MacroPeriodUnit.unit_id == unit_id)
+        query = query.join(MacroPeriodUnit, MacroPeriodUnit.macro_period_id == MacroPeriod.id).filter(MacroPeriodUnit.unit_id == unit_id)
     if doctor_id:
         query = query.filter(MacroPeriod.doctor_id == doctor_id)
     if status:
@@ -216,84 +298,149 @@ def list_macro_periods(
     else:
         query = query.order_by(desc(MacroPeriod.created_at))
 
-    results = query.offset(skip).limit(limit).all()
-
-    # Format response
-    items = []
-    for macro_period, doctor_name in results:
-        # Get units for this macro period
-        units_data = []
-        for mp_unit in macro_period.units:
-            units_data.append({
-                "unit_name": mp_unit.unit.name,
-                "unit_city": mp_unit.unit.city,
-                "total_days": mp_unit.total_days
+    rows = query.offset(skip).limit(limit).all()
+
+    # Units of the whole page in one query
+    units_by_period: Dict[int, List[dict]] = {row.id: [] for row in rows}
+    if rows:
+        unit_rows = db.query(
+            MacroPeriodUnit.macro_period_id, Unit.name, Unit.city, MacroPeriodUnit.total_days
+        ).join(Unit, MacroPeriodUnit.unit_id == Unit.id).filter(
+            MacroPeriodUnit.macro_period_id.in_(units_by_period.keys())
+        ).order_by(MacroPeriodUnit.macro_period_id, MacroPeriodUnit.id).all()
+        for macro_period_id, unit_name, unit_city, total_days in unit_rows:
+            units_by_period[macro_period_id].append({
+                "unit_name": unit_name,
+                "unit_city": unit_city,
+                "total_days": total_days
             })
 
-        items.append(MacroPeriodListItem(
-            id=macro_period.id,
-            doctor_name=doctor_name,
-            units=units_data,
-            start_date=macro_period.start_date,
-            end_date=macro_period.end_date,
-            status=macro_period.status,
-            priority=macro_period.priority,
-            deadline=macro_period.deadline,
-            public_token=macro_period.public_token,
-            dias_em_aberto=calculate_dias_em_aberto(macro_period),
-            tempo_ate_resposta=calculate_tempo_ate_resposta(macro_period),
-            created_at=macro_period.created_at,
-            responded_at=macro_period.responded_at
-        ))
-
-    return items
+    return FastJSONResponse([list_item_dict(row, units_by_period[row.id]) for row in rows])
+
+
+def list_item_dict(row, units: List[dict]) -> dict:
+    """MacroPeriodListItem as a plain dict, from a list query row"""
+    return {
+        "id": row.id,
+        "doctor_name": row.doctor_name,
+        "units": units,
+        "start_date": row.start_date,
+        "end_date": row.end_date,
+        "status": row.status,
+        "priority": row.priority,
+        "deadline": row.deadline,
+        "public_token": row.public_token,
+        "dias_em_aberto": calculate_dias_em_aberto(row),
+        "tempo_ate_resposta": calculate_tempo_ate_resposta(row),
+        "created_at": row.created_at,
+        "responded_at": row.responded_at
+    }
+
+
+@router.get("/queue", response_model=MacroPeriodQueuePage)
+def get_follow_up_queue(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user),
+    not_modified: None = Depends(conditional_get("macro_periods", "queue_scores", time_bucket=True))
+):
+    """
+    Open (AGUARDANDO) periods ranked by urgency, most urgent first.
+
+    Scores come from macro_period_queue_scores (see app.follow_up_queue):
+    periods are scored when created or edited and rescored by the
+    refresh_queue_scores job, so a score can be up to one refresh interval
+    old. Pages are keyset-paginated on (urgency_score, id) through the index
+    on that pair, so every page costs the same at any backlog size. A refresh
+    between two pages can move a period across the cursor (skipped or shown
+    twice), like any keyset over live data.
+    """
+    if cursor:
+        try:
+            cursor_score, cursor_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            cursor_score, cursor_id = int(cursor_score), int(cursor_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    as_of = datetime.now(timezone.utc)
+
+    query = db.query(
+        MacroPeriod.id.label("id"),
+        MacroPeriod.doctor_id.label("doctor_id"),
+        Doctor.name.label("doctor_name"),
+        MacroPeriod.start_date.label("start_date"),
+        MacroPeriod.end_date.label("end_date"),
+        MacroPeriod.priority.label("priority"),
+        MacroPeriod.deadline.label("deadline"),
+        MacroPeriod.public_token.label("public_token"),
+        MacroPeriod.created_at.label("created_at"),
+        cast(follow_up_queue.hours_open(as_of), Integer).label("horas_em_aberto"),
+        follow_up_queue.days_to_deadline(as_of).label("dias_ate_prazo"),
+        MacroPeriodQueueScore.urgency_score.label("urgency_score")
+    ).join(
+        MacroPeriod, MacroPeriod.id == MacroPeriodQueueScore.macro_period_id
+    ).join(Doctor, Doctor.id == MacroPeriod.doctor_id).filter(
+        # Scores of closed periods linger until the next refresh
+        MacroPeriod.status == MacroPeriodStatus.AGUARDANDO
+    )
+    if cursor:
+        query = query.filter(
+            tuple_(MacroPeriodQueueScore.urgency_score, MacroPeriodQueueScore.macro_period_id)
+            < tuple_(cursor_score, cursor_id)
+        )
+    rows = query.order_by(
+        desc(MacroPeriodQueueScore.urgency_score), desc(MacroPeriodQueueScore.macro_period_id)
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = base64.urlsafe_b64encode(f"{last.urgency_score}|{last.id}".encode()).decode()
+
+    # Response rates of this page's doctors only
+    history = follow_up_queue.doctor_history({row.doctor_id for row in rows}).subquery()
+    response_rates = dict(db.query(history.c.doctor_id, history.c.response_rate).all()) if rows else {}
+
+    return MacroPeriodQueuePage(
+        items=[
+            MacroPeriodQueueItem(**row._asdict(), taxa_resposta_medico=response_rates.get(row.doctor_id))
+            for row in rows
+        ],
+        next_cursor=next_cursor,
+        as_of=as_of
+    )
 
 
 @router.get("/{macro_period_id}", response_model=MacroPeriodDetail)
 def get_macro_period(
     macro_period_id: int,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user),
+    not_modified: None = Depends(conditional_get("macro_periods"))
 ):
-    from ..schemas.macro_period_unit import MacroPeriodUnitResponse
-
-    macro_period = db.query(MacroPeriod).filter(MacroPeriod.id == macro_period_id).first()
+    macro_period = db.query(
+        MacroPeriod.id,
+        MacroPeriod.doctor_id,
+        MacroPeriod.start_date,
+        MacroPeriod.end_date,
+        MacroPeriod.priority,
+        MacroPeriod.deadline,
+        MacroPeriod.status,
+        MacroPeriod.public_token,
+        MacroPeriod.created_at,
+        MacroPeriod.created_by,
+        MacroPeriod.responded_at
+    ).filter(MacroPeriod.id == macro_period_id).first()
     if not macro_period:
         raise HTTPException(status_code=404, detail="Macro period not found")
 
-    # Build units response
-    units_response = []
-    for mp_unit in macro_period.units:
-        units_response.append(MacroPeriodUnitResponse(
-            id=mp_unit.id,
-            macro_period_id=mp_unit.macro_period_id,
-            unit_id=mp_unit.unit_id,
-            unit_name=mp_unit.unit.name,
-            unit_city=mp_unit.unit.city,
-            total_days=mp_unit.total_days,
-            order_position=mp_unit.order_position,
-            config_turnos=mp_unit.unit.config_turnos
-        ))
-
-    # Get doctor for response
-    doctor = db.query(Doctor).filter(Doctor.id == macro_period.doctor_id).first()
-
-    return MacroPeriodDetail(
-        id=macro_period.id,
-        doctor_id=macro_period.doctor_id,
-        start_date=macro_period.start_date,
-        end_date=macro_period.end_date,
-        status=macro_period.status,
-        priority=macro_period.priority,
-        deadline=macro_period.deadline,
-        public_token=macro_period.public_token,
-        created_at=macro_period.created_at,
-        created_by=macro_period.created_by,
-        responded_at=macro_period.responded_at,
-        units=units_response,
-        selections=macro_period.selections,
-        audit_events=macro_period.audit_events
-    )
+    # MacroPeriodDetail built from plain rows
+    detail = macro_period._asdict()
+    detail["units"] = [unit_dict(row) for row in db.execute(units_query(macro_period_id))]
+    detail["selections"] = [selection_dict(row) for row in db.execute(selections_query(macro_period_id))]
+    detail["audit_events"] = [audit_event_dict(row) for row in db.execute(audit_events_query(macro_period_id))]
+    return FastJSONResponse(detail)
 
 
 @router.post("/{macro_period_id}/unlock")
@@ -442,35 +589,31 @@ def batch_inactivate_macro_periods(
 @router.get("/{macro_period_id}/export.csv")
 def export_macro_period_csv(
     macro_period_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     macro_period = db.query(MacroPeriod).filter(MacroPeriod.id == macro_period_id).first()
     if not macro_period:
         raise HTTPException(status_code=404, detail="Macro period not found")
 
-    # Get selections
+    from ..models.macro_period_unit import MacroPeriodUnit
+
+    # Get selections and the names of the period's units
     selections = db.query(MacroPeriodSelection).filter(
         MacroPeriodSelection.macro_period_id == macro_period_id
-    ).all()
+    ).order_by(MacroPeriodSelection.date, MacroPeriodSelection.id).all()
+    unit_names = dict(
+        db.query(MacroPeriodUnit.id, Unit.name).join(Unit, MacroPeriodUnit.unit_id == Unit.id).filter(
+            MacroPeriodUnit.macro_period_id == macro_period_id
+        ).order_by(MacroPeriodUnit.order_position, MacroPeriodUnit.id).all()
+    )
 
     # Create CSV
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Data", "Tipo", "Período", "Início", "Fim"])
-
-    for selection in selections:
-        period = selection.part_of_day.value
-        start = str(selection.custom_start) if selection.custom_start else "-"
-        end = str(selection.custom_end) if selection.custom_end else "-"
-
-        writer.writerow([
-            str(selection.date),
-            selection.type.value,
-            period,
-            start,
-            end
-        ])
+    with span("render.csv", rows=len(selections)):
+        output = StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["Data", "Unidade", "Período", "Início", "Fim"])
+        writer.writerows(export_csv_rows(selections, unit_names))
 
     output.seek(0)
     return Response(
@@ -485,80 +628,59 @@ def export_macro_period_csv(
 @router.post("/export-batch.csv")
 def export_batch_csv(
     macro_period_ids: List[int],
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Export multiple macro periods to a single CSV file
     """
-    # Get all macro periods with their related data
-    macro_periods = db.query(MacroPeriod, Unit.name, Doctor.name).join(Unit).join(Doctor).filter(
+    from ..models.macro_period_unit import MacroPeriodUnit
+
+    # Get all macro periods with their doctor, then their units and selections in one query each
+    macro_periods = db.query(MacroPeriod, Doctor.name).join(Doctor).filter(
         MacroPeriod.id.in_(macro_period_ids)
-    ).all()
+    ).order_by(MacroPeriod.id).all()
 
     if not macro_periods:
         raise HTTPException(status_code=404, detail="No macro periods found")
 
+    period_ids = [macro_period.id for macro_period, _ in macro_periods]
+    unit_names_by_period = defaultdict(dict)
+    for mp_unit_id, period_id, unit_name in db.query(
+        MacroPeriodUnit.id, MacroPeriodUnit.macro_period_id, Unit.name
+    ).join(Unit, MacroPeriodUnit.unit_id == Unit.id).filter(
+        MacroPeriodUnit.macro_period_id.in_(period_ids)
+    ).order_by(MacroPeriodUnit.order_position, MacroPeriodUnit.id):
+        unit_names_by_period[period_id][mp_unit_id] = unit_name
+    selections_by_period = defaultdict(list)
+    for selection in db.query(MacroPeriodSelection).filter(
+        MacroPeriodSelection.macro_period_id.in_(period_ids)
+    ).order_by(MacroPeriodSelection.date, MacroPeriodSelection.id):
+        selections_by_period[selection.macro_period_id].append(selection)
+
     # Create CSV
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        "Macro Período ID",
-        "Unidade",
-        "Médico",
-        "Período Início",
-        "Período Fim",
-        "Status",
-        "Prioridade",
-        "Data Seleção",
-        "Tipo",
-        "Parte do Dia",
-        "Horário Início",
-        "Horário Fim"
-    ])
-
-    for macro_period, unit_name, doctor_name in macro_periods:
-        # Get selections for this macro period
-        selections = db.query(MacroPeriodSelection).filter(
-            MacroPeriodSelection.macro_period_id == macro_period.id
-        ).all()
-
-        if selections:
-            for selection in selections:
-                period = selection.part_of_day.value
-                start = str(selection.custom_start) if selection.custom_start else "-"
-                end = str(selection.custom_end) if selection.custom_end else "-"
-
-                writer.writerow([
-                    macro_period.id,
-                    unit_name,
-                    doctor_name,
-                    str(macro_period.start_date),
-                    str(macro_period.end_date),
-                    macro_period.status.value,
-                    macro_period.priority.value,
-                    str(selection.date),
-                    selection.type.value,
-                    period,
-                    start,
-                    end
-                ])
-        else:
-            # If no selections, still add the macro period info
-            writer.writerow([
-                macro_period.id,
-                unit_name,
-                doctor_name,
-                str(macro_period.start_date),
-                str(macro_period.end_date),
-                macro_period.status.value,
-                macro_period.priority.value,
-                "-",
-                "-",
-                "-",
-                "-",
-                "-"
-            ])
+    with span("render.csv", periods=len(macro_periods)):
+        output = StringIO()
+        writer = csv.writer(output)
+        writer.writerow([
+            "Macro Período ID",
+            "Unidade",
+            "Médico",
+            "Período Início",
+            "Período Fim",
+            "Status",
+            "Prioridade",
+            "Data Seleção",
+            "Parte do Dia",
+            "Horário Início",
+            "Horário Fim"
+        ])
+
+        for macro_period, doctor_name in macro_periods:
+            writer.writerows(batch_export_csv_rows(
+                macro_period, doctor_name,
+                selections_by_period[macro_period.id], unit_names_by_period[macro_period.id]
+            ))
 
     output.seek(0)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -575,8 +697,9 @@ def export_batch_csv(
 def get_dashboard_metrics(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user),
+    not_modified: None = Depends(conditional_get("macro_periods", time_bucket=True))
 ) -> Dict[str, Any]:
     """
     Get aggregated metrics for dashboard
@@ -597,13 +720,17 @@ def get_dashboard_metrics(
         MacroPeriod.created_at <= end_datetime
     )
 
-    # Total counts by status
-    total_periods = base_query.count()
-    aguardando_count = base_query.filter(MacroPeriod.status == MacroPeriodStatus.AGUARDANDO).count()
-    respondido_count = base_query.filter(MacroPeriod.status == MacroPeriodStatus.RESPONDIDO).count()
-    edicao_liberada_count = base_query.filter(MacroPeriod.status == MacroPeriodStatus.EDICAO_LIBERADA).count()
-    confirmado_count = base_query.filter(MacroPeriod.status == MacroPeriodStatus.CONFIRMADO).count()
-    cancelado_count = base_query.filter(MacroPeriod.status == MacroPeriodStatus.CANCELADO).count()
+    # Total counts by status (one GROUP BY instead of a COUNT per status)
+    status_counts = dict(
+        base_query.with_entities(MacroPeriod.status, func.count()).group_by(MacroPeriod.status).all()
+    )
+    total_periods = sum(status_counts.values())
+    aguardando_count = status_counts.get(MacroPeriodStatus.AGUARDANDO, 0)
+    respondido_count = status_counts.get(MacroPeriodStatus.RESPONDIDO, 0)
+    edicao_liberada_count = status_counts.get(MacroPeriodStatus.EDICAO_LIBERADA, 0)
+    confirmado_count = status_counts.get(MacroPeriodStatus.CONFIRMADO, 0)
+    cancelado_count = status_counts.get(MacroPeriodStatus.CANCELADO, 0)
+    expirado_count = status_counts.get(MacroPeriodStatus.EXPIRADO, 0)
 
     # Taxa de resposta (respondidos + confirmados + edicao_liberada) / total
     respondidos_total = respondido_count + confirmado_count + edicao_liberada_count
@@ -633,7 +760,8 @@ def get_dashboard_metrics(
         "RESPONDIDO": respondido_count,
         "EDICAO_LIBERADA": edicao_liberada_count,
         "CONFIRMADO": confirmado_count,
-        "CANCELADO": cancelado_count
+        "CANCELADO": cancelado_count,
+        "EXPIRADO": expirado_count
     }
 
     # Top 5 médicos com menor tempo de resposta
@@ -661,42 +789,24 @@ def get_dashboard_metrics(
     ).group_by(Doctor.id).order_by(desc("tempo_medio")).limit(5).all()
 
     # Tendência semanal (baseada nas datas reais de disponibilidade selecionadas pelos médicos)
-    # Buscar todas as seleções de disponibilidade no período filtrado
-    selections_query = db.query(MacroPeriodSelection).join(MacroPeriod).filter(
+    datas_selecionadas = db.query(MacroPeriodSelection.date).join(MacroPeriod).filter(
         MacroPeriod.created_at >= start_datetime,
         MacroPeriod.created_at <= end_datetime
     ).all()
+    tendencia_semanal = weekly_trend(data for (data,) in datas_selecionadas)
 
-    # Agrupar datas únicas por semana
-    from collections import defaultdict
-    weeks_data = defaultdict(set)  # Usar set para contar dias únicos
-
-    for selection in selections_query:
-        # Encontrar o início da semana (segunda-feira) da data de seleção
-        selection_date = selection.date
-        week_start = selection_date - timedelta(days=selection_date.weekday())
-        week_end = week_start + timedelta(days=6)
-        week_key = (week_start, week_end)
-        weeks_data[week_key].add(selection_date)  # Adicionar ao set (dias únicos)
-
-    # Ordenar por data e limitar a 12 semanas
-    sorted_weeks = sorted(weeks_data.items(), key=lambda x: x[0][0])[:12]
-
-    tendencia_semanal = [
-        {
-            "periodo": f"{week_start.strftime('%d/%m')} - {week_end.strftime('%d/%m')}",
-            "total": len(dates)  # Contar dias únicos no set
-        }
-        for (week_start, week_end), dates in sorted_weeks
-    ]
-
-    # Análise por médico
+    # Análise por médico (períodos do intervalo carregados uma vez e agrupados por médico)
     medicos_ativos = db.query(Doctor).filter(Doctor.active == True).all()
+    periodos_por_medico = defaultdict(list)
+    for periodo in base_query.filter(
+        MacroPeriod.doctor_id.in_([medico.id for medico in medicos_ativos])
+    ).order_by(MacroPeriod.id).all():
+        periodos_por_medico[periodo.doctor_id].append(periodo)
     analise_por_medico = []
 
     for medico in medicos_ativos:
         # Períodos do médico no intervalo
-        periodos_medico = base_query.filter(MacroPeriod.doctor_id == medico.id).all()
+        periodos_medico = periodos_por_medico[medico.id]
         total_solicitacoes = len(periodos_medico)
 
         if total_solicitacoes == 0:
@@ -751,7 +861,7 @@ def get_dashboard_metrics(
     # Ordenar por urgentes (desc) e depois por aguardando (desc)
     analise_por_medico.sort(key=lambda x: (x["urgentes"], x["aguardando"]), reverse=True)
 
-    return {
+    return FastJSONResponse({
         "periodo": {
             "inicio": start_date.isoformat(),
             "fim": end_date.isoformat()
@@ -763,6 +873,7 @@ def get_dashboard_metrics(
             "edicao_liberada": edicao_liberada_count,
             "confirmado": confirmado_count,
             "cancelado": cancelado_count,
+            "expirado": expirado_count,
             "urgentes": urgentes_count
         },
         "metricas": {
@@ -780,12 +891,14 @@ def get_dashboard_metrics(
         ],
         "tendencia_semanal": tendencia_semanal,
         "analise_por_medico": analise_por_medico
-    }
+    })
 
 
 @router.post("/{macro_period_id}/upload-admin-evidence", response_model=AdminEditEvidenceResponse)
 async def upload_admin_evidence(
     macro_period_id: int,
+    request: Request,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     notes: Optional[str] = None,
     db: Session = Depends(get_db),
@@ -795,8 +908,18 @@ async def upload_admin_evidence(
     Upload evidence file (screenshot/PDF) to justify admin edit.
     This is MANDATORY before enabling admin edit mode.
     """
+    max_bytes = settings.evidence_max_upload_bytes
+    size_error = f"File size exceeds {max_bytes // (1024 * 1024)}MB limit"
+
+    # Reject obviously oversized bodies before touching the file
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + 64 * 1024:
+        raise HTTPException(status_code=400, detail=size_error)
+
     # Verify macro period exists
-    macro_period = db.query(MacroPeriod).filter(MacroPeriod.id == macro_period_id).first()
+    macro_period = await run_in_threadpool(
+        lambda: db.query(MacroPeriod).filter(MacroPeriod.id == macro_period_id).first()
+    )
     if not macro_period:
         raise HTTPException(status_code=404, detail="Macro period not found")
 
@@ -815,30 +938,19 @@ async def upload_admin_evidence(
             detail=f"File type {file.content_type} not allowed. Only images (JPG, PNG, GIF) and PDF are accepted."
         )
 
-    # Validate file size (max 5MB)
-    contents = await file.read()
-    file_size = len(contents)
-    if file_size > 5 * 1024 * 1024:  # 5MB
-        raise HTTPException(status_code=400, detail="File size exceeds 5MB limit")
-
-    # Generate unique filename
-    file_extension = Path(file.filename).suffix
-    unique_filename = f"{secrets.token_urlsafe(16)}{file_extension}"
-
-    # Save file to uploads/evidence
-    upload_dir = Path("uploads/evidence")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    file_path = upload_dir / unique_filename
-
-    with open(file_path, "wb") as f:
-        f.write(contents)
+    # Stream to uploads/evidence, enforcing the size limit while reading
+    try:
+        stored = await store_upload(file, max_bytes)
+    except UploadTooLarge:
+        raise HTTPException(status_code=400, detail=size_error)
 
     # Create database record
     evidence = AdminEditEvidence(
         macro_period_id=macro_period_id,
-        file_path=str(file_path),
+        file_path=stored.path,
         original_filename=file.filename,
-        file_size=file_size,
+        file_size=stored.size,
+        sha256=stored.sha256,
         mime_type=file.content_type,
         notes=notes,
         uploaded_by=current_user["email"]
@@ -853,12 +965,21 @@ async def upload_admin_evidence(
         payload={
             "action": "evidence_uploaded",
             "filename": file.filename,
+            "sha256": stored.sha256,
+            "deduplicated": stored.deduplicated,
             "notes": notes
         }
     )
     db.add(audit_event)
-    db.commit()
-    db.refresh(evidence)
+
+    def _save():
+        db.commit()
+        db.refresh(evidence)
+
+    await run_in_threadpool(_save)
+
+    # Rendered in the thumbnail process pool after the response is sent
+    background_tasks.add_task(generate_evidence_thumbnail, evidence.id)
 
     return evidence
 
@@ -924,7 +1045,7 @@ def enable_admin_edit(
 @router.get("/{macro_period_id}/evidences", response_model=List[AdminEditEvidenceResponse])
 def list_admin_evidences(
     macro_period_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -939,3 +1060,144 @@ def list_admin_evidences(
     ).order_by(desc(AdminEditEvidence.uploaded_at)).all()
 
     return evidences
+
+
+@router.get("/{macro_period_id}/evidences/{evidence_id}/download")
+async def download_admin_evidence(
+    macro_period_id: int,
+    evidence_id: int,
+    request: Request,
+    inline: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Download an evidence file. Supports Range/If-Range and ETag/If-None-Match.
+    """
+    evidence = await run_in_threadpool(
+        lambda: db.query(AdminEditEvidence).filter(
+            AdminEditEvidence.id == evidence_id,
+            AdminEditEvidence.macro_period_id == macro_period_id
+        ).first()
+    )
+    if not evidence:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+
+    return await _evidence_file_response(
+        request,
+        evidence.file_path,
+        evidence.sha256,
+        media_type=evidence.mime_type or "application/octet-stream",
+        filename=evidence.original_filename or Path(evidence.file_path).name,
+        inline=inline
+    )
+
+
+@router.get("/{macro_period_id}/evidences/{evidence_id}/thumbnail")
+async def get_admin_evidence_thumbnail(
+    macro_period_id: int,
+    evidence_id: int,
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Small JPEG preview of an evidence file (first page for PDFs)
+    """
+    evidence = await run_in_threadpool(
+        lambda: db.query(AdminEditEvidence).filter(
+            AdminEditEvidence.id == evidence_id,
+            AdminEditEvidence.macro_period_id == macro_period_id
+        ).first()
+    )
+    if not evidence:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    if not evidence.thumbnail_path:
+        raise HTTPException(status_code=404, detail="Thumbnail not available")
+
+    return await _evidence_file_response(
+        request,
+        evidence.thumbnail_path,
+        f"{evidence.sha256}-thumb" if evidence.sha256 else None,
+        media_type="image/jpeg",
+        filename=Path(evidence.thumbnail_path).name,
+        inline=True
+    )
+
+
+async def _evidence_file_response(
+    request: Request,
+    path: str,
+    content_hash: Optional[str],
+    media_type: str,
+    filename: str,
+    inline: bool = False
+) -> Response:
+    """Serve a stored file with ETag/If-None-Match and Range/If-Range handling"""
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Evidence file not found on storage")
+
+    # Content-addressed files never change, so the hash is a strong validator
+    if content_hash:
+        etag = f'"{content_hash}"'
+    else:
+        etag = f'"{int(stat_result.st_mtime)}-{stat_result.st_size}"'
+    headers = {"etag": etag, "cache-control": "private, max-age=86400"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None  # Client's copy is stale: send the whole file
+    try:
+        byte_range = parse_range_header(range_header, stat_result.st_size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={"content-range": f"bytes */{stat_result.st_size}"})
+
+    return RangeFileResponse(
+        path,
+        stat_result=stat_result,
+        byte_range=byte_range,
+        headers=headers,
+        media_type=media_type,
+        filename=filename,
+        content_disposition_type="inline" if inline else "attachment",
+    )
+
+
+@router.get("/{macro_period_id}/evidences.zip")
+def download_admin_evidences_zip(
+    macro_period_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Download all evidence files of a macro period as a ZIP built while streaming
+    """
+    macro_period = db.query(MacroPeriod).filter(MacroPeriod.id == macro_period_id).first()
+    if not macro_period:
+        raise HTTPException(status_code=404, detail="Macro period not found")
+
+    evidences = db.query(AdminEditEvidence).filter(
+        AdminEditEvidence.macro_period_id == macro_period_id
+    ).order_by(AdminEditEvidence.uploaded_at).all()
+    if not evidences:
+        raise HTTPException(status_code=404, detail="No evidence files for this macro period")
+
+    entries = [
+        (
+            f"{evidence.id}-{Path(evidence.original_filename or evidence.file_path).name}",
+            evidence.file_path,
+            evidence.uploaded_at or datetime.now(timezone.utc)
+        )
+        for evidence in evidences
+    ]
+    return StreamingResponse(
+        iter_zip_bundle(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="evidencias_{macro_period_id}.zip"'}
+    )
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import List
+from ..auth import require_admin
+from ..profiling import Profile, profiles
+from ..schemas.profile import ProfileSummary, ProfileDetail
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+
+def _get_profile(profile_id: int) -> Profile:
+    for profile in profiles:
+        if profile.id == profile_id:
+            return profile
+    raise HTTPException(status_code=404, detail="Profile not found (evicted, or recorded by another worker)")
+
+
+@router.get("", response_model=List[ProfileSummary])
+def list_profiles(current_user: dict = Depends(require_admin)):
+    """Profiles kept by this worker, newest first"""
+    return [profile.summary() for profile in reversed(profiles)]
+
+
+@router.get("/{profile_id}", response_model=ProfileDetail)
+def get_profile(profile_id: int, top: int = 30, current_user: dict = Depends(require_admin)):
+    return _get_profile(profile_id).detail(top)
+
+
+@router.get("/{profile_id}/folded", response_class=PlainTextResponse)
+def get_profile_folded(profile_id: int, current_user: dict = Depends(require_admin)):
+    """Collapsed stacks for speedscope.app or flamegraph.pl"""
+    return _get_profile(profile_id).folded()
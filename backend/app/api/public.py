@@ -1,33 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from fastapi.responses import Response
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import select, delete, func
 from datetime import datetime, timezone, time as dt_time
 from typing import List, Optional
-from ..database import get_db
-from ..models import MacroPeriod, Unit, Doctor, AuditEvent, MacroPeriodSelection
+from ..database import get_async_db, get_async_read_db
+from ..models import MacroPeriod, MacroPeriodUnit, AuditEvent, MacroPeriodSelection
 from ..models.macro_period import MacroPeriodStatus
 from ..models.audit import EventType
 from ..schemas.macro_period import MacroPeriodPublicView, DoctorResponseSubmit
 from ..schemas.selection import MacroPeriodSelectionCreate
+from ..schemas.suggestion import ScheduleSuggestion
+from ..schedule_solver import suggest_schedules, candidate_to_selections
+from ..rate_limit import public_rate_limit, INVALID_TOKEN_DETAIL
+from ..responses import FastJSONResponse
+from ..serializers import units_query, selections_query, unit_dict, selection_dict
+from ..tracing import span, traced
 from icalendar import Calendar, Event
 from ..models.selection import PartOfDay
 
-router = APIRouter(prefix="/public", tags=["public"])
+router = APIRouter(prefix="/public", tags=["public"], dependencies=[Depends(public_rate_limit)])
+
+
+async def _get_macro_period_by_token(db: AsyncSession, token: str, *options) -> MacroPeriod:
+    """Load a macro period by public token (relationships must be eager-loaded in async code)"""
+    result = await db.execute(
+        select(MacroPeriod).options(*options).where(MacroPeriod.public_token == token)
+    )
+    macro_period = result.scalar_one_or_none()
+    if not macro_period:
+        raise HTTPException(status_code=404, detail=INVALID_TOKEN_DETAIL)
+    return macro_period
 
 
 @router.get("/macro-period/{token}", response_model=MacroPeriodPublicView)
-def get_macro_period_by_token(
+async def get_macro_period_by_token(
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    from ..schemas.macro_period_unit import MacroPeriodUnitResponse
-
-    macro_period = db.query(MacroPeriod).filter(MacroPeriod.public_token == token).first()
-    if not macro_period:
-        raise HTTPException(status_code=404, detail="Invalid or expired link")
-
-    # Get doctor
-    doctor = db.query(Doctor).filter(Doctor.id == macro_period.doctor_id).first()
+    macro_period = await _get_macro_period_by_token(db, token, joinedload(MacroPeriod.doctor))
 
     # Check if can edit
     can_edit = macro_period.status in [
@@ -36,10 +48,12 @@ def get_macro_period_by_token(
     ]
 
     # Log link viewed
-    existing_view = db.query(AuditEvent).filter(
-        AuditEvent.macro_period_id == macro_period.id,
-        AuditEvent.event_type == EventType.LINK_VIEWED
-    ).first()
+    existing_view = await db.scalar(
+        select(AuditEvent.id).where(
+            AuditEvent.macro_period_id == macro_period.id,
+            AuditEvent.event_type == EventType.LINK_VIEWED
+        ).limit(1)
+    )
 
     if not existing_view:
         audit_event = AuditEvent(
@@ -48,47 +62,110 @@ def get_macro_period_by_token(
             created_by="doctor"
         )
         db.add(audit_event)
-        db.commit()
-
-    # Build units response
-    units_response = []
-    for mp_unit in macro_period.units:
-        units_response.append(MacroPeriodUnitResponse(
-            id=mp_unit.id,
-            macro_period_id=mp_unit.macro_period_id,
-            unit_id=mp_unit.unit_id,
-            unit_name=mp_unit.unit.name,
-            unit_city=mp_unit.unit.city,
-            total_days=mp_unit.total_days,
-            order_position=mp_unit.order_position,
-            config_turnos=mp_unit.unit.config_turnos
-        ))
-
-    return MacroPeriodPublicView(
-        id=macro_period.id,
-        doctor_name=doctor.name,
-        start_date=macro_period.start_date,
-        end_date=macro_period.end_date,
-        status=macro_period.status,
-        units=units_response,
-        selections=macro_period.selections,
-        can_edit=can_edit
+        await db.commit()
+
+    # MacroPeriodPublicView built from plain rows
+    units = await db.execute(units_query(macro_period.id))
+    selections = await db.execute(selections_query(macro_period.id))
+    return FastJSONResponse({
+        "id": macro_period.id,
+        "doctor_name": macro_period.doctor.name,
+        "start_date": macro_period.start_date,
+        "end_date": macro_period.end_date,
+        "status": macro_period.status,
+        "units": [unit_dict(row) for row in units],
+        "selections": [selection_dict(row) for row in selections],
+        "can_edit": can_edit
+    })
+
+
+@router.get("/macro-period/{token}/suggestions", response_model=List[ScheduleSuggestion])
+async def suggest_macro_period_schedule(
+    token: str,
+    limit: int = Query(3, ge=1, le=10),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Suggest valid schedules for the doctor, placing units in order_position order"""
+    macro_period = await _get_macro_period_by_token(db, token, selectinload(MacroPeriod.units))
+
+    if macro_period.status not in [MacroPeriodStatus.AGUARDANDO, MacroPeriodStatus.EDICAO_LIBERADA]:
+        raise HTTPException(status_code=400, detail="This period is locked and cannot be edited")
+
+    inactive_statuses = [MacroPeriodStatus.CANCELADO, MacroPeriodStatus.EXPIRADO]
+
+    # Days already taken by the doctor's other periods
+    blocked_dates = (await db.scalars(
+        select(MacroPeriodSelection.date).join(MacroPeriod).where(
+            MacroPeriod.doctor_id == macro_period.doctor_id,
+            MacroPeriod.id != macro_period.id,
+            MacroPeriod.status.notin_(inactive_statuses),
+            MacroPeriodSelection.date >= macro_period.start_date,
+            MacroPeriodSelection.date <= macro_period.end_date
+        ).distinct()
+    )).all()
+
+    mp_units = sorted(
+        macro_period.units,
+        key=lambda u: (u.order_position is None, u.order_position or 0, u.id)
+    )
+
+    # Occupancy of the same units by other periods, used to rank candidates
+    mp_unit_ids_by_unit = {}
+    for mp_unit in mp_units:
+        mp_unit_ids_by_unit.setdefault(mp_unit.unit_id, []).append(mp_unit.id)
+
+    occupancy_rows = (await db.execute(
+        select(
+            MacroPeriodUnit.unit_id,
+            MacroPeriodSelection.date,
+            func.count(func.distinct(MacroPeriodSelection.macro_period_id))
+        ).join(
+            MacroPeriodUnit, MacroPeriodSelection.macro_period_unit_id == MacroPeriodUnit.id
+        ).join(
+            MacroPeriod, MacroPeriodSelection.macro_period_id == MacroPeriod.id
+        ).where(
+            MacroPeriodUnit.unit_id.in_(list(mp_unit_ids_by_unit.keys())),
+            MacroPeriod.id != macro_period.id,
+            MacroPeriod.status.notin_(inactive_statuses),
+            MacroPeriodSelection.date >= macro_period.start_date,
+            MacroPeriodSelection.date <= macro_period.end_date
+        ).group_by(MacroPeriodUnit.unit_id, MacroPeriodSelection.date)
+    )).all()
+
+    occupancy = {}
+    for unit_id, selection_date, count in occupancy_rows:
+        for mp_unit_id in mp_unit_ids_by_unit.get(unit_id, []):
+            occupancy.setdefault(mp_unit_id, {})[selection_date] = count
+
+    candidates = suggest_schedules(
+        macro_period.start_date,
+        macro_period.end_date,
+        [(u.id, u.total_days) for u in mp_units],
+        blocked_dates=blocked_dates,
+        occupancy=occupancy,
+        limit=limit
     )
 
+    return [
+        ScheduleSuggestion(
+            score=candidate["score"],
+            total_days=sum(len(days) for _, days in candidate["placements"]),
+            selections=candidate_to_selections(candidate, macro_period.start_date)
+        )
+        for candidate in candidates
+    ]
+
 
 @router.post("/macro-period/{token}/response")
-def submit_doctor_response(
+async def submit_doctor_response(
     token: str,
     response: DoctorResponseSubmit,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     x_admin_edit_token: Optional[str] = Header(None)
 ):
-    from ..models.macro_period_unit import MacroPeriodUnit
-    from collections import defaultdict
-
-    macro_period = db.query(MacroPeriod).filter(MacroPeriod.public_token == token).first()
-    if not macro_period:
-        raise HTTPException(status_code=404, detail="Invalid or expired link")
+    macro_period = await _get_macro_period_by_token(
+        db, token, selectinload(MacroPeriod.units).joinedload(MacroPeriodUnit.unit)
+    )
 
     # Determine if this is an admin edit
     is_admin_edit = False
@@ -96,10 +173,12 @@ def submit_doctor_response(
 
     if x_admin_edit_token:
         # Validate admin token from audit events
-        admin_audit = db.query(AuditEvent).filter(
-            AuditEvent.macro_period_id == macro_period.id,
-            AuditEvent.event_type == EventType.UPDATED
-        ).order_by(AuditEvent.created_at.desc()).all()
+        admin_audit = (await db.scalars(
+            select(AuditEvent).where(
+                AuditEvent.macro_period_id == macro_period.id,
+                AuditEvent.event_type == EventType.UPDATED
+            ).order_by(AuditEvent.created_at.desc())
+        )).all()
 
         token_valid = False
         for audit in admin_audit:
@@ -127,44 +206,48 @@ def submit_doctor_response(
         if macro_period.status != MacroPeriodStatus.RESPONDIDO:
             raise HTTPException(status_code=400, detail="Admin can only edit periods in RESPONDIDO status")
 
-    # Validate dates are within macro period
-    for selection in response.selections:
-        if selection.date < macro_period.start_date or selection.date > macro_period.end_date:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Date {selection.date} is outside the allowed period"
-            )
-
-    # Validate macro_period_unit_id exists
-    mp_unit_ids = {u.id for u in macro_period.units}
-    for selection in response.selections:
-        if selection.macro_period_unit_id not in mp_unit_ids:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid macro_period_unit_id: {selection.macro_period_unit_id}"
-            )
+    with span("submit.validate", selections=len(response.selections)):
+        # Validate dates are within macro period
+        for selection in response.selections:
+            if selection.date < macro_period.start_date or selection.date > macro_period.end_date:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Date {selection.date} is outside the allowed period"
+                )
 
-    # Validate time overlap (no conflicts on same day)
-    validate_time_overlap(response.selections)
+        # Validate macro_period_unit_id exists
+        mp_unit_ids = {u.id for u in macro_period.units}
+        for selection in response.selections:
+            if selection.macro_period_unit_id not in mp_unit_ids:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid macro_period_unit_id: {selection.macro_period_unit_id}"
+                )
 
-    # Validate consecutive blocks
-    validate_consecutive_blocks(response.selections)
+        # Validate time overlap (no conflicts on same day)
+        validate_time_overlap(response.selections)
 
-    # Validate unit requirements (surgery_days and consult_days)
-    validate_unit_requirements(response.selections, macro_period.units)
+        # Validate consecutive blocks
+        validate_consecutive_blocks(response.selections)
 
-    # Delete existing selections
-    db.query(MacroPeriodSelection).filter(
-        MacroPeriodSelection.macro_period_id == macro_period.id
-    ).delete()
+        # Validate unit requirements (surgery_days and consult_days)
+        validate_unit_requirements(response.selections, macro_period.units)
 
-    # Create new selections
-    for selection_data in response.selections:
-        selection = MacroPeriodSelection(
-            macro_period_id=macro_period.id,
-            **selection_data.model_dump()
+    # Each phase flushes its own statements so its span covers them (the commit only commits)
+    with span("submit.replace_selections"):
+        # Delete existing selections
+        await db.execute(
+            delete(MacroPeriodSelection).where(MacroPeriodSelection.macro_period_id == macro_period.id)
         )
-        db.add(selection)
+
+        # Create new selections
+        for selection_data in response.selections:
+            selection = MacroPeriodSelection(
+                macro_period_id=macro_period.id,
+                **selection_data.model_dump()
+            )
+            db.add(selection)
+        await db.flush()
 
     # Update status based on confirm flag
     if response.confirm:
@@ -199,14 +282,17 @@ def submit_doctor_response(
         payload["action"] = "admin_edited"
         payload["edited_by"] = admin_email
 
-    audit_event = AuditEvent(
-        macro_period_id=macro_period.id,
-        event_type=event_type,
-        created_by=admin_email if is_admin_edit else "doctor",
-        payload=payload
-    )
-    db.add(audit_event)
-    db.commit()
+    with span("submit.audit", event_type=event_type.value):
+        audit_event = AuditEvent(
+            macro_period_id=macro_period.id,
+            event_type=event_type,
+            created_by=admin_email if is_admin_edit else "doctor",
+            payload=payload
+        )
+        db.add(audit_event)
+        await db.flush()
+    with span("submit.commit"):
+        await db.commit()
 
     return {
         "message": "Response submitted successfully",
@@ -214,6 +300,7 @@ def submit_doctor_response(
     }
 
 
+@traced("validate.time_overlap")
 def validate_time_overlap(selections: List[MacroPeriodSelectionCreate]):
     """Validate that there are no time overlaps on the same day"""
     from collections import defaultdict
@@ -245,6 +332,7 @@ def validate_time_overlap(selections: List[MacroPeriodSelectionCreate]):
                 )
 
 
+@traced("validate.consecutive_blocks")
 def validate_consecutive_blocks(selections: List[MacroPeriodSelectionCreate]):
     """Validate that days with same block_id are consecutive"""
     from collections import defaultdict
@@ -267,6 +355,7 @@ def validate_consecutive_blocks(selections: List[MacroPeriodSelectionCreate]):
                 )
 
 
+@traced("validate.unit_requirements")
 def validate_unit_requirements(selections: List[MacroPeriodSelectionCreate], macro_period_units):
     """Validate that each unit has the correct number of total days (counting UNIQUE days)"""
     from collections import defaultdict
@@ -289,12 +378,14 @@ def validate_unit_requirements(selections: List[MacroPeriodSelectionCreate], mac
             )
 
 
-def _generate_calendar(macro_period, db: Session):
-    """Helper function to generate iCalendar content"""
-    from ..models.macro_period_unit import MacroPeriodUnit
+@traced("render.ics")
+def _generate_calendar(macro_period):
+    """Helper function to generate iCalendar content.
 
-    # Get doctor info
-    doctor = db.query(Doctor).filter(Doctor.id == macro_period.doctor_id).first()
+    Expects doctor, selections and units (with their unit) already loaded.
+    """
+    doctor = macro_period.doctor
+    units_by_mp_unit = {mp_unit.id: mp_unit.unit for mp_unit in macro_period.units}
 
     # Create calendar
     cal = Calendar()
@@ -308,11 +399,7 @@ def _generate_calendar(macro_period, db: Session):
     # Process each selection
     for selection in macro_period.selections:
         # Get unit info
-        mp_unit = db.query(MacroPeriodUnit).filter(MacroPeriodUnit.id == selection.macro_period_unit_id).first()
-        if not mp_unit:
-            continue
-
-        unit = db.query(Unit).filter(Unit.id == mp_unit.unit_id).first()
+        unit = units_by_mp_unit.get(selection.macro_period_unit_id)
         if not unit:
             continue
 
@@ -353,54 +440,52 @@ def _generate_calendar(macro_period, db: Session):
     return cal
 
 
-@router.get("/macro-period/{token}/calendar")
-def export_macro_period_calendar(
-    token: str,
-    db: Session = Depends(get_db)
-):
-    """Export doctor's confirmed schedule as iCalendar (.ics) file for download"""
-    # Get macro period
-    macro_period = db.query(MacroPeriod).filter(MacroPeriod.public_token == token).first()
-    if not macro_period:
-        raise HTTPException(status_code=404, detail="Invalid or expired link")
+async def _get_macro_period_for_calendar(db: AsyncSession, token: str) -> MacroPeriod:
+    macro_period = await _get_macro_period_by_token(
+        db, token,
+        joinedload(MacroPeriod.doctor),
+        selectinload(MacroPeriod.units).joinedload(MacroPeriodUnit.unit),
+        selectinload(MacroPeriod.selections)
+    )
 
     # Check if there are selections
     if not macro_period.selections or len(macro_period.selections) == 0:
         raise HTTPException(status_code=400, detail="No schedule to export")
 
-    # Get doctor info
-    doctor = db.query(Doctor).filter(Doctor.id == macro_period.doctor_id).first()
+    return macro_period
+
+
+@router.get("/macro-period/{token}/calendar")
+async def export_macro_period_calendar(
+    token: str,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Export doctor's confirmed schedule as iCalendar (.ics) file for download"""
+    macro_period = await _get_macro_period_for_calendar(db, token)
 
     # Generate calendar
-    cal = _generate_calendar(macro_period, db)
+    cal = _generate_calendar(macro_period)
     ics_content = cal.to_ical()
 
     return Response(
         content=ics_content,
         media_type="text/calendar",
         headers={
-            "Content-Disposition": f"attachment; filename=agenda_{doctor.name.replace(' ', '_')}.ics"
+            "Content-Disposition": f"attachment; filename=agenda_{macro_period.doctor.name.replace(' ', '_')}.ics"
         }
     )
 
 
 @router.get("/macro-period/{token}/calendar-feed")
-def get_macro_period_calendar_feed(
+async def get_macro_period_calendar_feed(
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Calendar feed endpoint for webcal:// subscription (iPhone/Apple Calendar)"""
-    # Get macro period
-    macro_period = db.query(MacroPeriod).filter(MacroPeriod.public_token == token).first()
-    if not macro_period:
-        raise HTTPException(status_code=404, detail="Invalid or expired link")
-
-    # Check if there are selections
-    if not macro_period.selections or len(macro_period.selections) == 0:
-        raise HTTPException(status_code=400, detail="No schedule to export")
+    macro_period = await _get_macro_period_for_calendar(db, token)
 
     # Generate calendar
-    cal = _generate_calendar(macro_period, db)
+    cal = _generate_calendar(macro_period)
     ics_content = cal.to_ical()
 
     return Response(
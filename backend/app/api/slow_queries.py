@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import desc, func
+from typing import List, Optional
+from ..database import get_db
+from ..auth import require_admin
+from ..models.slow_query import SlowQuery
+from ..schemas.slow_query import SlowQuery as SlowQuerySchema, SlowQueryDetail, SlowStatement
+
+router = APIRouter(prefix="/slow-queries", tags=["slow-queries"])
+
+
+@router.get("", response_model=List[SlowQuerySchema])
+def list_slow_queries(
+    route: Optional[str] = None,
+    statement_hash: Optional[str] = None,
+    min_duration_ms: float = 0,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """Statements over SLOW_QUERY_THRESHOLD_MS, newest first"""
+    query = db.query(SlowQuery)
+    if route:
+        query = query.filter(SlowQuery.route == route)
+    if statement_hash:
+        query = query.filter(SlowQuery.statement_hash == statement_hash)
+    if min_duration_ms:
+        query = query.filter(SlowQuery.duration_ms >= min_duration_ms)
+    return query.order_by(desc(SlowQuery.id)).offset(skip).limit(limit).all()
+
+
+@router.get("/statements", response_model=List[SlowStatement])
+def list_slow_statements(
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """Slow statements grouped by shape, by total time spent over the threshold"""
+    rows = db.query(
+        SlowQuery.statement_hash,
+        func.min(SlowQuery.statement).label("statement"),
+        func.count(SlowQuery.id).label("count"),
+        func.max(SlowQuery.duration_ms).label("max_ms"),
+        func.avg(SlowQuery.duration_ms).label("avg_ms"),
+        func.max(SlowQuery.captured_at).label("last_captured_at"),
+        func.array_agg(func.distinct(SlowQuery.route)).label("routes"),
+    ).group_by(SlowQuery.statement_hash).order_by(desc(func.sum(SlowQuery.duration_ms))).limit(limit).all()
+    return [
+        SlowStatement(
+            statement_hash=row.statement_hash,
+            statement=row.statement,
+            count=row.count,
+            max_ms=row.max_ms,
+            avg_ms=round(row.avg_ms, 2),
+            last_captured_at=row.last_captured_at,
+            routes=[route for route in row.routes if route is not None],
+        )
+        for row in rows
+    ]
+
+
+@router.get("/{slow_query_id}", response_model=SlowQueryDetail)
+def get_slow_query(
+    slow_query_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    slow_query = db.query(SlowQuery).filter(SlowQuery.id == slow_query_id).first()
+    if not slow_query:
+        raise HTTPException(status_code=404, detail="Slow query not found (pruned?)")
+    detail = SlowQueryDetail.model_validate(slow_query)
+    plan_row = slow_query
+    if slow_query.plan is None:
+        # Shapes are explained once per interval; show the latest plan captured for this one
+        plan_row = db.query(SlowQuery).filter(
+            SlowQuery.statement_hash == slow_query.statement_hash,
+            SlowQuery.plan.isnot(None)
+        ).order_by(desc(SlowQuery.id)).first()
+    if plan_row is not None:
+        detail.plan = plan_row.plan
+        detail.plan_query_id = plan_row.id
+    return detail
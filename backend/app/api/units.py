@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..auth import get_current_user
+from ..http_cache import conditional_get
 from ..models.unit import Unit
 from ..schemas.unit import Unit as UnitSchema, UnitCreate, UnitUpdate
 
@@ -13,8 +14,9 @@ router = APIRouter(prefix="/units", tags=["units"])
 def list_units(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user),
+    not_modified: None = Depends(conditional_get("units"))
 ):
     units = db.query(Unit).offset(skip).limit(limit).all()
     return units
@@ -36,7 +38,7 @@ def create_unit(
 @router.get("/{unit_id}", response_model=UnitSchema)
 def get_unit(
     unit_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     unit = db.query(Unit).filter(Unit.id == unit_id).first()
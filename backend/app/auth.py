@@ -1,18 +1,41 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, case, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from starlette.concurrency import run_in_threadpool
+from .cache import TTLCache
 from .config import get_settings
-from .database import get_db
+from .database import engine
+from .models.admin_user import AdminUser
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 
+# Verified JWT payloads, keyed by token digest and never kept past the token's exp
+token_cache = TTLCache("auth_token", settings.auth_token_cache_size, settings.auth_token_cache_ttl_seconds)
+# email -> role ("" for unknown/inactive accounts)
+role_cache = TTLCache("admin_role", settings.auth_token_cache_size, settings.admin_role_cache_ttl_seconds)
+
+# bcrypt is deliberately slow (~0.3 s per check); it runs on its own small pool so
+# a burst of logins cannot take every threadpool thread from normal requests
+_password_pool = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="password-hash")
+_password_pending = 0
+_password_lock = threading.Lock()
+_dummy_hash: Optional[str] = None
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -21,6 +44,25 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bounded password pool; 503 when its queue is full"""
+    global _password_pending
+    with _password_lock:
+        if _password_pending >= settings.password_hash_max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_pool, verify_password, plain_password, hashed_password)
+    finally:
+        with _password_lock:
+            _password_pending -= 1
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -44,16 +86,135 @@ def decode_token(token: str) -> dict:
         )
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
-    """Simple admin authentication - in production, use proper user table"""
-    payload = decode_token(credentials.credentials)
+def decode_token_cached(token: str) -> dict:
+    """decode_token with the verified payload cached for repeat requests"""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = decode_token(token)
+        exp = payload.get("exp")
+        token_cache.put(key, payload, expires_at=exp if isinstance(exp, (int, float)) else None)
+    return payload
+
+
+def _lookup_role(email: str) -> str:
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(AdminUser.role, AdminUser.active).where(AdminUser.email == email)
+        ).first()
+    return row.role if row and row.active else ""
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Authenticate an admin from the bearer token.
+
+    Takes no DB session: the role comes from admin_users through a short TTL
+    cache, so only a cache miss opens a connection.
+    """
+    return await authenticate_token(credentials.credentials)
+
+
+async def authenticate_token(token: str) -> dict:
+    """{"email", "role"} for a valid token of an active account; 401 otherwise"""
+    payload = decode_token_cached(token)
     email = payload.get("sub")
-    if email != settings.admin_email:
+    role = role_cache.get(email) if email else ""
+    if role is None:
+        role = await run_in_threadpool(_lookup_role, email)
+        role_cache.put(email, role)
+    if not role:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
         )
-    return {"email": email, "role": "admin"}
+    return {"email": email, "role": role}
+
+
+async def require_admin(current_user: dict = Depends(get_current_user)):
+    """Dependency for routes restricted to the admin role"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return current_user
+
+
+def _register_login_attempt(email: str):
+    """Count an attempt in the account's window; returns the row or None if unknown"""
+    now = datetime.now(timezone.utc)
+    window_expired = or_(
+        AdminUser.login_window_started_at.is_(None),
+        AdminUser.login_window_started_at <= now - timedelta(seconds=settings.login_rate_limit_window_seconds)
+    )
+    with engine.begin() as conn:
+        return conn.execute(
+            update(AdminUser)
+            .where(AdminUser.email == email)
+            .values(
+                login_window_started_at=case((window_expired, now), else_=AdminUser.login_window_started_at),
+                login_attempts=case((window_expired, 1), else_=AdminUser.login_attempts + 1),
+            )
+            .returning(
+                AdminUser.password_hash, AdminUser.role, AdminUser.active,
+                AdminUser.login_attempts, AdminUser.login_window_started_at
+            )
+        ).first()
+
+
+def _register_login_success(email: str):
+    with engine.begin() as conn:
+        conn.execute(
+            update(AdminUser)
+            .where(AdminUser.email == email)
+            .values(login_attempts=0, login_window_started_at=None, last_login_at=datetime.now(timezone.utc))
+        )
+
+
+async def authenticate_admin(email: str, password: str) -> dict:
+    """Check credentials against admin_users; raises 401, 429 or 503"""
+    global _dummy_hash
+    email = email.strip().lower()
+    account = await run_in_threadpool(_register_login_attempt, email)
+
+    if account is None:
+        # Same bcrypt cost as a real account, so response time doesn't reveal emails
+        if _dummy_hash is None:
+            # Hashing costs as much as verifying: keep it off the event loop too
+            loop = asyncio.get_running_loop()
+            _dummy_hash = await loop.run_in_executor(_password_pool, get_password_hash, "not-a-real-password")
+        await verify_password_async(password, _dummy_hash)
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    if account.login_attempts > settings.login_rate_limit_attempts:
+        window_end = account.login_window_started_at + timedelta(seconds=settings.login_rate_limit_window_seconds)
+        retry_after = max(1, int((window_end - datetime.now(timezone.utc)).total_seconds()))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts for this account",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    if not await verify_password_async(password, account.password_hash) or not account.active:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    await run_in_threadpool(_register_login_success, email)
+    role_cache.put(email, account.role)
+    return {"email": email, "role": account.role}
+
+
+def ensure_bootstrap_admin():
+    """Create the ADMIN_EMAIL/ADMIN_PASSWORD account when admin_users is empty"""
+    with engine.begin() as conn:
+        if conn.execute(select(AdminUser.id).limit(1)).first():
+            return
+        conn.execute(
+            pg_insert(AdminUser)
+            .values(
+                email=settings.admin_email.strip().lower(),
+                password_hash=get_password_hash(settings.admin_password),
+                role="admin",
+                active=True,
+                login_attempts=0,
+                created_at=datetime.now(timezone.utc),
+            )
+            .on_conflict_do_nothing(index_elements=[AdminUser.email])
+        )
+    logger.info("Created bootstrap admin account %s", settings.admin_email)
@@ -0,0 +1,65 @@
+"""In-process caches shared by the auth and public-route guards (hit rates in /metrics)"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from .metrics import Counter, Gauge
+
+cache_lookups_total = Counter(
+    "cache_lookups_total", "In-process cache lookups by result (hit/miss)", ["cache", "result"]
+)
+cache_entries = Gauge("cache_entries", "Entries held by each in-process cache", ["cache"])
+
+CACHES = {}
+
+
+class TTLCache:
+    """Small thread-safe LRU whose entries expire (per worker)"""
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        CACHES[name] = self
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        cache_lookups_total.inc(cache=self.name, result="miss" if entry is None else "hit")
+        return None if entry is None else entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, key: str, value: Any, expires_at: Optional[float] = None):
+        """Store `value` for ttl_seconds, or until `expires_at` if that is sooner"""
+        until = time.time() + self.ttl_seconds
+        if expires_at is not None:
+            until = min(until, expires_at)
+        with self._lock:
+            self._entries[key] = (until, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _cache_sizes():
+    return {(name,): len(cache) for name, cache in CACHES.items()}
+
+
+cache_entries.set_function(_cache_sizes)
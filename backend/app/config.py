@@ -1,15 +1,137 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
     database_url: str = "postgresql://postgres:postgres@db:5432/macro_periods"
+    # asyncpg URL for the async routes; derived from database_url when unset
+    async_database_url: Optional[str] = None
+    # Optional read replica for read-only endpoints
+    database_replica_url: Optional[str] = None
+    read_your_writes_seconds: int = 10  # Clients that just wrote read from the primary for this long
+
+    # Connection pool (per worker process)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0  # Seconds to wait for a connection before failing
+    db_pool_recycle: int = 1800  # Seconds; -1 disables
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 0  # 0 disables
+    # PgBouncer in transaction pooling mode: no session-level state (SET, advisory
+    # locks held across transactions, server-side prepared statements)
+    db_pgbouncer_mode: bool = False
     secret_key: str = "change-this-secret-key-in-production"
+    # Bootstrap account, created when admin_users is empty
     admin_email: str = "admin@example.com"
     admin_password: str = "admin123"
     frontend_url: str = "http://localhost:3000"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 43200  # 30 days
+    # Verified tokens are cached per worker so repeat requests skip the signature check
+    auth_token_cache_size: int = 1024
+    auth_token_cache_ttl_seconds: int = 300
+    admin_role_cache_ttl_seconds: int = 60  # Role/deactivation changes apply after at most this long
+
+    # Login: bcrypt runs on a bounded pool; attempts are limited per account
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 16  # Queued + running checks before answering 503
+    login_rate_limit_attempts: int = 5
+    login_rate_limit_window_seconds: int = 300
+
+    # Background job scheduler (runs each job on one worker via advisory locks)
+    scheduler_enabled: bool = True
+    scheduler_tick_seconds: float = 5.0
+
+    # Expiry sweeper (AGUARDANDO -> EXPIRADO after the deadline)
+    expiry_sweep_enabled: bool = True
+    expiry_sweep_interval_seconds: int = 300
+    expiry_sweep_batch_size: int = 500
+
+    # Follow-up queue: how often every open period is rescored
+    queue_score_refresh_interval_seconds: int = 60
+
+    # /public rate limiting (token buckets per worker) and negative cache of unknown tokens
+    public_rate_limit_enabled: bool = True
+    public_ip_rate_per_second: float = 5.0
+    public_ip_burst: float = 60.0
+    public_token_rate_per_second: float = 2.0
+    public_token_burst: float = 30.0
+    public_miss_rate_per_second: float = 0.1  # Unknown-token lookups an IP may make...
+    public_miss_burst: float = 20.0  # ...after this initial allowance
+    public_negative_cache_size: int = 10000
+    public_negative_cache_ttl_seconds: int = 600
+
+    # Response compression (brotli/gzip) and ETags / conditional GETs
+    http_cache_enabled: bool = True
+    http_compression_min_size: int = 1024  # Bytes
+    http_gzip_level: int = 6
+    http_brotli_quality: int = 4
+    http_etag_time_bucket_seconds: int = 60  # Max staleness of "hours open"-style fields on a 304
+    cache_invalidation_compact_interval_seconds: int = 60  # Scheduler job folding the version log
+
+    # Development: record SQL per request, warn on repeated statements (N+1) and budget overruns
+    sql_debug_enabled: bool = False
+    sql_repeated_statement_threshold: int = 5
+    sql_query_budget: int = 0  # Statements per request; 0 disables
+    sql_query_budget_action: str = "log"  # "log" or "raise" (fails the request with a 500)
+
+    # Readiness (/health/ready), cached per worker; each check gives up after the timeout
+    readiness_cache_seconds: float = 2.0
+    readiness_check_timeout_ms: int = 1000
+    readiness_db_max_latency_ms: int = 500
+    readiness_pool_max_saturation: float = 0.9  # Checked-out share of pool_size + max_overflow
+    readiness_scheduler_max_lag_seconds: int = 300  # 0 skips the check
+
+    # Slow-query log: statements over the threshold are logged and kept in slow_queries with
+    # their EXPLAIN plan (captured in the background, once per statement shape per interval)
+    slow_query_threshold_ms: float = 250  # 0 disables
+    slow_query_explain_enabled: bool = True
+    slow_query_explain_interval_seconds: int = 300
+    slow_query_explain_timeout_ms: int = 5000
+    slow_query_log_max_rows: int = 1000  # Older rows are pruned
+    slow_query_queue_size: int = 100  # Pending captures per worker; extra slow queries are only logged
+
+    # On-demand request profiling (admins send X-Profile: 1); profiles kept per worker
+    profile_enabled: bool = True
+    profile_sample_interval_ms: float = 2.0
+    profile_buffer_size: int = 50
+    profile_max_concurrent: int = 2  # Further profile requests run unprofiled
+
+    # Request tracing: spans for handlers, SQL, validation, rendering and file I/O, appended to a file
+    tracing_enabled: bool = False
+    tracing_sample_rate: float = 1.0  # Share of requests without a traceparent header that are traced
+    tracing_exporter: str = "json"  # "json" (one trace per line) or "otlp" (OTLP/JSON export requests)
+    tracing_file: str = "traces.jsonl"
+    tracing_service_name: str = "macro-periods-api"
+
+    # Load shedding: concurrent requests per route group (per worker); queued requests get a 503
+    # with Retry-After when the queue is full or after the timeout. A limit of 0 disables the group
+    load_shedding_enabled: bool = True
+    load_shedding_queue_timeout_seconds: float = 5.0
+    load_shedding_public_limit: int = 20
+    load_shedding_public_queue: int = 100
+    load_shedding_admin_limit: int = 8
+    load_shedding_admin_queue: int = 50
+    load_shedding_exports_limit: int = 2
+    load_shedding_exports_queue: int = 10
+    load_shedding_dashboard_limit: int = 2
+    load_shedding_dashboard_queue: int = 10
+
+    # Production server (gunicorn.conf.py)
+    web_concurrency: int = 0  # Worker processes; 0 = one per available CPU
+    web_max_workers: int = 8  # Cap for the automatic count (each worker has its own DB pool)
+    web_bind: str = "0.0.0.0:8000"
+    web_backlog: int = 2048
+    web_keepalive_seconds: int = 5  # Behind a load balancer, set above its idle timeout
+    web_timeout_seconds: int = 60  # Silent workers are killed and replaced after this long
+    web_graceful_timeout_seconds: int = 30  # In-flight requests get this long to finish on SIGTERM
+    web_max_requests: int = 5000  # Recycle workers after this many requests (0 disables)
+
+    # Admin edit evidence uploads (content-addressed, deduplicated by SHA-256)
+    evidence_upload_dir: str = "uploads/evidence"
+    evidence_max_upload_bytes: int = 5 * 1024 * 1024
+    thumbnail_workers: int = 1  # Processes rendering evidence thumbnails (per worker)
 
     class Config:
         env_file = ".env"
@@ -1,14 +1,209 @@
-from sqlalchemy import create_engine
+import logging
+import queue
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from typing import AsyncGenerator, Generator
+from fastapi import Request
 from .config import get_settings
+from .metrics import Counter, Gauge, Histogram
+from .query_inspector import parameter_shape, statement_shape
+from .read_routing import READ_ONLY, should_use_primary
+from .request_metrics import current_route
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
-engine = create_engine(settings.database_url)
+db_pool_checkout_wait_seconds = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting to check out a database connection from the pool",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+)
+db_pool_checkout_timeouts_total = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout (QueuePool limit reached)",
+    ["engine"]
+)
+db_pool_connections = Gauge(
+    "db_pool_connections",
+    "Database pool occupancy by state",
+    ["engine", "state"]
+)
+db_slow_queries_total = Counter(
+    "db_slow_queries_total", "Statements slower than SLOW_QUERY_THRESHOLD_MS", ["engine"]
+)
+
+
+class _CheckoutTimingMixin:
+    """Records how long each checkout waits for a connection"""
+    engine_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            db_pool_checkout_timeouts_total.inc(engine=self.engine_label)
+            raise
+        finally:
+            db_pool_checkout_wait_seconds.observe(time.perf_counter() - started, engine=self.engine_label)
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    engine_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+
+class InstrumentedReplicaQueuePool(_CheckoutTimingMixin, QueuePool):
+    engine_label = "replica"
+
+
+class InstrumentedAsyncReplicaQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    engine_label = "async_replica"
+
+
+def _pool_kwargs() -> dict:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def _engine_kwargs() -> dict:
+    connect_args = {}
+    if settings.db_statement_timeout_ms and not settings.db_pgbouncer_mode:
+        # PgBouncer rejects unknown startup parameters; see the "begin" listener below
+        connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+    return {"poolclass": InstrumentedQueuePool, "connect_args": connect_args, **_pool_kwargs()}
+
+
+def _async_engine_kwargs() -> dict:
+    connect_args = {}
+    if settings.db_pgbouncer_mode:
+        # asyncpg prepares every statement; transaction pooling can't keep them
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+    elif settings.db_statement_timeout_ms:
+        connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+    return {"poolclass": InstrumentedAsyncQueuePool, "connect_args": connect_args, **_pool_kwargs()}
+
+
+def _async_url(url: str):
+    return make_url(url).set(drivername="postgresql+asyncpg")
+
+
+def _async_database_url():
+    if settings.async_database_url:
+        return settings.async_database_url
+    return _async_url(settings.database_url)
+
+
+engine = create_engine(settings.database_url, **_engine_kwargs())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the high-traffic public routes
+async_engine = create_async_engine(_async_database_url(), **_async_engine_kwargs())
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Optional read replica for read-only endpoints; without one, reads go to the primary
+if settings.database_replica_url:
+    replica_engine = create_engine(
+        settings.database_replica_url, **{**_engine_kwargs(), "poolclass": InstrumentedReplicaQueuePool}
+    )
+    async_replica_engine = create_async_engine(
+        _async_url(settings.database_replica_url),
+        **{**_async_engine_kwargs(), "poolclass": InstrumentedAsyncReplicaQueuePool}
+    )
+else:
+    replica_engine = engine
+    async_replica_engine = async_engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+AsyncReadSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False, expire_on_commit=False)
+
+if settings.db_pgbouncer_mode and settings.db_statement_timeout_ms:
+    # Transaction pooling: session-level SETs would leak to other clients, so scope it per transaction
+    def _set_statement_timeout(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.db_statement_timeout_ms)}")
+
+    for _engine in {engine, async_engine.sync_engine, replica_engine, async_replica_engine.sync_engine}:
+        event.listen(_engine, "begin", _set_statement_timeout)
+
+
+# Slow-query log: every statement is timed; slow ones are logged here and handed to
+# app.slow_queries, which captures their EXPLAIN plan and stores them off the request path
+slow_query_queue: "queue.Queue[dict]" = queue.Queue(maxsize=settings.slow_query_queue_size)
+SLOW_QUERY_LOG_OPTION = "slow_query_log"  # execution_options(slow_query_log=False) skips timing
+
+
+def _start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["slow_query_started"] = time.perf_counter()
+
+
+def _check_statement_duration(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("slow_query_started", None)
+    if started is None:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < settings.slow_query_threshold_ms or not conn.get_execution_options().get(
+        SLOW_QUERY_LOG_OPTION, True
+    ):
+        return
+    engine_label = getattr(conn.engine.pool, "engine_label", "other")
+    route = current_route()
+    shape = statement_shape(statement)
+    params = parameter_shape(parameters, executemany)
+    db_slow_queries_total.inc(engine=engine_label)
+    logger.warning(
+        "Slow query (%.0f ms, %s, %s): %s params=%s", duration_ms, engine_label, route or "-", shape[:500], params
+    )
+    try:
+        slow_query_queue.put_nowait({
+            "engine": engine_label,
+            "route": route,
+            "duration_ms": duration_ms,
+            "statement": statement,
+            "shape": shape,
+            "parameters": parameters,
+            "parameter_shape": params,
+            "executemany": executemany,
+        })
+    except queue.Full:
+        pass  # Already logged; the capture thread is behind, so skip the EXPLAIN and the row
+
+
+if settings.slow_query_threshold_ms > 0:
+    for _engine in {engine, async_engine.sync_engine, replica_engine, async_replica_engine.sync_engine}:
+        event.listen(_engine, "before_cursor_execute", _start_statement_timer)
+        event.listen(_engine, "after_cursor_execute", _check_statement_duration)
+
+
+def pool_occupancy():
+    occupancy = {}
+    pools = [("sync", engine.pool), ("async", async_engine.sync_engine.pool)]
+    if settings.database_replica_url:
+        pools += [("replica", replica_engine.pool), ("async_replica", async_replica_engine.sync_engine.pool)]
+    for label, pool in pools:
+        occupancy[(label, "size")] = pool.size()
+        occupancy[(label, "checked_out")] = pool.checkedout()
+        occupancy[(label, "idle")] = pool.checkedin()
+        occupancy[(label, "overflow")] = max(pool.overflow(), 0)
+    return occupancy
+
+
+db_pool_connections.set_function(pool_occupancy)
+
 Base = declarative_base()
 
 
@@ -18,3 +213,29 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """Session for read-only endpoints: the replica, unless the client wrote recently.
+
+    Flushing changes through it raises ReadOnlySessionError, even without a replica.
+    """
+    session_factory = SessionLocal if should_use_primary(request.scope) else ReadSessionLocal
+    db = session_factory()
+    db.info[READ_ONLY] = True
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    session_factory = AsyncSessionLocal if should_use_primary(request.scope) else AsyncReadSessionLocal
+    async with session_factory() as db:
+        db.info[READ_ONLY] = True
+        yield db
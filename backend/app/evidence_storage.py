@@ -0,0 +1,153 @@
+"""Content-addressed storage for admin edit evidence files.
+
+Uploads are streamed to a temporary file in chunks (blocking file I/O runs in
+the threadpool), hashed with SHA-256 on the fly and then moved to
+``<evidence_upload_dir>/<sha[:2]>/<sha><ext>``. Identical files end up at the
+same path, so AdminEditEvidence rows for the same content share one file.
+"""
+import hashlib
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from .config import get_settings
+from .tracing import traced
+
+settings = get_settings()
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StoredFile:
+    path: str
+    sha256: str
+    size: int
+    deduplicated: bool  # True when the content was already stored
+
+
+def content_path(sha256: str, extension: str) -> Path:
+    return Path(settings.evidence_upload_dir) / sha256[:2] / f"{sha256}{extension.lower()}"
+
+
+def _open_temp(directory: Path) -> BinaryIO:
+    directory.mkdir(parents=True, exist_ok=True)
+    return tempfile.NamedTemporaryFile(dir=directory, prefix=".upload-", delete=False)
+
+
+def _discard(tmp: BinaryIO):
+    tmp.close()
+    try:
+        os.unlink(tmp.name)
+    except FileNotFoundError:
+        pass
+
+
+def _finalize(tmp: BinaryIO, target: Path) -> bool:
+    """Move the temp file into place; returns True if the target already existed"""
+    tmp.flush()
+    os.fsync(tmp.fileno())
+    tmp.close()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # link() fails if the target exists, so concurrent uploads of the same
+        # content never replace a file that rows already point to
+        os.link(tmp.name, target)
+        existed = False
+    except FileExistsError:
+        existed = True
+    os.unlink(tmp.name)
+    return existed
+
+
+@traced("file.store_upload")
+async def store_upload(file: UploadFile, max_bytes: int) -> StoredFile:
+    """
+    Stream an upload into content-addressed storage.
+
+    Raises UploadTooLarge as soon as more than `max_bytes` have been read.
+    """
+    root = Path(settings.evidence_upload_dir)
+    tmp = await run_in_threadpool(_open_temp, root / "tmp")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge()
+            digest.update(chunk)
+            await run_in_threadpool(tmp.write, chunk)
+    except BaseException:
+        await run_in_threadpool(_discard, tmp)
+        raise
+
+    sha256 = digest.hexdigest()
+    target = content_path(sha256, Path(file.filename or "").suffix)
+    existed = await run_in_threadpool(_finalize, tmp, target)
+    return StoredFile(path=str(target), sha256=sha256, size=size, deduplicated=existed)
+
+
+class _ZipSink:
+    """Write-only, unseekable buffer that zipfile writes into while we drain it"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip_bundle(entries: Iterable[Tuple[str, str, datetime]]) -> Iterator[bytes]:
+    """
+    Yield a ZIP archive of (archive name, file path, modified at) entries as it
+    is built, so nothing is buffered beyond one chunk per file.
+
+    Files are stored without compression: evidence is JPEG/PNG/PDF, which
+    would not shrink and would only cost CPU. Missing files are skipped.
+    Blocking I/O; StreamingResponse runs sync iterators in the threadpool.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for arcname, path, modified_at in entries:
+            if not os.path.isfile(path):
+                continue
+            info = zipfile.ZipInfo(arcname, date_time=modified_at.timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            with open(path, "rb") as source, archive.open(info, mode="w", force_zip64=True) as target:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+    # Local headers/descriptors of the last entry and the central directory
+    yield sink.drain()
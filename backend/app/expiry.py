@@ -0,0 +1,86 @@
+"""Expiry sweeper: moves overdue AGUARDANDO periods to EXPIRADO.
+
+Registered as a job in app.jobs. Safe to run from every worker: only the
+holder of the Postgres advisory lock does the work, the others skip the
+round. Overdue rows are found through the partial index on (deadline)
+WHERE status = 'AGUARDANDO' and updated in set-based batches, with one bulk
+insert of audit events per batch.
+"""
+import logging
+from datetime import date, datetime, timezone
+from typing import Optional
+from sqlalchemy import select, update, insert, text
+from .config import get_settings
+from .database import engine
+from .models import MacroPeriod, AuditEvent
+from .models.macro_period import MacroPeriodStatus
+from .models.audit import EventType
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Arbitrary application-wide key for pg_try_advisory_xact_lock
+EXPIRY_LOCK_KEY = 702_001
+
+
+def expire_overdue_periods(batch_size: Optional[int] = None, today: Optional[date] = None) -> int:
+    """Expire every AGUARDANDO period whose deadline has passed.
+
+    Returns the number of expired periods, or 0 if another worker holds the lock.
+    """
+    batch_size = batch_size or settings.expiry_sweep_batch_size
+    today = today or date.today()
+    total = 0
+
+    # The lock is transaction-scoped on its own connection and held until that
+    # transaction ends, so it also works behind PgBouncer transaction pooling
+    with engine.connect() as lock_conn:
+        locked = lock_conn.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": EXPIRY_LOCK_KEY}
+        ).scalar()
+        if not locked:
+            return 0
+
+        with engine.connect() as conn:
+            while True:
+                overdue = select(MacroPeriod.id).where(
+                    MacroPeriod.status == MacroPeriodStatus.AGUARDANDO,
+                    MacroPeriod.deadline < today
+                ).order_by(MacroPeriod.deadline).limit(batch_size).with_for_update(skip_locked=True)
+
+                with conn.begin():
+                    rows = conn.execute(
+                        update(MacroPeriod)
+                        .where(MacroPeriod.id.in_(overdue.scalar_subquery()))
+                        .values(status=MacroPeriodStatus.EXPIRADO)
+                        .returning(MacroPeriod.id, MacroPeriod.deadline)
+                    ).all()
+
+                    if rows:
+                        now = datetime.now(timezone.utc)
+                        conn.execute(insert(AuditEvent), [
+                            {
+                                "macro_period_id": macro_period_id,
+                                "event_type": EventType.EXPIRED,
+                                "created_by": "system",
+                                "created_at": now,
+                                "payload": {"action": "expired", "deadline": str(deadline)}
+                            }
+                            for macro_period_id, deadline in rows
+                        ])
+
+                total += len(rows)
+                if len(rows) < batch_size:
+                    break
+
+        lock_conn.commit()  # Releases the lock
+
+    if total:
+        logger.info("Expired %d overdue macro period(s)", total)
+    return total
+
+
+if __name__ == "__main__":
+    # One-off run, e.g. from cron: python -m app.expiry
+    logging.basicConfig(level=logging.INFO)
+    print(f"Expired {expire_overdue_periods()} period(s)")
@@ -0,0 +1,123 @@
+"""File responses with single byte-range support (RFC 9110) and zero-copy sends.
+
+Starlette's FileResponse always sends the whole file. RangeFileResponse serves
+either the whole file or one byte range, reading it in chunks; when the server
+implements the ASGI ``http.response.zerocopysend`` extension the body is handed
+over as a file descriptor (sendfile) and never copied through Python.
+"""
+import os
+import re
+from typing import Mapping, Optional, Tuple
+import anyio
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+from .tracing import traced
+
+ByteRange = Tuple[int, int]  # inclusive (first, last)
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range_header(value: Optional[str], size: int) -> Optional[ByteRange]:
+    """
+    Parse a Range header for a file of `size` bytes.
+
+    Returns None when the whole file should be sent (no header, a unit other
+    than bytes or several ranges, which we are allowed to ignore) and raises
+    RangeNotSatisfiable for a single range outside the file.
+    """
+    if not value:
+        return None
+    match = _RANGE_RE.match(value.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match / If-Range value against our ETag"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    ours = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == ours for tag in header.split(","))
+
+
+class RangeFileResponse(FileResponse):
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        byte_range: Optional[ByteRange] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        filename: Optional[str] = None,
+        content_disposition_type: str = "attachment",
+    ):
+        size = stat_result.st_size
+        self.byte_range = byte_range
+        super().__init__(
+            path,
+            status_code=206 if byte_range else 200,
+            headers=headers,
+            media_type=media_type,
+            filename=filename,
+            stat_result=stat_result,
+            content_disposition_type=content_disposition_type,
+        )
+        self.headers["accept-ranges"] = "bytes"
+        if byte_range:
+            first, last = byte_range
+            self.headers["content-range"] = f"bytes {first}-{last}/{size}"
+            self.headers["content-length"] = str(last - first + 1)
+
+    @traced("file.send")
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        offset, end = self.byte_range or (0, self.stat_result.st_size - 1)
+        count = end - offset + 1
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.wrapped.fileno(),
+                    "offset": offset,
+                    "count": count,
+                    "more_body": False,
+                })
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(offset)
+                remaining = count
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining > 0:
+                    # File shrank while sending
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+        if self.background is not None:
+            await self.background()
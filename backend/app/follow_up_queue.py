@@ -0,0 +1,131 @@
+"""Urgency scores of the follow-up queue (GET /macro-periods/queue).
+
+A period's score adds up its priority, the distance to its deadline, the
+hours it has been open and its doctor's response history. Scores are stored
+in macro_period_queue_scores, indexed on (urgency_score, macro_period_id), so
+each queue page is an index range scan instead of scoring and sorting every
+open period.
+
+create/update score their period in their own transaction (score_periods).
+The refresh_queue_scores job, registered in app.jobs, rescores every open
+period every QUEUE_SCORE_REFRESH_INTERVAL_SECONDS (hours open, deadlines and
+doctor histories move on their own) and drops the rows of periods that are
+no longer open. Its cost grows with the backlog, but it runs once per
+interval on one worker instead of once per page.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from sqlalchemy import select, delete, func, case, cast, literal, Integer, Float
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from .database import engine
+from .models import MacroPeriod, MacroPeriodQueueScore
+from .models.macro_period import MacroPeriodStatus, Priority
+
+logger = logging.getLogger(__name__)
+
+# Urgency score points
+QUEUE_PRIORITY_POINTS = {
+    Priority.URGENTE: 400,
+    Priority.ALTA: 250,
+    Priority.NORMAL: 100,
+    Priority.BAIXA: 0,
+}
+QUEUE_DEADLINE_MAX_POINTS = 500  # Reached 4 days after the deadline
+QUEUE_DEADLINE_POINTS_PER_DAY = 50  # Starts counting 6 days before the deadline
+QUEUE_HOURS_OPEN_POINTS_PER_HOUR = 2
+QUEUE_HOURS_OPEN_MAX_POINTS = 300
+QUEUE_NO_HISTORY_POINTS = 100
+
+
+def hours_open(as_of: datetime):
+    return func.extract('epoch', literal(as_of) - MacroPeriod.created_at) / 3600
+
+
+def days_to_deadline(as_of: datetime):
+    return MacroPeriod.deadline - literal(as_of.date())
+
+
+def doctor_history(doctor_ids):
+    """Response rate and average response hours per doctor, from their closed periods"""
+    return select(
+        MacroPeriod.doctor_id.label("doctor_id"),
+        (cast(func.count(MacroPeriod.responded_at), Float) / func.count()).label("response_rate"),
+        func.avg(
+            func.extract('epoch', MacroPeriod.responded_at - MacroPeriod.created_at) / 3600
+        ).label("avg_response_hours")
+    ).where(
+        MacroPeriod.status != MacroPeriodStatus.AGUARDANDO,
+        MacroPeriod.doctor_id.in_(doctor_ids)
+    ).group_by(MacroPeriod.doctor_id)
+
+
+def scores_query(as_of: datetime, period_ids: Optional[Iterable[int]] = None):
+    """(macro_period_id, urgency_score, scored_at) of the open periods, or of the open ones among period_ids"""
+    open_periods = [MacroPeriod.status == MacroPeriodStatus.AGUARDANDO]
+    if period_ids is not None:
+        open_periods.append(MacroPeriod.id.in_(list(period_ids)))
+
+    # Doctor response history, only for doctors that have periods to score
+    history = doctor_history(select(MacroPeriod.doctor_id).where(*open_periods).distinct()).subquery()
+
+    priority_points = case(
+        *[(MacroPeriod.priority == priority, points) for priority, points in QUEUE_PRIORITY_POINTS.items()],
+        else_=0
+    )
+    deadline_points = case(
+        (MacroPeriod.deadline.is_(None), 0),
+        else_=func.least(
+            QUEUE_DEADLINE_MAX_POINTS,
+            func.greatest(0, 300 - QUEUE_DEADLINE_POINTS_PER_DAY * days_to_deadline(as_of))
+        )
+    )
+    hours_open_points = func.least(
+        QUEUE_HOURS_OPEN_MAX_POINTS, hours_open(as_of) * QUEUE_HOURS_OPEN_POINTS_PER_HOUR
+    )
+    # Doctors who rarely or slowly answer need earlier follow-up (0-300 points)
+    history_points = func.coalesce(
+        (1 - history.c.response_rate) * 200 + func.least(100, func.coalesce(history.c.avg_response_hours, 0)),
+        QUEUE_NO_HISTORY_POINTS
+    )
+    urgency_score = cast(
+        func.round(priority_points + deadline_points + hours_open_points + history_points), Integer
+    )
+
+    return select(
+        MacroPeriod.id, urgency_score, literal(as_of)
+    ).outerjoin(
+        history, history.c.doctor_id == MacroPeriod.doctor_id
+    ).where(*open_periods)
+
+
+def _upsert_scores(query):
+    stmt = pg_insert(MacroPeriodQueueScore).from_select(
+        ["macro_period_id", "urgency_score", "scored_at"], query
+    )
+    # Unchanged scores are left alone: no dead tuples, no cache invalidation
+    return stmt.on_conflict_do_update(
+        index_elements=[MacroPeriodQueueScore.macro_period_id],
+        set_={"urgency_score": stmt.excluded.urgency_score, "scored_at": stmt.excluded.scored_at},
+        where=MacroPeriodQueueScore.urgency_score != stmt.excluded.urgency_score
+    )
+
+
+def score_periods(db, period_ids: Iterable[int]):
+    """Score these periods now, in the caller's transaction (a Session or a Connection)"""
+    db.execute(_upsert_scores(scores_query(datetime.now(timezone.utc), period_ids)))
+
+
+def refresh_queue_scores() -> int:
+    """Rescore every open period and drop the scores of closed ones. Returns the rows changed."""
+    with engine.begin() as conn:
+        changed = conn.execute(_upsert_scores(scores_query(datetime.now(timezone.utc)))).rowcount
+        changed += conn.execute(
+            delete(MacroPeriodQueueScore).where(
+                MacroPeriodQueueScore.macro_period_id == MacroPeriod.id,
+                MacroPeriod.status != MacroPeriodStatus.AGUARDANDO
+            )
+        ).rowcount
+    if changed:
+        logger.info("Refreshed %d follow-up queue score(s)", changed)
+    return changed
@@ -0,0 +1,148 @@
+"""Readiness checks for load balancers (GET /health/ready).
+
+/health stays a constant liveness answer: it only says the worker's event
+loop is running, so a slow database never gets a worker restarted.
+Readiness answers 503 when this worker shouldn't get traffic:
+
+- database: round trip (reading alembic_version) slower than
+  READINESS_DB_MAX_LATENCY_MS, or failing;
+- pool: a connection pool with READINESS_POOL_MAX_SATURATION of its
+  pool_size + max_overflow checked out;
+- migrations: alembic_version differs from the head revision of the code;
+- uploads: the evidence directory isn't writable;
+- scheduler: the job scheduler thread hasn't ticked for
+  READINESS_SCHEDULER_MAX_LAG_SECONDS (when it's enabled).
+
+Checks run concurrently and each gives up after
+READINESS_CHECK_TIMEOUT_MS. Results are cached per worker for
+READINESS_CACHE_SECONDS, and concurrent probes share one run.
+"""
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from .config import get_settings
+from .database import async_engine, pool_occupancy
+from .jobs import scheduler
+from .metrics import Gauge
+
+settings = get_settings()
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+readiness_check_ok = Gauge("readiness_check_ok", "Last readiness result per check (1 ok, 0 failing)", ["check"])
+
+_cached: Optional[Tuple[float, dict]] = None  # (monotonic time, result)
+_lock = asyncio.Lock()
+_head_revision: Optional[str] = None
+
+
+def head_revision() -> str:
+    """Head revision of the migrations shipped with this code (read once)"""
+    global _head_revision
+    if _head_revision is None:
+        config = Config(str(ALEMBIC_INI))
+        config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+        _head_revision = ScriptDirectory.from_config(config).get_current_head()
+    return _head_revision
+
+
+async def _check_database() -> Tuple[dict, dict]:
+    """Round trip and migration state from one query"""
+    started = time.perf_counter()
+    async with async_engine.connect() as conn:
+        current = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+    latency_ms = (time.perf_counter() - started) * 1000
+    head = await run_in_threadpool(head_revision)
+    database = {"ok": latency_ms <= settings.readiness_db_max_latency_ms, "latency_ms": round(latency_ms, 1)}
+    migrations = {"ok": current == head, "current": current, "head": head}
+    return database, migrations
+
+
+def _check_pools() -> dict:
+    occupancy = pool_occupancy()
+    capacity = settings.db_pool_size + settings.db_max_overflow
+    pools = {}
+    for label in sorted({label for label, _ in occupancy}):
+        checked_out = occupancy[(label, "checked_out")]
+        pools[label] = {
+            "checked_out": checked_out,
+            "capacity": capacity,
+            "saturation": round(checked_out / capacity, 2) if capacity > 0 else 0.0,
+        }
+    # max_overflow=-1 means no limit, so the pool can't saturate
+    ok = settings.db_max_overflow < 0 or all(
+        pool["saturation"] < settings.readiness_pool_max_saturation for pool in pools.values()
+    )
+    return {"ok": ok, **pools}
+
+
+def _check_uploads() -> dict:
+    directory = Path(settings.evidence_upload_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=".ready-"):
+        pass
+    return {"ok": True, "path": str(directory)}
+
+
+def _check_scheduler() -> dict:
+    if not settings.scheduler_enabled or not settings.readiness_scheduler_max_lag_seconds:
+        return {"ok": True, "enabled": False}
+    if scheduler.last_tick is None:
+        return {"ok": False, "enabled": True, "lag_seconds": None}
+    lag = time.time() - scheduler.last_tick
+    return {"ok": lag <= settings.readiness_scheduler_max_lag_seconds, "enabled": True, "lag_seconds": round(lag, 1)}
+
+
+async def _guarded(awaitable) -> object:
+    try:
+        return await asyncio.wait_for(awaitable, settings.readiness_check_timeout_ms / 1000)
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": f"timed out after {settings.readiness_check_timeout_ms} ms"}
+    except Exception as exc:
+        return {"ok": False, "error": f"{type(exc).__name__}: {exc}"[:300]}
+
+
+async def _run_checks() -> dict:
+    database, uploads = await asyncio.gather(
+        _guarded(_check_database()),
+        _guarded(run_in_threadpool(_check_uploads)),
+    )
+    if isinstance(database, tuple):
+        database, migrations = database
+    else:
+        migrations = {"ok": False, "error": "database unavailable"}
+    checks: Dict[str, dict] = {
+        "database": database,
+        "pool": _check_pools(),
+        "migrations": migrations,
+        "uploads": uploads,
+        "scheduler": _check_scheduler(),
+    }
+    for name, check in checks.items():
+        readiness_check_ok.set(1 if check["ok"] else 0, check=name)
+    return {
+        "status": "ready" if all(check["ok"] for check in checks.values()) else "not_ready",
+        "checked_at": datetime.now(timezone.utc).isoformat(),
+        "checks": checks,
+    }
+
+
+async def readiness() -> Tuple[dict, bool]:
+    """(result, served from cache)"""
+    global _cached
+    if _cached is not None and time.monotonic() - _cached[0] < settings.readiness_cache_seconds:
+        return _cached[1], True
+    async with _lock:
+        # Probes that waited for the lock use the run that just finished
+        if _cached is not None and time.monotonic() - _cached[0] < settings.readiness_cache_seconds:
+            return _cached[1], True
+        result = await _run_checks()
+        _cached = (time.monotonic(), result)
+        return result, False
@@ -0,0 +1,213 @@
+"""Response compression and conditional GETs.
+
+HTTPCacheMiddleware (pure ASGI) handles single-body responses (JSON, CSV,
+plain Response); streamed and file responses pass through untouched:
+
+- bodies of compressible types above `http_compression_min_size` are sent
+  with brotli or gzip, whichever the client prefers (brotli first);
+- GET responses under /macro-periods, /units and /doctors get a weak ETag
+  (hash of the uncompressed body) and a matching If-None-Match returns 304.
+
+For the hottest endpoints the `conditional_get` dependency goes further: the
+ETag comes from the resource versions (every write statement logs a
+cache_invalidations row through a trigger), so a client whose copy is
+current gets its 304 before the endpoint runs any query.
+"""
+import gzip
+import hashlib
+import time
+from typing import Callable, Optional
+import anyio
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import get_settings
+from .database import engine, get_read_db
+from .file_responses import etag_matches
+from .metrics import Counter
+from .models import CacheVersion, CacheInvalidation
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+settings = get_settings()
+
+ETAG_PATH_PREFIXES = ("/macro-periods", "/units", "/doctors")
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+REVALIDATE = "private, no-cache"  # Browsers keep the copy but always revalidate with If-None-Match
+# Bodies larger than this are compressed in a worker thread instead of on the event loop
+THREAD_COMPRESSION_SIZE = 64 * 1024
+
+http_revalidations_total = Counter(
+    "http_revalidations_total",
+    "Requests with If-None-Match, by ETag source and result (not_modified/modified)",
+    ["source", "result"]
+)
+
+
+def _revalidate(if_none_match: Optional[str], etag: str, source: str) -> bool:
+    if not if_none_match:
+        return False
+    matched = etag_matches(if_none_match, etag)
+    http_revalidations_total.inc(source=source, result="not_modified" if matched else "modified")
+    return matched
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() == coding:
+            params = params.replace(" ", "")
+            return params not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    if not accept_encoding:
+        return None
+    if brotli is not None and _accepts(accept_encoding, "br"):
+        return "br"
+    if _accepts(accept_encoding, "gzip"):
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.http_brotli_quality)
+    return gzip.compress(body, compresslevel=settings.http_gzip_level)
+
+
+def body_etag(body: bytes) -> str:
+    return 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class HTTPCacheMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.http_cache_enabled or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        use_etag = scope["method"] == "GET" and scope["path"].startswith(ETAG_PATH_PREFIXES)
+        if encoding is None and not use_etag:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        streaming = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, streaming
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or streaming:
+                await send(message)
+                return
+            if message.get("more_body"):
+                # Streamed response (files, ZIP, CSV generators): leave it alone
+                streaming = True
+                await send(start_message)
+                await send(message)
+                return
+            await self._send_complete(scope, request_headers, encoding, use_etag, start_message, message, send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_complete(self, scope, request_headers, encoding, use_etag, start_message, message, send):
+        body = message.get("body", b"")
+        headers = MutableHeaders(raw=start_message["headers"])
+        status = start_message["status"]
+        compressible = (
+            len(body) >= settings.http_compression_min_size
+            and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            and "content-encoding" not in headers
+        )
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+
+        if use_etag and status == 200:
+            versions_etag = scope.get("state", {}).get("etag")
+            etag = versions_etag or headers.get("etag") or body_etag(body)
+            headers["etag"] = etag
+            if "cache-control" not in headers:
+                headers["cache-control"] = REVALIDATE
+            # A matching versions ETag was already answered (and counted) by conditional_get
+            if not versions_etag and _revalidate(request_headers.get("if-none-match"), etag, "body"):
+                not_modified = MutableHeaders()
+                for name in ("etag", "cache-control", "vary"):
+                    if name in headers:
+                        not_modified[name] = headers[name]
+                await send({"type": "http.response.start", "status": 304, "headers": not_modified.raw})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        if compressible and encoding:
+            if len(body) > THREAD_COMPRESSION_SIZE:
+                compressed = await anyio.to_thread.run_sync(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            if len(compressed) < len(body):
+                body = compressed
+                headers["content-encoding"] = encoding
+                headers["content-length"] = str(len(body))
+
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body})
+
+
+def _versions_etag(request: Request, versions, time_bucket: bool) -> str:
+    key = f"{request.url.path}?{request.url.query}|{sorted(versions)}"
+    if time_bucket:
+        # Responses that depend on the clock (hours open, "today") change even without writes
+        key += f"|{int(time.time() // settings.http_etag_time_bucket_seconds)}"
+    return 'W/"v-' + hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '"'
+
+
+def conditional_get(*names: str, time_bucket: bool = False) -> Callable:
+    """
+    Dependency answering 304 from the cache_versions counters before the endpoint runs.
+
+    Declare it after get_current_user so unauthenticated requests never get a 304.
+    The versions are read before the endpoint's own queries, so a response is
+    never labelled with a version newer than its data.
+    """
+    def dependency(request: Request, db: Session = Depends(get_read_db)):
+        if not settings.http_cache_enabled:
+            return
+        # One statement, so a concurrent compaction is seen entirely or not at all
+        pending = select(func.count()).where(CacheInvalidation.name == CacheVersion.name).scalar_subquery()
+        versions = db.execute(
+            select(CacheVersion.name, CacheVersion.version + pending).where(CacheVersion.name.in_(names))
+        ).all()
+        etag = _versions_etag(request, [tuple(row) for row in versions], time_bucket)
+        request.state.etag = etag  # HTTPCacheMiddleware uses it instead of hashing the body
+        if _revalidate(request.headers.get("if-none-match"), etag, "versions"):
+            raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+    return dependency
+
+
+def compact_cache_invalidations() -> int:
+    """Fold the committed cache_invalidations rows into cache_versions (versions don't change).
+
+    Registered as a job in app.jobs; keeps the per-request count in conditional_get short.
+    Rows of transactions still in flight are invisible to the DELETE and folded next time.
+    """
+    with engine.begin() as conn:
+        return sum(conn.execute(text("""
+            WITH folded AS (DELETE FROM cache_invalidations RETURNING name)
+            UPDATE cache_versions v SET version = v.version + f.n
+            FROM (SELECT name, count(*) AS n FROM folded GROUP BY name) f
+            WHERE v.name = f.name
+            RETURNING f.n
+        """)).scalars())
@@ -0,0 +1,138 @@
+"""In-process periodic job scheduler.
+
+Every uvicorn worker runs a scheduler thread, but each job run is guarded by
+a Postgres advisory lock (pg_try_advisory_xact_lock) keyed by the job name,
+and a job is skipped when job_runs shows it already ran within its interval.
+So a job runs on exactly one worker per interval, whichever gets there first.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import select, insert, func, text
+from .config import get_settings
+from .database import engine
+from .models.job_run import JobRun, JobRunStatus
+from .expiry import expire_overdue_periods
+from .http_cache import compact_cache_invalidations
+from .follow_up_queue import refresh_queue_scores
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def worker_id() -> str:
+    # Not a module constant: with gunicorn's preload_app this module is imported before the fork
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _lock_key(job_name: str) -> int:
+    """Stable advisory lock key for a job name"""
+    return zlib.crc32(f"job:{job_name}".encode())
+
+
+class Job:
+    def __init__(self, name: str, func: Callable[[], Any], interval_seconds: int):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.next_run = 0.0  # monotonic time of the next attempt on this worker
+
+
+class JobScheduler:
+    def __init__(self, tick_seconds: float = 5.0):
+        self.tick_seconds = tick_seconds
+        self.jobs: Dict[str, Job] = {}
+        self.last_tick: Optional[float] = None  # time.time() of the last loop iteration
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, func: Callable[[], Any], interval_seconds: int):
+        self.jobs[name] = Job(name, func, interval_seconds)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.last_tick = time.time()
+            for job in list(self.jobs.values()):
+                if self._stop.is_set():
+                    break
+                if time.monotonic() < job.next_run:
+                    continue
+                ran = False
+                try:
+                    ran = self.run_job(job)
+                except Exception:
+                    logger.exception("Scheduler failed to run job %s", job.name)
+                # If another worker ran it (or holds the lock), check again sooner than a full interval
+                delay = job.interval_seconds if ran else min(job.interval_seconds, self.tick_seconds * 6)
+                job.next_run = time.monotonic() + delay
+            self._stop.wait(self.tick_seconds)
+
+    def run_job(self, job: Job) -> bool:
+        """Run a job if this worker wins the lock and it is due. Returns True if it ran."""
+        key = _lock_key(job.name)
+        # Transaction-scoped lock, held while the job runs on other connections and
+        # released by the commit that records the run (PgBouncer-safe)
+        with engine.connect() as conn:
+            locked = conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": key}).scalar()
+            if not locked:
+                return False
+
+            # Another worker may have run it moments ago; the lock only serializes runs
+            last_started = conn.execute(
+                select(func.max(JobRun.started_at)).where(JobRun.job_name == job.name)
+            ).scalar()
+            due_after = datetime.now(timezone.utc) - timedelta(seconds=job.interval_seconds - self.tick_seconds)
+            if last_started and last_started > due_after:
+                return False
+
+            started_at = datetime.now(timezone.utc)
+            started = time.perf_counter()
+            result, error = None, None
+            try:
+                result = job.func()
+                status = JobRunStatus.SUCCESS
+            except Exception as e:
+                logger.exception("Job %s failed", job.name)
+                status = JobRunStatus.FAILED
+                error = str(e)
+
+            conn.execute(insert(JobRun).values(
+                job_name=job.name,
+                status=status,
+                started_at=started_at,
+                finished_at=datetime.now(timezone.utc),
+                duration_ms=int((time.perf_counter() - started) * 1000),
+                worker=worker_id(),
+                result={"value": result} if result is not None else None,
+                error=error
+            ))
+            conn.commit()
+            return True
+
+
+scheduler = JobScheduler(tick_seconds=settings.scheduler_tick_seconds)
+
+if settings.expiry_sweep_enabled:
+    scheduler.register("expire_overdue_periods", expire_overdue_periods, settings.expiry_sweep_interval_seconds)
+scheduler.register(
+    "compact_cache_invalidations", compact_cache_invalidations, settings.cache_invalidation_compact_interval_seconds
+)
+scheduler.register("refresh_queue_scores", refresh_queue_scores, settings.queue_score_refresh_interval_seconds)
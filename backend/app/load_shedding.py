@@ -0,0 +1,185 @@
+"""Per-route-group concurrency limits with bounded queues (load shedding).
+
+Requests are grouped by the route that will handle them:
+
+- public: /public/... (doctor links: views, submissions, calendars);
+- exports: CSV exports and evidence ZIP bundles;
+- dashboard: /macro-periods/metrics/dashboard;
+- admin: every other admin API route.
+
+Health checks, /metrics, login (bounded by its own password pool), the
+docs and unknown paths are never limited.
+
+Each group runs at most LOAD_SHEDDING_<GROUP>_LIMIT requests at a time.
+Further requests wait in a FIFO queue of at most LOAD_SHEDDING_<GROUP>_QUEUE
+entries. A request that would overflow the queue, or that is still queued
+after LOAD_SHEDDING_QUEUE_TIMEOUT_SECONDS, gets a 503 with Retry-After.
+A burst of exports then queues behind two export slots instead of taking
+the threadpool and the connection pool from doctor submissions.
+
+Limits are per worker process, like the connection pool: keep the sync
+groups (admin, exports, dashboard) within pool_size + max_overflow.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from .config import get_settings
+from .metrics import Counter, Gauge, Histogram
+from .request_metrics import match_route
+from .tracing import span
+
+settings = get_settings()
+
+PUBLIC, ADMIN, EXPORTS, DASHBOARD = "public", "admin", "exports", "dashboard"
+UNLIMITED_PATHS = {
+    "/", "/auth/login", "/health", "/health/ready", "/metrics",
+    "/openapi.json", "/docs", "/docs/oauth2-redirect", "/redoc",
+}
+DASHBOARD_PATHS = {"/macro-periods/metrics/dashboard"}
+EXPORT_SUFFIXES = (".csv", ".zip")
+
+load_shedding_rejected_total = Counter(
+    "load_shedding_rejected_total", "Requests answered 503 by the concurrency limits", ["group", "reason"]
+)
+load_shedding_queue_wait_seconds = Histogram(
+    "load_shedding_queue_wait_seconds",
+    "Time admitted requests waited for a slot in their group",
+    ["group"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+load_shedding_requests = Gauge(
+    "load_shedding_requests", "Requests running and queued per group (this worker)", ["group", "state"]
+)
+
+
+class ConcurrencyLimiter:
+    """At most `limit` holders; up to `max_queue` waiters, admitted in arrival order"""
+
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float) -> Optional[str]:
+        """None once a slot is held, else why not: "queue_full" or "timeout" """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait([waiter], timeout=timeout)
+        except BaseException:
+            # Cancelled (client gone): give back a slot handed over meanwhile
+            self._abandon(waiter)
+            raise
+        if waiter.done():
+            return None  # release() passed its slot on; self.active already counts it
+        self._abandon(waiter)
+        return "timeout"
+
+    def _abandon(self, waiter: asyncio.Future):
+        if waiter.done() and not waiter.cancelled():
+            self.release()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # The slot goes straight to the next waiter
+                return
+        self.active -= 1
+
+
+limiters: Dict[str, ConcurrencyLimiter] = {
+    PUBLIC: ConcurrencyLimiter(settings.load_shedding_public_limit, settings.load_shedding_public_queue),
+    ADMIN: ConcurrencyLimiter(settings.load_shedding_admin_limit, settings.load_shedding_admin_queue),
+    EXPORTS: ConcurrencyLimiter(settings.load_shedding_exports_limit, settings.load_shedding_exports_queue),
+    DASHBOARD: ConcurrencyLimiter(settings.load_shedding_dashboard_limit, settings.load_shedding_dashboard_queue),
+}
+
+
+def _occupancy():
+    occupancy = {}
+    for group, limiter in limiters.items():
+        occupancy[(group, "running")] = limiter.active
+        occupancy[(group, "queued")] = limiter.queued
+    return occupancy
+
+
+load_shedding_requests.set_function(_occupancy)
+
+
+def route_group(path: str) -> Optional[str]:
+    """Group of a route path template, None when it isn't limited"""
+    if path in UNLIMITED_PATHS:
+        return None
+    if path.startswith("/public/"):
+        return PUBLIC
+    if path in DASHBOARD_PATHS:
+        return DASHBOARD
+    if path.endswith(EXPORT_SUFFIXES):
+        return EXPORTS
+    return ADMIN
+
+
+class LoadSheddingMiddleware:
+    """Added by main.py when LOAD_SHEDDING_ENABLED is set"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._groups: Dict[str, Optional[str]] = {}  # Route path -> group
+        self._rejection = JSONResponse(
+            {"detail": "Server busy, try again shortly"},
+            status_code=503,
+            headers={"Retry-After": str(max(1, math.ceil(settings.load_shedding_queue_timeout_seconds)))},
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = match_route(scope, allow_partial=False)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        group = self._groups.get(route.path, "")
+        if group == "":
+            group = self._groups[route.path] = route_group(route.path)
+        limiter = limiters.get(group)
+        if limiter is None or limiter.limit <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        with span("load_shedding.wait", group=group) as wait_span:
+            rejected = await limiter.acquire(settings.load_shedding_queue_timeout_seconds)
+            if wait_span is not None and rejected:
+                wait_span.set(rejected=rejected)
+        if rejected:
+            load_shedding_rejected_total.inc(group=group, reason=rejected)
+            await self._rejection(scope, receive, send)
+            return
+        load_shedding_queue_wait_seconds.observe(time.perf_counter() - started, group=group)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -1,20 +1,59 @@
-from fastapi import FastAPI, Depends, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+import logging
 from sqlalchemy.orm import Session
 from datetime import timedelta
+from starlette.concurrency import run_in_threadpool
 from .config import get_settings
 from .database import get_db
-from .auth import verify_password, get_password_hash, create_access_token
-from .api import units, doctors, macro_periods, public
+from .auth import authenticate_admin, create_access_token, ensure_bootstrap_admin
+from .jobs import scheduler
+from .thumbnails import shutdown_pool as shutdown_thumbnail_pool
+from .metrics import render_metrics
+from .health import readiness
+from .read_routing import ReadYourWritesMiddleware
+from .http_cache import HTTPCacheMiddleware
+from .request_metrics import RequestMetricsMiddleware
+from .query_inspector import SQLDebugMiddleware
+from .profiling import ProfilingMiddleware
+from .tracing import TracingMiddleware, instrument_routes
+from .load_shedding import LoadSheddingMiddleware
+from .slow_queries import capture as slow_query_capture
+from .api import units, doctors, macro_periods, public, jobs, profiles, slow_queries
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await run_in_threadpool(ensure_bootstrap_admin)
+    except Exception:
+        logger.exception("Could not create the bootstrap admin account (migrations not applied?)")
+    # Every worker starts a scheduler; advisory locks make each job run on only one
+    if settings.scheduler_enabled:
+        scheduler.start()
+    if settings.slow_query_threshold_ms > 0:
+        slow_query_capture.start()
+    yield
+    scheduler.stop()
+    slow_query_capture.stop()
+    shutdown_thumbnail_pool()
+
+
 app = FastAPI(
     title="Sistema de Gestão de Macro Períodos",
     description="Sistema para gerenciamento de disponibilidade de médicos",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Innermost, so CORS headers reach the 503s it sends to browsers
+if settings.load_shedding_enabled:
+    app.add_middleware(LoadSheddingMiddleware)
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -23,12 +62,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(HTTPCacheMiddleware)
+if settings.sql_debug_enabled:
+    app.add_middleware(SQLDebugMiddleware)
+app.add_middleware(ProfilingMiddleware)
+if settings.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+app.add_middleware(RequestMetricsMiddleware)  # Outermost: times everything above
 
 # Include routers
 app.include_router(public.router)
 app.include_router(units.router)
 app.include_router(doctors.router)
 app.include_router(macro_periods.router)
+app.include_router(jobs.router)
+app.include_router(profiles.router)
+app.include_router(slow_queries.router)
 
 
 @app.get("/")
@@ -41,20 +91,42 @@ def read_root():
 
 
 @app.post("/auth/login")
-def login(email: str, password: str):
-    """Simple admin login - in production, use proper user management"""
-    if email == settings.admin_email and password == settings.admin_password:
-        access_token = create_access_token(
-            data={"sub": email},
-            expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
-        )
-        return {
-            "access_token": access_token,
-            "token_type": "bearer"
-        }
-    raise HTTPException(status_code=401, detail="Invalid credentials")
+async def login(email: str, password: str):
+    """Admin login against admin_users (rate-limited per account)"""
+    user = await authenticate_admin(email, password)
+    access_token = create_access_token(
+        data={"sub": user["email"]},
+        expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer"
+    }
 
 
 @app.get("/health")
 def health_check():
+    """Liveness: constant, so database trouble never gets a worker restarted"""
     return {"status": "healthy"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness for load balancers: 503 while a dependency of this worker is degraded"""
+    result, cached = await readiness()
+    return JSONResponse(
+        content={**result, "cached": cached},
+        status_code=200 if result["status"] == "ready" else 503,
+        headers={"Cache-Control": "no-store"}
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (values are per worker process)"""
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+# Last: wraps every route defined above in a handler span
+if settings.tracing_enabled:
+    instrument_routes(app.routes)
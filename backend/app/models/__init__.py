@@ -5,5 +5,10 @@ from .macro_period_unit import MacroPeriodUnit
 from .selection import MacroPeriodSelection
 from .audit import AuditEvent
 from .admin_edit_evidence import AdminEditEvidence
+from .job_run import JobRun
+from .admin_user import AdminUser
+from .cache_version import CacheVersion, CacheInvalidation
+from .slow_query import SlowQuery
+from .queue_score import MacroPeriodQueueScore
 
-__all__ = ["Unit", "Doctor", "MacroPeriod", "MacroPeriodUnit", "MacroPeriodSelection", "AuditEvent", "AdminEditEvidence"]
+__all__ = ["Unit", "Doctor", "MacroPeriod", "MacroPeriodUnit", "MacroPeriodSelection", "AuditEvent", "AdminEditEvidence", "JobRun", "AdminUser", "CacheVersion", "CacheInvalidation", "SlowQuery", "MacroPeriodQueueScore"]
@@ -12,10 +12,20 @@ class AdminEditEvidence(Base):
     file_path = Column(String(500), nullable=False)
     original_filename = Column(String(255))
     file_size = Column(Integer)
+    sha256 = Column(String(64), index=True)  # Content hash; rows with the same hash share file_path
     mime_type = Column(String(100))
+    thumbnail_path = Column(String(500))  # Generated after upload (app.thumbnails)
+    thumbnail_width = Column(Integer)
+    thumbnail_height = Column(Integer)
     notes = Column(Text)
     uploaded_by = Column(String(255))
     uploaded_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     # Relationship
     macro_period = relationship("MacroPeriod", back_populates="admin_evidences")
+
+    @property
+    def thumbnail_url(self):
+        if not self.thumbnail_path:
+            return None
+        return f"/macro-periods/{self.macro_period_id}/evidences/{self.id}/thumbnail"
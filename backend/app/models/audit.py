@@ -14,6 +14,7 @@ class EventType(str, enum.Enum):
     UPDATED = "UPDATED"
     CONFIRMED = "CONFIRMED"
     CANCELLED = "CANCELLED"
+    EXPIRED = "EXPIRED"
 
 
 class AuditEvent(Base):
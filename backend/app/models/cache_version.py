@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, BigInteger, Identity
+from ..database import Base
+
+
+class CacheVersion(Base):
+    """Data version per resource: this counter plus its pending CacheInvalidation rows.
+
+    Used as the ETag of the hottest GET endpoints, so a matching If-None-Match
+    is answered without running their queries.
+    """
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+class CacheInvalidation(Base):
+    """One row per write statement to a table behind a resource (statement-level triggers).
+
+    Insert-only, so concurrent writers never wait on each other (migration 016);
+    the compact_cache_invalidations job folds the rows into cache_versions.
+    """
+    __tablename__ = "cache_invalidations"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    name = Column(String(50), nullable=False, index=True)
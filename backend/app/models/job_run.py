@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index, Enum as SQLEnum
+from datetime import datetime, timezone
+import enum
+from ..database import Base
+
+
+class JobRunStatus(str, enum.Enum):
+    SUCCESS = "SUCCESS"
+    FAILED = "FAILED"
+
+
+class JobRun(Base):
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String(100), nullable=False)
+    status = Column(SQLEnum(JobRunStatus), nullable=False)
+    started_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+    worker = Column(String(255), nullable=True)  # hostname:pid of the worker that ran the job
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index('ix_job_runs_job_name_started_at', 'job_name', 'started_at'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, text, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 import enum
@@ -36,6 +36,24 @@ class MacroPeriod(Base):
     created_by = Column(String, nullable=False)
     responded_at = Column(DateTime(timezone=True), nullable=True)
 
+    __table_args__ = (
+        # Only open requests are scanned for expiry, so keep the index small
+        Index(
+            'ix_macro_periods_deadline_aguardando', 'deadline',
+            postgresql_where=text("status = 'AGUARDANDO'")
+        ),
+        # Covers every column the follow-up queue scores, so open rows come from the index alone
+        Index(
+            'ix_macro_periods_open_queue', 'priority', 'deadline', 'created_at', 'doctor_id',
+            postgresql_where=text("status = 'AGUARDANDO'")
+        ),
+        # Per-doctor response history (index-only aggregate)
+        Index(
+            'ix_macro_periods_doctor_history', 'doctor_id',
+            postgresql_include=['status', 'created_at', 'responded_at']
+        ),
+    )
+
     # Relationships
     doctor = relationship("Doctor", back_populates="macro_periods")
     units = relationship("MacroPeriodUnit", back_populates="macro_period", cascade="all, delete-orphan")
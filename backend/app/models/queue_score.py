@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from datetime import datetime, timezone
+from ..database import Base
+
+
+class MacroPeriodQueueScore(Base):
+    """Urgency score of an open (AGUARDANDO) period, maintained by app.follow_up_queue"""
+    __tablename__ = "macro_period_queue_scores"
+
+    macro_period_id = Column(Integer, ForeignKey("macro_periods.id", ondelete="CASCADE"), primary_key=True)
+    urgency_score = Column(Integer, nullable=False)
+    scored_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        Index('ix_macro_period_queue_scores_rank', 'urgency_score', 'macro_period_id'),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON
+from datetime import datetime, timezone
+from ..database import Base
+
+
+class SlowQuery(Base):
+    """Statement that ran over SLOW_QUERY_THRESHOLD_MS (a rolling log; see app.slow_queries)"""
+    __tablename__ = "slow_queries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    captured_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    duration_ms = Column(Float, nullable=False)
+    engine = Column(String(20), nullable=False)
+    route = Column(String(255), nullable=True, index=True)  # "GET /macro-periods/dashboard"; null for jobs
+    statement = Column(Text, nullable=False)  # Normalized (statement_shape): no literals or parameter values
+    statement_hash = Column(String(32), nullable=False, index=True)
+    parameters = Column(JSON(none_as_null=True), nullable=True)  # Parameter names and types only
+    plan = Column(JSON(none_as_null=True), nullable=True)  # EXPLAIN (FORMAT JSON); null when a recent row has this shape's plan
+    explain_error = Column(Text, nullable=True)
+    worker = Column(String(255), nullable=True)
@@ -0,0 +1,312 @@
+"""On-demand sampling profiler for single requests (admins only).
+
+An admin adds `X-Profile: 1` (or `?_profile=1`) to any request. While it
+runs, a sampler thread reads sys._current_frames() every
+PROFILE_SAMPLE_INTERVAL_MS and keeps the stacks that belong to this request:
+
+- on the event loop thread, stacks that pass through this request's
+  ProfilingMiddleware frame (so other requests' coroutines are ignored);
+- on threadpool threads, stacks running the route's endpoint or one of its
+  dependencies (concurrent requests to the same route would be mixed in).
+
+Ticks where the request is not running on any thread are attributed to
+the SQL statement in flight (async drivers await the database), or to
+"[waiting]". Each sample's root is "[sql]", "[python]" or "[waiting]",
+so the flame graph splits database time from Python time at the top.
+Sampled shares are approximate: the sampler needs the GIL, so long C calls
+that hold it get no ticks. SQL time is also measured exactly, per
+statement shape, by engine listeners (sql_ms).
+
+The response carries X-Profile-Id. Profiles are kept in a per-worker ring
+buffer of PROFILE_BUFFER_SIZE entries, listed under /profiles. Collapsed
+stacks ("folded" format) load in speedscope.app or flamegraph.pl.
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter as CounterDict, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Set
+from urllib.parse import parse_qs
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .auth import authenticate_token
+from .config import get_settings
+from .query_inspector import statement_shape
+from .request_metrics import match_route
+
+settings = get_settings()
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY_FLAG = "_profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+SQL_ROOT, PYTHON_ROOT, WAITING_ROOT = "[sql]", "[python]", "[waiting]"
+# Frames that mean "the database has the thread": the DB-API call in SQLAlchemy and the drivers
+_SQL_FUNCTIONS = {"do_execute", "do_executemany", "do_execute_no_params", "do_ping"}
+_SQL_PATH_MARKERS = (os.sep + "psycopg2" + os.sep, os.sep + "asyncpg" + os.sep)
+_SOURCE_ROOTS = sorted({os.path.dirname(os.path.dirname(__file__))} | set(sys.path), key=len, reverse=True)
+
+profiles: Deque["Profile"] = deque(maxlen=settings.profile_buffer_size)
+_profile_ids = itertools.count(1)
+_active_profile: ContextVar[Optional["Profile"]] = ContextVar("active_profile", default=None)
+_running = 0
+_running_lock = threading.Lock()
+_default_switch_interval = sys.getswitchinterval()
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    for root in _SOURCE_ROOTS:
+        if root and filename.startswith(root + os.sep):
+            filename = filename[len(root) + 1:]
+            break
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+
+
+def _is_sql_frame(code) -> bool:
+    return code.co_name in _SQL_FUNCTIONS or any(marker in code.co_filename for marker in _SQL_PATH_MARKERS)
+
+
+class Profile:
+    def __init__(self, method: str, path: str, route: str, interval: float):
+        self.id = next(_profile_ids)
+        self.method = method
+        self.path = path
+        self.route = route
+        self.interval = interval
+        self.started_at = datetime.now(timezone.utc)
+        self.status: Optional[int] = None
+        self.duration = 0.0
+        self.stacks: CounterDict = CounterDict()
+        self.sql_seconds = 0.0
+        self.sql_by_shape: Dict[str, List[float]] = {}  # shape -> [count, seconds]
+        self.sql_in_flight: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def add_sql(self, shape: str, seconds: float):
+        with self._lock:
+            self.sql_seconds += seconds
+            entry = self.sql_by_shape.setdefault(shape, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def samples_by_root(self) -> Dict[str, int]:
+        totals = {SQL_ROOT: 0, PYTHON_ROOT: 0, WAITING_ROOT: 0}
+        for stack, count in self.stacks.items():
+            totals[stack[0]] += count
+        return totals
+
+    def summary(self) -> dict:
+        samples = self.samples_by_root()
+        total = sum(samples.values())
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2),
+            "sql_ms": round(self.sql_seconds * 1000, 2),
+            "sql_statements": sum(int(count) for count, _ in self.sql_by_shape.values()),
+            "samples": total,
+            # Ticks come less often than the interval when the GIL is busy, so weigh them by share
+            "sampled_ms": {
+                root: round(self.duration * 1000 * n / total, 1) if total else 0.0 for root, n in samples.items()
+            },
+        }
+
+    def detail(self, top: int = 30) -> dict:
+        return {
+            **self.summary(),
+            "sample_interval_ms": self.interval * 1000,
+            "sql": [
+                {"statement": shape, "count": int(count), "total_ms": round(seconds * 1000, 2)}
+                for shape, (count, seconds) in sorted(self.sql_by_shape.items(), key=lambda item: -item[1][1])
+            ],
+            "top_stacks": [
+                {"stack": list(stack), "samples": count} for stack, count in self.stacks.most_common(top)
+            ],
+        }
+
+    def folded(self) -> str:
+        """Collapsed stacks, one "root;caller;...;callee count" line per distinct stack"""
+        return "".join(
+            ";".join(frame.replace(";", ",") for frame in stack) + f" {count}\n" for stack, count in self.stacks.items()
+        )
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, profile: Profile, loop_thread: int, anchor, codes: Set):
+        super().__init__(name=f"profiler-{profile.id}", daemon=True)
+        self.profile = profile
+        self.loop_thread = loop_thread
+        self.anchor = anchor
+        self.codes = codes
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.profile.interval):
+            self.sample()
+
+    def sample(self):
+        found = False
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self.ident:
+                continue
+            codes = self._request_codes(frame, thread_id)
+            if codes:
+                root = SQL_ROOT if any(_is_sql_frame(code) for code in codes) else PYTHON_ROOT
+                self.profile.stacks[(root,) + tuple(_frame_label(code) for code in codes)] += 1
+                found = True
+        if not found:
+            in_flight = self.profile.sql_in_flight
+            self.profile.stacks[(SQL_ROOT, in_flight[:200]) if in_flight else (WAITING_ROOT,)] += 1
+
+    def _request_codes(self, frame, thread_id) -> Optional[List]:
+        """Code objects from the request's outermost frame inwards, if this thread runs the request"""
+        codes = []
+        start = None
+        while frame is not None:
+            code = getattr(frame, "f_code", None)
+            if code is None:
+                return None  # The thread unwound while we walked its stack; drop the sample
+            codes.append(code)
+            if thread_id == self.loop_thread:
+                if frame is self.anchor:
+                    start = len(codes)
+                    break
+            elif code in self.codes:
+                start = len(codes)  # Keep going: the outermost match wins
+            frame = getattr(frame, "f_back", None)
+        if start is None:
+            return None
+        return codes[:start][::-1]
+
+
+def _dependency_codes(route) -> Set:
+    codes = set()
+    dependants = [route.dependant] if hasattr(route, "dependant") else []
+    while dependants:
+        dependant = dependants.pop()
+        call = getattr(dependant, "call", None)
+        code = getattr(call, "__code__", None) or getattr(getattr(type(call), "__call__", None), "__code__", None)
+        if code is not None:
+            codes.add(code)
+        dependants.extend(dependant.dependencies)
+    endpoint = getattr(route, "endpoint", None)
+    if hasattr(endpoint, "__code__"):
+        codes.add(endpoint.__code__)
+    return codes
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _sql_started(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.sql_in_flight = statement_shape(statement)
+        conn.info["profile_sql_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _sql_finished(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    started = conn.info.pop("profile_sql_started", None)
+    if profile is not None and started is not None:
+        profile.sql_in_flight = None
+        profile.add_sql(statement_shape(statement), time.perf_counter() - started)
+
+
+def _requested(scope: Scope, headers: Headers) -> bool:
+    if headers.get(PROFILE_HEADER) == "1":
+        return True
+    query = scope.get("query_string", b"")
+    return PROFILE_QUERY_FLAG.encode() in query and parse_qs(query.decode("latin-1")).get(PROFILE_QUERY_FLAG) == ["1"]
+
+
+async def _is_admin(headers: Headers) -> bool:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        user = await authenticate_token(token)
+    except HTTPException:
+        return False
+    return user["role"] == "admin"
+
+
+def _acquire_slot() -> bool:
+    global _running, _default_switch_interval
+    with _running_lock:
+        if _running >= settings.profile_max_concurrent:
+            return False
+        if _running == 0:
+            # Otherwise the sampler mostly gets the GIL when the request releases it (during I/O),
+            # and samples overweight SQL
+            _default_switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(_default_switch_interval, settings.profile_sample_interval_ms / 2000))
+        _running += 1
+        return True
+
+
+def _release_slot():
+    global _running
+    with _running_lock:
+        _running -= 1
+        if _running == 0:
+            sys.setswitchinterval(_default_switch_interval)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.profile_enabled:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        # Non-admins (and admins over the concurrency cap) are served normally, without a profile
+        if not _requested(scope, headers) or not await _is_admin(headers) or not _acquire_slot():
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            _release_slot()
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send):
+        route = match_route(scope, allow_partial=False)
+        profile = Profile(
+            scope["method"], scope["path"], route.path if route is not None else "unmatched",
+            settings.profile_sample_interval_ms / 1000
+        )
+        sampler = _Sampler(
+            profile, threading.get_ident(), sys._getframe(),
+            _dependency_codes(route) if route is not None else set()
+        )
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = str(profile.id)
+            await send(message)
+
+        token = _active_profile.set(profile)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stopped.set()
+            sampler.join()
+            profile.duration = time.perf_counter() - started
+            _active_profile.reset(token)
+            profiles.append(profile)
@@ -0,0 +1,158 @@
+"""SQL statement recording for N+1 detection and query budgets (development).
+
+With SQL_DEBUG_ENABLED, SQLDebugMiddleware records every statement a request
+issues (including its dependencies, threadpool work and background tasks):
+
+- statement shapes seen SQL_REPEATED_STATEMENT_THRESHOLD times or more are
+  logged as likely N+1 patterns, with the route and the repeat count;
+- requests over SQL_QUERY_BUDGET statements are logged, or fail with
+  QueryBudgetExceeded (a 500 naming the route) when
+  SQL_QUERY_BUDGET_ACTION=raise;
+- responses carry an X-SQL-Queries header with the count so far.
+
+Tests use app.testing.assert_max_queries, which records through
+capture_queries() regardless of the settings.
+"""
+import logging
+import re
+import threading
+from collections import Counter as CounterDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+QUERY_COUNT_HEADER = "X-SQL-Queries"
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists and literals: "IN (%(id_1_1)s, %(id_1_2)s)" and "IN ($1, $2)" share a shape
+_IN_LIST = re.compile(r"\bIN \((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def statement_shape(statement: str) -> str:
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _NUMBER.sub("N", shape)
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """Bound-parameter names and types, without the values"""
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+class QueryRecorder:
+    """Statements issued while active; raises QueryBudgetExceeded past `budget` if `strict`"""
+
+    def __init__(self, label: str = "", budget: int = 0, strict: bool = False):
+        self.label = label
+        self.budget = budget
+        self.strict = strict
+        self.statements: List[str] = []
+        self._lock = threading.Lock()
+
+    def record(self, statement: str):
+        with self._lock:
+            self.statements.append(statement)
+            count = len(self.statements)
+        if self.strict and self.budget and count > self.budget:
+            raise QueryBudgetExceeded(
+                f"{self.label or 'block'} exceeded its SQL budget of {self.budget} statements"
+            )
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes issued at least `threshold` times, most frequent first"""
+        shapes = CounterDict(statement_shape(s) for s in self.statements)
+        return [(shape, n) for shape, n in shapes.most_common() if n >= threshold]
+
+    def report(self, threshold: int = 2) -> str:
+        lines = [f"{self.count} SQL statements in {self.label or 'block'}"]
+        for shape, n in self.repeated(threshold):
+            lines.append(f"  {n}x {shape[:300]}")
+        return "\n".join(lines)
+
+
+_request_recorder: ContextVar[Optional[QueryRecorder]] = ContextVar("request_recorder", default=None)
+# Recorders that see every statement in the process (TestClient runs the app in another thread)
+_global_recorders: Set[QueryRecorder] = set()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    recorder = _request_recorder.get()
+    if recorder is not None:
+        recorder.record(statement)
+    for recorder in list(_global_recorders):
+        recorder.record(statement)
+
+
+@contextmanager
+def capture_queries(label: str = "", budget: int = 0, strict: bool = False) -> Iterator[QueryRecorder]:
+    """Record every statement executed in this process while the block runs"""
+    recorder = QueryRecorder(label, budget, strict)
+    _global_recorders.add(recorder)
+    try:
+        yield recorder
+    finally:
+        _global_recorders.discard(recorder)
+
+
+class SQLDebugMiddleware:
+    """Development only: added by main.py when SQL_DEBUG_ENABLED is set"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recorder = QueryRecorder(
+            f"{scope['method']} {scope['path']}",
+            budget=settings.sql_query_budget,
+            strict=settings.sql_query_budget_action == "raise",
+        )
+        token = _request_recorder.set(recorder)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[QUERY_COUNT_HEADER] = str(recorder.count)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_recorder.reset(token)
+            self._report(recorder)
+
+    @staticmethod
+    def _report(recorder: QueryRecorder):
+        threshold = settings.sql_repeated_statement_threshold
+        for shape, n in recorder.repeated(threshold):
+            logger.warning("Possible N+1 in %s: %d x %s", recorder.label, n, shape[:300])
+        if settings.sql_query_budget and recorder.count > settings.sql_query_budget:
+            logger.warning(
+                "%s issued %d SQL statements (budget %d)\n%s",
+                recorder.label, recorder.count, settings.sql_query_budget, recorder.report(threshold=2)
+            )
@@ -0,0 +1,131 @@
+"""In-process rate limiting for the public (token) routes.
+
+Every /public/macro-period/{token} request passes through public_rate_limit:
+
+- token buckets per client IP and per public token answer 429 before any
+  database work;
+- tokens that recently returned 404 are kept in a negative cache, so repeated
+  guesses (or a calendar app polling a deleted link) skip the database;
+- every miss also costs the client IP a token from a small "miss" bucket, so
+  an IP scanning for valid tokens is blocked after a few misses.
+
+Buckets and the negative cache live in each worker's memory: with N workers
+the effective limits are up to N times the configured ones.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List
+from fastapi import HTTPException, Request
+from .cache import TTLCache
+from .config import get_settings
+from .metrics import Counter
+
+settings = get_settings()
+
+# generate_public_token() produces 43 URL-safe characters; anything else cannot exist
+TOKEN_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,128}$")
+INVALID_TOKEN_DETAIL = "Invalid or expired link"
+
+public_throttled_total = Counter(
+    "public_throttled_total", "Public requests rejected with 429", ["reason"]
+)
+public_token_misses_total = Counter(
+    "public_token_misses_total", "Public requests for unknown tokens", ["source"]
+)
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by string, `rate` tokens/second up to `burst` (LRU-bounded)"""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def _refill(self, key: str, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def consume(self, key: str, amount: float = 1.0) -> float:
+        """Take `amount` tokens; returns 0 if allowed, else seconds until it would be"""
+        with self._lock:
+            bucket = self._refill(key, time.monotonic())
+            if bucket[0] >= amount:
+                bucket[0] -= amount
+                return 0.0
+            return (amount - bucket[0]) / self.rate
+
+    def wait_time(self, key: str) -> float:
+        """Seconds until one token is available, without taking it"""
+        with self._lock:
+            bucket = self._refill(key, time.monotonic())
+            return 0.0 if bucket[0] >= 1 else (1 - bucket[0]) / self.rate
+
+
+ip_limiter = TokenBucketLimiter(settings.public_ip_rate_per_second, settings.public_ip_burst)
+token_limiter = TokenBucketLimiter(settings.public_token_rate_per_second, settings.public_token_burst)
+miss_limiter = TokenBucketLimiter(settings.public_miss_rate_per_second, settings.public_miss_burst)
+missing_tokens = TTLCache("public_missing_token", settings.public_negative_cache_size, settings.public_negative_cache_ttl_seconds)
+
+
+def _throttle(reason: str, retry_after: float):
+    public_throttled_total.inc(reason=reason)
+    raise HTTPException(
+        status_code=429,
+        detail="Too many requests",
+        headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+    )
+
+
+def _miss(ip: str, token: str, source: str):
+    public_token_misses_total.inc(source=source)
+    if source == "database":
+        missing_tokens.put(token, True)
+    miss_limiter.consume(ip)
+
+
+async def public_rate_limit(request: Request):
+    """Router dependency for /public (yield dependency: sees the route's 404s)"""
+    if not settings.public_rate_limit_enabled:
+        yield
+        return
+
+    ip = request.client.host if request.client else ""
+    token = request.path_params.get("token")
+
+    wait = miss_limiter.wait_time(ip)
+    if wait:
+        _throttle("scan", wait)
+    wait = ip_limiter.consume(ip)
+    if wait:
+        _throttle("ip", wait)
+
+    if token is not None:
+        if not TOKEN_PATTERN.match(token):
+            _miss(ip, token, "malformed")
+            raise HTTPException(status_code=404, detail=INVALID_TOKEN_DETAIL)
+        if missing_tokens.get(token):
+            _miss(ip, token, "negative_cache")
+            raise HTTPException(status_code=404, detail=INVALID_TOKEN_DETAIL)
+        wait = token_limiter.consume(token)
+        if wait:
+            _throttle("token", wait)
+
+    try:
+        yield
+    except HTTPException as e:
+        if token is not None and e.status_code == 404 and e.detail == INVALID_TOKEN_DETAIL:
+            _miss(ip, token, "database")
+        raise
@@ -0,0 +1,121 @@
+"""Read-your-writes routing between the primary and the read replica.
+
+A request that commits a transaction marks its client as a recent writer.
+For the next `read_your_writes_seconds`, read-only dependencies send that
+client to the primary so it never sees replica lag on its own changes.
+
+Clients are identified by their bearer token (admins), the public token in
+the URL (doctors) or their IP address. The mark is kept in this worker's
+memory and in a cookie, so it also holds when the next request lands on a
+different worker and the client sends cookies.
+"""
+import hashlib
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .config import get_settings
+
+settings = get_settings()
+
+PRIMARY_COOKIE = "primary_until"
+READ_ONLY = "read_only"  # Session.info flag set by get_read_db / get_async_read_db
+MAX_TRACKED_CLIENTS = 10000
+
+# Per-request holder; mutated (not re-set) so commits in threadpool threads are visible
+_request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+
+_recent_writers: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_commit(session):
+    holder = _request_writes.get()
+    if holder is not None:
+        holder["wrote"] = True
+
+
+class ReadOnlySessionError(RuntimeError):
+    """An endpoint wrote through a read session (it must depend on get_db / get_async_db)"""
+
+
+@event.listens_for(Session, "before_flush")
+def _refuse_read_session_writes(session, flush_context, instances):
+    # Raised with or without a replica configured, so the mistake shows up in development
+    # instead of as failed writes once DATABASE_REPLICA_URL is set
+    if session.info.get(READ_ONLY) and (session.new or session.dirty or session.deleted):
+        raise ReadOnlySessionError("Write through a read-only session; use get_db for endpoints that write")
+
+
+def client_key(scope) -> str:
+    headers = dict(scope.get("headers") or [])
+    authorization = headers.get(b"authorization")
+    if authorization:
+        return "auth:" + hashlib.sha256(authorization).hexdigest()
+    path = scope.get("path", "")
+    if path.startswith("/public/macro-period/"):
+        return "token:" + path.split("/")[3]
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "")
+
+
+def _cookie_until(scope) -> float:
+    headers = dict(scope.get("headers") or [])
+    for part in headers.get(b"cookie", b"").decode("latin-1").split(";"):
+        name, _, value = part.strip().partition("=")
+        if name == PRIMARY_COOKIE:
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 0.0
+
+
+def should_use_primary(scope) -> bool:
+    """True while the client is inside its read-your-writes window"""
+    now = time.time()
+    if _cookie_until(scope) > now:
+        return True
+    return _recent_writers.get(client_key(scope), 0.0) > now
+
+
+def _remember_writer(key: str, until: float):
+    with _lock:
+        if len(_recent_writers) >= MAX_TRACKED_CLIENTS:
+            now = time.time()
+            for stale in [k for k, v in _recent_writers.items() if v <= now]:
+                del _recent_writers[stale]
+            if len(_recent_writers) >= MAX_TRACKED_CLIENTS:
+                _recent_writers.clear()
+        _recent_writers[key] = until
+
+
+class ReadYourWritesMiddleware:
+    """Marks clients whose request committed a write (ASGI middleware)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.database_replica_url:
+            await self.app(scope, receive, send)
+            return
+
+        holder = {"wrote": False}
+        token = _request_writes.set(holder)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and holder["wrote"]:
+                until = time.time() + settings.read_your_writes_seconds
+                _remember_writer(client_key(scope), until)
+                cookie = f"{PRIMARY_COOKIE}={until:.0f}; Max-Age={settings.read_your_writes_seconds}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_writes.reset(token)
@@ -0,0 +1,117 @@
+"""Per-route HTTP metrics and SQL statement counts.
+
+RequestMetricsMiddleware (pure ASGI, outermost) records, per method and
+route template, the request count by status, latency until the last body
+chunk is sent, requests in progress, and SQL statements executed per request.
+
+Routes are labelled with their template ("/public/macro-period/{token}"),
+never the raw path, so ids and tokens don't create new series; paths that
+match no route share the "unmatched" label.
+
+Statements are counted by an Engine-wide before_cursor_execute listener
+into a per-request holder in a ContextVar. The holder is mutated rather than
+re-set, so statements run in threadpool threads (sync endpoints and
+dependencies) and in async sessions are all counted. The holder also carries
+the route, so the slow-query log can name it (current_route).
+"""
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .metrics import Counter, Gauge, Histogram
+
+UNMATCHED = "unmatched"
+
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"]
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time until the last byte of the response was sent",
+    ["method", "route"]
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "Requests currently being handled", ["method", "route"]
+)
+http_request_db_statements = Histogram(
+    "http_request_db_statements",
+    "SQL statements executed per request (including background tasks)",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+db_statements_total = Counter("db_statements_total", "SQL statements executed, by engine", ["engine"])
+
+_request_statements: ContextVar[Optional[dict]] = ContextVar("request_statements", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    db_statements_total.inc(engine=getattr(conn.engine.pool, "engine_label", "other"))
+    holder = _request_statements.get()
+    if holder is not None:
+        holder["count"] += 1
+
+
+def current_route() -> Optional[str]:
+    """Route of the request this code runs for, as "METHOD /template", or None"""
+    holder = _request_statements.get()
+    return holder["route"] if holder is not None else None
+
+
+def match_route(scope: Scope, allow_partial: bool = True):
+    """Route that will handle this request (or the path match answered with 405), else None"""
+    # Same rules as Route.matches, without building the child scope (~4x faster)
+    path, method = scope["path"], scope["method"]
+    partial = None
+    for route in getattr(getattr(scope.get("app"), "router", None), "routes", ()):
+        path_regex = getattr(route, "path_regex", None)
+        if path_regex is None or not path_regex.match(path):
+            continue
+        if route.methods is None or method in route.methods:
+            return route
+        if partial is None:
+            partial = route
+    return partial if allow_partial else None
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that will handle this request"""
+    route = match_route(scope)
+    return route.path if route is not None else UNMATCHED
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels = {"method": scope["method"], "route": route_template(scope)}
+        holder = {"count": 0, "route": f"{labels['method']} {labels['route']}"}
+        token = _request_statements.set(holder)
+        status = 500
+        started = time.perf_counter()
+        finished: Optional[float] = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                finished = time.perf_counter()
+            await send(message)
+
+        http_requests_in_progress.inc(**labels)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.dec(**labels)
+            _request_statements.reset(token)
+            http_requests_total.inc(status=str(status), **labels)
+            http_request_duration_seconds.observe((finished or time.perf_counter()) - started, **labels)
+            http_request_db_statements.observe(holder["count"], **labels)
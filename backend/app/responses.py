@@ -0,0 +1,34 @@
+"""JSON responses serialized with orjson.
+
+Routes on the hot path build plain dicts straight from SQL rows and return
+FastJSONResponse directly. FastAPI then skips response_model validation and
+serialization (the decorator's response_model is still used for the OpenAPI
+schema), so each item is serialized once, in C.
+
+Output matches Pydantic's JSON mode for the types used here: enums by value,
+ISO dates/times, UTC datetimes with a "Z" suffix, Decimal as int/float.
+"""
+from decimal import Decimal
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    # Aggregates (AVG, SUM of numerics) come back as Decimal; same rule as FastAPI's encoder
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    raise TypeError
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,213 @@
+"""Automatic schedule suggestions for the doctor's public page.
+
+The days of a macro period are mapped to bit positions (bit 0 = start_date),
+so free-day checks are integer operations instead of date arithmetic. Units
+are placed one after the other following ``order_position``: each unit gets a
+single consecutive block when possible, and falls back to the earliest set of
+free days (split into several consecutive blocks) otherwise.
+
+Earliest-fit placement is optimal for feasibility here (moving a unit later
+never frees days for the units after it), so the backtracking only has to
+retry a unit once before giving up and the search stays linear in the number
+of days.
+"""
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Score weights (lower score = better suggestion)
+OCCUPANCY_WEIGHT = 1.0
+SPAN_WEIGHT = 0.1
+SPLIT_WEIGHT = 5.0
+OFFSET_WEIGHT = 0.01
+
+
+def build_free_mask(start_date: date, end_date: date, blocked_dates: Iterable[date]) -> Tuple[int, int]:
+    """Return (bitset of free days, number of days) for the period"""
+    n_days = (end_date - start_date).days + 1
+    mask = (1 << n_days) - 1
+    for blocked in blocked_dates:
+        offset = (blocked - start_date).days
+        if 0 <= offset < n_days:
+            mask &= ~(1 << offset)
+    return mask, n_days
+
+
+def _free_runs(mask: int, n_days: int) -> List[int]:
+    """runs[i] = number of consecutive free days starting at day i"""
+    runs = [0] * (n_days + 1)
+    for i in range(n_days - 1, -1, -1):
+        if (mask >> i) & 1:
+            runs[i] = runs[i + 1] + 1
+    return runs
+
+
+def _next_fit(runs: List[int], n_days: int, length: int) -> List[int]:
+    """next_fit[p] = first day >= p where a block of `length` free days starts (-1 if none)"""
+    next_fit = [-1] * (n_days + 1)
+    for i in range(n_days - 1, -1, -1):
+        next_fit[i] = i if runs[i] >= length else next_fit[i + 1]
+    return next_fit
+
+
+def _take_free_days(mask: int, start: int, count: int) -> Optional[List[int]]:
+    """Take the first `count` free days at or after `start` (may span several blocks)"""
+    remaining = (mask >> start) << start
+    days = []
+    while remaining and len(days) < count:
+        lowest = remaining & -remaining
+        days.append(lowest.bit_length() - 1)
+        remaining ^= lowest
+    return days if len(days) == count else None
+
+
+def _split_blocks(days: List[int]) -> List[List[int]]:
+    """Group sorted day offsets into consecutive blocks"""
+    blocks: List[List[int]] = []
+    for day in days:
+        if blocks and blocks[-1][-1] == day - 1:
+            blocks[-1].append(day)
+        else:
+            blocks.append([day])
+    return blocks
+
+
+def suggest_schedules(
+    start_date: date,
+    end_date: date,
+    units: Sequence[Tuple[int, int]],
+    blocked_dates: Iterable[date] = (),
+    occupancy: Optional[Dict[int, Dict[date, int]]] = None,
+    limit: int = 3,
+    allow_split: bool = True,
+    time_budget_ms: float = 50.0,
+) -> List[dict]:
+    """
+    Generate valid candidate schedules.
+
+    `units` is a sequence of (macro_period_unit_id, total_days) already sorted
+    by order_position. `occupancy` maps macro_period_unit_id -> {date: count}
+    of other bookings at that unit, used only to rank candidates.
+
+    Returns up to `limit` candidates sorted by score, each as
+    {"score", "start_offset", "placements": [(macro_period_unit_id, [day offsets])]}.
+    """
+    deadline = time.perf_counter() + time_budget_ms / 1000
+    mask, n_days = build_free_mask(start_date, end_date, blocked_dates)
+    if not units or n_days <= 0:
+        return []
+
+    runs = _free_runs(mask, n_days)
+    free_after = [0] * (n_days + 1)
+    for i in range(n_days - 1, -1, -1):
+        free_after[i] = free_after[i + 1] + ((mask >> i) & 1)
+
+    remaining_need = [0] * (len(units) + 1)
+    for k in range(len(units) - 1, -1, -1):
+        remaining_need[k] = remaining_need[k + 1] + units[k][1]
+    if remaining_need[0] > free_after[0]:
+        return []
+
+    next_fit = {length: _next_fit(runs, n_days, length) for length in {d for _, d in units}}
+
+    # Prefix sums of occupancy per unit so a block's cost is O(1)
+    occupancy = occupancy or {}
+    occ_prefix: Dict[int, List[int]] = {}
+    for mp_unit_id, _ in units:
+        prefix = [0] * (n_days + 1)
+        counts = occupancy.get(mp_unit_id, {})
+        for i in range(n_days):
+            prefix[i + 1] = prefix[i] + counts.get(start_date + timedelta(days=i), 0)
+        occ_prefix[mp_unit_id] = prefix
+
+    def placements(k: int, position: int) -> List[List[int]]:
+        """Candidate placements for unit k at or after `position`, best first"""
+        length = units[k][1]
+        options = []
+        if position < n_days:
+            start = next_fit[length][position]
+            if start >= 0:
+                options.append(list(range(start, start + length)))
+        if allow_split and (not options or options[0][0] != position):
+            days = _take_free_days(mask, position, length)
+            if days and len(_split_blocks(days)) > 1:
+                options.append(days)
+        return options
+
+    def complete(k: int, position: int, chosen: List[List[int]]) -> Optional[List[List[int]]]:
+        if k == len(units):
+            return list(chosen)
+        if position > n_days or remaining_need[k] > free_after[min(position, n_days)]:
+            return None
+        for days in placements(k, position):
+            chosen.append(days)
+            result = complete(k + 1, days[-1] + 1, chosen)
+            chosen.pop()
+            if result is not None:
+                return result
+        return None
+
+    # Vary where the first unit starts; the remaining units are packed right after it
+    first_options: List[List[int]] = []
+    first_length = units[0][1]
+    start = next_fit[first_length][0]
+    while start >= 0:
+        first_options.append(list(range(start, start + first_length)))
+        start = next_fit[first_length][start + 1]
+    if allow_split:
+        days = _take_free_days(mask, 0, first_length)
+        if days and len(_split_blocks(days)) > 1:
+            first_options.append(days)
+
+    candidates = []
+    seen = set()
+    for first in first_options:
+        if time.perf_counter() > deadline:
+            break
+        schedule = complete(1, first[-1] + 1, [first])
+        if schedule is None:
+            continue
+        key = tuple(tuple(days) for days in schedule)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        occupancy_cost = 0
+        splits = 0
+        for (mp_unit_id, _), days in zip(units, schedule):
+            prefix = occ_prefix[mp_unit_id]
+            for block in _split_blocks(days):
+                occupancy_cost += prefix[block[-1] + 1] - prefix[block[0]]
+            splits += len(_split_blocks(days)) - 1
+        span = schedule[-1][-1] - schedule[0][0] + 1
+        score = (
+            occupancy_cost * OCCUPANCY_WEIGHT
+            + span * SPAN_WEIGHT
+            + splits * SPLIT_WEIGHT
+            + schedule[0][0] * OFFSET_WEIGHT
+        )
+        candidates.append({
+            "score": round(score, 2),
+            "start_offset": schedule[0][0],
+            "placements": [(mp_unit_id, days) for (mp_unit_id, _), days in zip(units, schedule)],
+        })
+
+    candidates.sort(key=lambda c: (c["score"], c["start_offset"]))
+    return candidates[:limit]
+
+
+def candidate_to_selections(candidate: dict, start_date: date) -> List[dict]:
+    """Convert a solver candidate into FULL_DAY selections ready for submission"""
+    selections = []
+    for mp_unit_id, days in candidate["placements"]:
+        for block in _split_blocks(days):
+            block_id = str(uuid.uuid4())
+            for offset in block:
+                selections.append({
+                    "date": start_date + timedelta(days=offset),
+                    "part_of_day": "FULL_DAY",
+                    "macro_period_unit_id": mp_unit_id,
+                    "block_id": block_id,
+                })
+    return selections
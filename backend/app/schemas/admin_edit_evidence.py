@@ -22,7 +22,11 @@ class AdminEditEvidenceResponse(AdminEditEvidenceBase):
     file_path: str
     original_filename: Optional[str]
     file_size: Optional[int]
+    sha256: Optional[str] = None
     mime_type: Optional[str]
+    thumbnail_url: Optional[str] = None
+    thumbnail_width: Optional[int] = None
+    thumbnail_height: Optional[int] = None
     uploaded_by: str
     uploaded_at: datetime
 
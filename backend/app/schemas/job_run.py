@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, Any
+from ..models.job_run import JobRunStatus
+
+
+class JobRun(BaseModel):
+    id: int
+    job_name: str
+    status: JobRunStatus
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[int] = None
+    worker: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobInfo(BaseModel):
+    name: str
+    interval_seconds: int
+    last_run: Optional[JobRun] = None
@@ -72,6 +72,28 @@ class MacroPeriodListItem(BaseModel):
     responded_at: Optional[datetime] = None
 
 
+class MacroPeriodQueueItem(BaseModel):
+    id: int
+    doctor_id: int
+    doctor_name: str
+    start_date: date
+    end_date: date
+    priority: Priority
+    deadline: Optional[date] = None
+    public_token: str
+    created_at: datetime
+    horas_em_aberto: int
+    dias_ate_prazo: Optional[int] = None  # Negative when the deadline has passed
+    taxa_resposta_medico: Optional[float] = None  # Doctor's past response rate (0-1)
+    urgency_score: int
+
+
+class MacroPeriodQueuePage(BaseModel):
+    items: List[MacroPeriodQueueItem] = []
+    next_cursor: Optional[str] = None
+    as_of: datetime
+
+
 class MacroPeriodPublicView(BaseModel):
     id: int
     doctor_name: str
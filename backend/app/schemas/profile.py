@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class ProfileSummary(BaseModel):
+    id: int
+    method: str
+    path: str
+    route: str
+    status: Optional[int] = None
+    started_at: datetime
+    duration_ms: float
+    sql_ms: float
+    sql_statements: int
+    samples: int
+    sampled_ms: Dict[str, float]  # Duration split by sample share: [sql], [python], [waiting]
+
+
+class ProfileSQLStatement(BaseModel):
+    statement: str
+    count: int
+    total_ms: float
+
+
+class ProfileStack(BaseModel):
+    stack: List[str]
+    samples: int
+
+
+class ProfileDetail(ProfileSummary):
+    sample_interval_ms: float
+    sql: List[ProfileSQLStatement]
+    top_stacks: List[ProfileStack]
@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, List, Optional
+
+
+class SlowQuery(BaseModel):
+    id: int
+    captured_at: datetime
+    duration_ms: float
+    engine: str
+    route: Optional[str] = None
+    statement: str
+    statement_hash: str
+    parameters: Optional[Any] = None
+    explain_error: Optional[str] = None
+    worker: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SlowQueryDetail(SlowQuery):
+    plan: Optional[Any] = None
+    plan_query_id: Optional[int] = None  # Row the plan was captured with (this one, or the shape's latest)
+
+
+class SlowStatement(BaseModel):
+    statement_hash: str
+    statement: str
+    count: int
+    max_ms: float
+    avg_ms: float
+    last_captured_at: datetime
+    routes: List[str]
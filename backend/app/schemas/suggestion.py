@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import List
+from .selection import MacroPeriodSelectionCreate
+
+
+class ScheduleSuggestion(BaseModel):
+    score: float  # Lower is better (fewer split blocks, less crowded units, shorter span)
+    total_days: int
+    selections: List[MacroPeriodSelectionCreate]
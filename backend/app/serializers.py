@@ -0,0 +1,87 @@
+"""Column queries and row -> dict builders for the JSON fast path.
+
+Each builder produces exactly the fields of the matching Pydantic schema, so
+routes can return FastJSONResponse without building models. The queries are
+2.0-style selects and work with both Session and AsyncSession.
+"""
+from sqlalchemy import select, Select
+from .models import MacroPeriodUnit, MacroPeriodSelection, AuditEvent, Unit
+
+
+def units_query(macro_period_id: int) -> Select:
+    return select(
+        MacroPeriodUnit.id,
+        MacroPeriodUnit.macro_period_id,
+        MacroPeriodUnit.unit_id,
+        Unit.name.label("unit_name"),
+        Unit.city.label("unit_city"),
+        MacroPeriodUnit.total_days,
+        MacroPeriodUnit.order_position,
+        Unit.config_turnos
+    ).join(Unit, MacroPeriodUnit.unit_id == Unit.id).where(
+        MacroPeriodUnit.macro_period_id == macro_period_id
+    ).order_by(MacroPeriodUnit.id)
+
+
+def selections_query(macro_period_id: int) -> Select:
+    return select(
+        MacroPeriodSelection.id,
+        MacroPeriodSelection.macro_period_id,
+        MacroPeriodSelection.macro_period_unit_id,
+        MacroPeriodSelection.date,
+        MacroPeriodSelection.part_of_day,
+        MacroPeriodSelection.custom_start,
+        MacroPeriodSelection.custom_end,
+        MacroPeriodSelection.block_id
+    ).where(MacroPeriodSelection.macro_period_id == macro_period_id).order_by(MacroPeriodSelection.id)
+
+
+def audit_events_query(macro_period_id: int) -> Select:
+    return select(
+        AuditEvent.id,
+        AuditEvent.macro_period_id,
+        AuditEvent.event_type,
+        AuditEvent.payload,
+        AuditEvent.created_by,
+        AuditEvent.created_at
+    ).where(AuditEvent.macro_period_id == macro_period_id).order_by(AuditEvent.id)
+
+
+def unit_dict(row) -> dict:
+    """MacroPeriodUnitResponse"""
+    return {
+        "id": row.id,
+        "macro_period_id": row.macro_period_id,
+        "unit_id": row.unit_id,
+        "unit_name": row.unit_name,
+        "unit_city": row.unit_city,
+        "total_days": row.total_days,
+        "order_position": row.order_position,
+        "config_turnos": row.config_turnos
+    }
+
+
+def selection_dict(row) -> dict:
+    """MacroPeriodSelection (schema)"""
+    return {
+        "date": row.date,
+        "part_of_day": row.part_of_day,
+        "custom_start": row.custom_start,
+        "custom_end": row.custom_end,
+        "id": row.id,
+        "macro_period_id": row.macro_period_id,
+        "macro_period_unit_id": row.macro_period_unit_id,
+        "block_id": row.block_id
+    }
+
+
+def audit_event_dict(row) -> dict:
+    """AuditEvent (schema)"""
+    return {
+        "event_type": row.event_type,
+        "payload": row.payload,
+        "created_by": row.created_by,
+        "id": row.id,
+        "macro_period_id": row.macro_period_id,
+        "created_at": row.created_at
+    }
@@ -0,0 +1,136 @@
+"""Background capture for the slow-query log.
+
+database.py times every statement and queues the ones slower than
+SLOW_QUERY_THRESHOLD_MS. This thread (one per worker) runs
+EXPLAIN (FORMAT JSON) for each, without ANALYZE so nothing is executed
+again, on the engine that ran it (primary or replica), inside a transaction
+that is rolled back. It then stores a row in slow_queries and prunes the
+table to the newest SLOW_QUERY_LOG_MAX_ROWS.
+
+A statement shape is explained at most once per
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS per worker; later rows have no plan and
+/slow-queries/{id} shows the shape's latest one. Rows keep the normalized
+statement and the parameter names and types, never the values.
+"""
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import delete, insert, select
+from .config import get_settings
+from .database import SLOW_QUERY_LOG_OPTION, engine, replica_engine, slow_query_queue
+from .jobs import worker_id
+from .models.slow_query import SlowQuery
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+_ASYNCPG_PARAMETER = re.compile(r"\$(\d+)")
+
+# Our own EXPLAINs and inserts are not timed (they could queue themselves forever)
+_primary = engine.execution_options(**{SLOW_QUERY_LOG_OPTION: False})
+_replica = replica_engine.execution_options(**{SLOW_QUERY_LOG_OPTION: False})
+_EXPLAIN_ENGINES = {"sync": _primary, "async": _primary, "replica": _replica, "async_replica": _replica}
+
+
+def statement_hash(shape: str) -> str:
+    return hashlib.md5(shape.encode()).hexdigest()
+
+
+def _explain_statement(item: dict) -> Tuple[str, Any]:
+    """The EXPLAIN to run through psycopg2, with the statement's original parameters"""
+    statement, parameters = item["statement"], item["parameters"]
+    if item["executemany"]:
+        parameters = parameters[0] if parameters else None  # The plan of the first row
+    if item["engine"].startswith("async"):
+        # asyncpg numbers its placeholders ($1); psycopg2 takes %(name)s and needs literal % doubled
+        values = list(parameters or ())
+        if values:
+            statement = _ASYNCPG_PARAMETER.sub(lambda m: f"%(p{m.group(1)})s", statement.replace("%", "%%"))
+        parameters = {f"p{i}": value for i, value in enumerate(values, 1)} or None
+    return "EXPLAIN (FORMAT JSON) " + statement, parameters
+
+
+def explain(item: dict) -> Tuple[Optional[Any], Optional[str]]:
+    """(plan, None), or (None, error) when the statement can't be explained"""
+    sql, parameters = _explain_statement(item)
+    try:
+        with _EXPLAIN_ENGINES.get(item["engine"], _primary).connect() as conn:
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.slow_query_explain_timeout_ms)}")
+            plan = conn.exec_driver_sql(sql, parameters).scalar()
+            conn.rollback()
+        return plan, None
+    except Exception as exc:
+        return None, f"{type(exc).__name__}: {exc}"[:2000]
+
+
+class SlowQueryCapture:
+    def __init__(self):
+        self._explained_at: Dict[str, float] = {}  # statement hash -> monotonic time of its last EXPLAIN
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="slow-query-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                item = slow_query_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.capture(item)
+            except Exception:
+                logger.exception("Could not store a slow query")
+
+    def _should_explain(self, item: dict, digest: str) -> bool:
+        if not settings.slow_query_explain_enabled:
+            return False
+        if not item["statement"].lstrip().lower().startswith(_EXPLAINABLE):
+            return False
+        last = self._explained_at.get(digest)
+        return last is None or time.monotonic() - last >= settings.slow_query_explain_interval_seconds
+
+    def capture(self, item: dict):
+        digest = statement_hash(item["shape"])
+        plan, error = None, None
+        if self._should_explain(item, digest):
+            plan, error = explain(item)
+            self._explained_at[digest] = time.monotonic()
+        with _primary.begin() as conn:
+            conn.execute(insert(SlowQuery).values(
+                captured_at=datetime.now(timezone.utc),
+                duration_ms=round(item["duration_ms"], 2),
+                engine=item["engine"],
+                route=item["route"],
+                statement=item["shape"],
+                statement_hash=digest,
+                parameters=item["parameter_shape"],
+                plan=plan,
+                explain_error=error,
+                worker=worker_id(),
+            ))
+            # Keep the newest rows; the id at the cut-off is NULL (nothing deleted) while under the limit
+            cutoff = select(SlowQuery.id).order_by(SlowQuery.id.desc()).offset(
+                settings.slow_query_log_max_rows
+            ).limit(1).scalar_subquery()
+            conn.execute(delete(SlowQuery).where(SlowQuery.id <= cutoff))
+
+
+capture = SlowQueryCapture()
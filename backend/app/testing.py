@@ -0,0 +1,25 @@
+"""Helpers for endpoint tests.
+
+    from app.testing import assert_max_queries
+
+    with assert_max_queries(4):
+        response = client.get("/macro-periods", headers=auth_headers)
+
+The block fails when it issues more than `limit` SQL statements, or when it
+repeats one statement shape `max_repeats` times or more (an N+1). The message
+lists the repeated statements. Statements are recorded process-wide, so
+this works with TestClient, which runs the app in another thread.
+"""
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from .query_inspector import QueryRecorder, capture_queries
+
+
+@contextmanager
+def assert_max_queries(limit: int, max_repeats: Optional[int] = None) -> Iterator[QueryRecorder]:
+    with capture_queries("test block") as recorder:
+        yield recorder
+    if recorder.count > limit:
+        raise AssertionError(f"Expected at most {limit} SQL statements\n{recorder.report()}")
+    if max_repeats is not None and recorder.repeated(max_repeats):
+        raise AssertionError(f"Statement repeated {max_repeats}+ times (N+1?)\n{recorder.report()}")
@@ -0,0 +1,181 @@
+"""Thumbnails for admin edit evidence files.
+
+Rendering (image decode/resize, first page of PDFs) is CPU-bound, so it runs
+in a small process pool instead of the event loop or the threadpool. Uploads
+schedule generate_evidence_thumbnail as a background task; the evidence list
+then returns thumbnail URLs instead of the full files.
+
+Thumbnails are content-addressed like the originals
+(``<evidence_upload_dir>/thumbs/<sha[:2]>/<sha>.jpg``), so duplicate uploads
+reuse the existing thumbnail without rendering again.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+from sqlalchemy import select, update
+from .config import get_settings
+from .database import engine
+from .models import AdminEditEvidence
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+THUMBNAIL_MAX_SIZE = (320, 320)
+THUMBNAIL_QUALITY = 80
+IMAGE_TYPES = {"image/jpeg", "image/jpg", "image/png", "image/gif"}
+PDF_TYPES = {"application/pdf"}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def thumbnail_path(sha256: str) -> Path:
+    return Path(settings.evidence_upload_dir) / "thumbs" / sha256[:2] / f"{sha256}.jpg"
+
+
+def render_thumbnail(source: str, mime_type: str, target: str) -> Tuple[int, int]:
+    """Write a JPEG thumbnail of `source` to `target`; returns (width, height).
+
+    Runs inside the process pool, so it only takes plain arguments.
+    """
+    from PIL import Image
+
+    if mime_type in PDF_TYPES:
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(source)
+        try:
+            page = pdf[0]
+            width, height = page.get_size()
+            # Render close to the final size instead of at full resolution
+            scale = max(THUMBNAIL_MAX_SIZE) / max(width, height, 1)
+            image = page.render(scale=min(scale, 2.0)).to_pil()
+        finally:
+            pdf.close()
+    else:
+        image = Image.open(source)
+        image.draft("RGB", THUMBNAIL_MAX_SIZE)  # JPEG: decode at reduced scale
+        image.seek(0)  # GIF: first frame
+
+    image.thumbnail(THUMBNAIL_MAX_SIZE)
+    if image.mode != "RGB":
+        # Flatten transparency onto white
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.split()[-1])
+        image = background
+
+    target_path = Path(target)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target_path.with_suffix(f".{os.getpid()}.tmp")
+    image.save(tmp_path, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+    os.replace(tmp_path, target_path)
+    return image.size
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs threads (scheduler, threadpool) is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.thumbnail_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=100,
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _load_evidence(evidence_id: int):
+    with engine.connect() as conn:
+        evidence = conn.execute(
+            select(
+                AdminEditEvidence.file_path,
+                AdminEditEvidence.mime_type,
+                AdminEditEvidence.sha256,
+                AdminEditEvidence.thumbnail_path,
+            ).where(AdminEditEvidence.id == evidence_id)
+        ).first()
+        if evidence is None or evidence.thumbnail_path or not evidence.sha256:
+            return evidence, None
+        # Another row with the same content may already have one
+        existing = conn.execute(
+            select(
+                AdminEditEvidence.thumbnail_path,
+                AdminEditEvidence.thumbnail_width,
+                AdminEditEvidence.thumbnail_height,
+            ).where(
+                AdminEditEvidence.sha256 == evidence.sha256,
+                AdminEditEvidence.thumbnail_path.isnot(None)
+            ).limit(1)
+        ).first()
+        return evidence, existing
+
+
+def _save_thumbnail(evidence_id: int, path: str, width: int, height: int):
+    with engine.begin() as conn:
+        conn.execute(
+            update(AdminEditEvidence)
+            .where(AdminEditEvidence.id == evidence_id)
+            .values(thumbnail_path=path, thumbnail_width=width, thumbnail_height=height)
+        )
+
+
+@traced("file.thumbnail")
+async def generate_evidence_thumbnail(evidence_id: int) -> bool:
+    """Create (or reuse) the thumbnail of an evidence row. Returns True if it has one."""
+    loop = asyncio.get_running_loop()
+    evidence, existing = await loop.run_in_executor(None, _load_evidence, evidence_id)
+    if evidence is None or evidence.sha256 is None:
+        return False
+    if evidence.thumbnail_path:
+        return True
+    if evidence.mime_type not in IMAGE_TYPES | PDF_TYPES:
+        return False
+
+    if existing and os.path.exists(existing.thumbnail_path):
+        path, size = existing.thumbnail_path, (existing.thumbnail_width, existing.thumbnail_height)
+    else:
+        path = str(thumbnail_path(evidence.sha256))
+        try:
+            size = await loop.run_in_executor(
+                get_pool(), render_thumbnail, evidence.file_path, evidence.mime_type, path
+            )
+        except Exception:
+            logger.exception("Could not render thumbnail for evidence %s", evidence_id)
+            return False
+
+    await loop.run_in_executor(None, _save_thumbnail, evidence_id, path, size[0], size[1])
+    return True
+
+
+async def backfill_thumbnails() -> int:
+    """Generate thumbnails for evidence rows that have none"""
+    with engine.connect() as conn:
+        ids = conn.execute(
+            select(AdminEditEvidence.id).where(
+                AdminEditEvidence.thumbnail_path.is_(None),
+                AdminEditEvidence.sha256.isnot(None)
+            ).order_by(AdminEditEvidence.id)
+        ).scalars().all()
+    results = await asyncio.gather(*(generate_evidence_thumbnail(evidence_id) for evidence_id in ids))
+    return sum(results)
+
+
+if __name__ == "__main__":
+    # Backfill, e.g. after enabling thumbnails: python -m app.thumbnails
+    logging.basicConfig(level=logging.INFO)
+    try:
+        print(f"Generated {asyncio.run(backfill_thumbnails())} thumbnail(s)")
+    finally:
+        shutdown_pool()
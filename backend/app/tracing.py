@@ -0,0 +1,341 @@
+"""Lightweight request tracing (W3C traceparent, file exporter).
+
+With TRACING_ENABLED, TracingMiddleware starts a server span per request,
+continuing the trace of an incoming `traceparent` header (and its sampled
+flag), or starting a new one for TRACING_SAMPLE_RATE of requests. The
+response carries X-Trace-Id. Inside a traced request:
+
+- every route handler runs in a "handler <endpoint>" span (instrument_routes);
+- every SQL statement is a "sql <VERB>" span with its normalized statement;
+- code marks its own phases with `with span("name", key=value):` or the
+  @traced("name") decorator (validation, ICS/CSV rendering, file I/O).
+
+Outside a sampled request span() does nothing, so the calls stay in place
+when tracing is off. Finished spans are appended to TRACING_FILE by a
+background thread, one line per trace (late spans, e.g. from background
+tasks, follow on their own line): TRACING_EXPORTER=json writes
+{"trace_id", "spans": [...]} objects, =otlp writes OTLP/JSON
+ExportTraceServiceRequest objects that OpenTelemetry tooling can load.
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import get_settings
+from .query_inspector import statement_shape
+from .request_metrics import route_template
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TRACE_ID_HEADER = "X-Trace-Id"
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID, _INVALID_SPAN_ID = "0" * 32, "0" * 16
+
+# OTLP enums
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_ERROR = 0, 2
+
+
+class Trace:
+    """Spans of one trace in this process, exported when the server span ends"""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List["Span"] = []
+        self.exported = False
+        self._lock = threading.Lock()
+
+    def finish(self, span: "Span", root: bool):
+        with self._lock:
+            if self.exported:
+                batch = [span]  # Ended after the request (background task): export on its own
+            else:
+                self.spans.append(span)
+                if not root:
+                    return
+                batch, self.spans, self.exported = self.spans, [], True
+        exporter.export(self.trace_id, batch)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], kind: int = KIND_INTERNAL, **attributes):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = STATUS_UNSET
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.error = f"{type(exc).__name__}: {exc}"[:500]
+
+    def end(self, root: bool = False):
+        self.end_ns = time.time_ns()
+        self.trace.finish(self, root)
+
+    def child(self, name: str, kind: int = KIND_INTERNAL, **attributes) -> "Span":
+        return Span(self.trace, name, self.span_id, kind, **attributes)
+
+    def as_dict(self) -> dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            **({"error": self.error} if self.error else {}),
+        }
+
+    def as_otlp(self) -> dict:
+        otlp = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status, **({"message": self.error} if self.error else {})},
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        return otlp
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes) -> Iterator[Optional[Span]]:
+    """Child span of the current one; a no-op (yields None) outside a traced request"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.child(name, kind, **attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.fail(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def traced(name: str):
+    """Decorator: run the function (sync or async) in a span"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _sql_span_started(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is not None:
+        shape = statement_shape(statement)
+        conn.info["trace_sql_span"] = parent.child(
+            f"sql {shape.split(' ', 1)[0].upper()}", KIND_CLIENT,
+            **{"db.system": "postgresql", "db.statement": shape[:2000],
+               "db.engine": getattr(conn.engine.pool, "engine_label", "other")}
+        )
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _sql_span_finished(conn, cursor, statement, parameters, context, executemany):
+    sql_span = conn.info.pop("trace_sql_span", None)
+    if sql_span is not None:
+        sql_span.set(**{"db.rows": cursor.rowcount})
+        sql_span.end()
+
+
+@event.listens_for(Engine, "handle_error")
+def _sql_span_failed(exception_context):
+    conn = exception_context.connection
+    sql_span = conn.info.pop("trace_sql_span", None) if conn is not None else None
+    if sql_span is not None:
+        sql_span.fail(exception_context.original_exception)
+        sql_span.end()
+
+
+class FileExporter:
+    """Appends finished traces to TRACING_FILE from a background thread"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=1000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, trace_id: str, spans: List[Span]):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((trace_id, spans))
+        except queue.Full:
+            pass  # Tracing must never slow requests down; drop the batch
+
+    def _ensure_thread(self):
+        # Started lazily: with gunicorn's preload_app a thread started at import would stay in the master
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            lines = [self._format(*self._queue.get())]
+            while len(lines) < 100:
+                try:
+                    lines.append(self._format(*self._queue.get_nowait()))
+                except queue.Empty:
+                    break
+            try:
+                # One O_APPEND write per batch, so lines from several workers don't interleave
+                fd = os.open(settings.tracing_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, "".join(lines).encode())
+                finally:
+                    os.close(fd)
+            except OSError:
+                logger.exception("Could not write traces to %s", settings.tracing_file)
+
+    @staticmethod
+    def _format(trace_id: str, spans: List[Span]) -> str:
+        if settings.tracing_exporter == "otlp":
+            document = {"resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": settings.tracing_service_name}},
+                    {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+                ]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [s.as_otlp() for s in spans]}],
+            }]}
+        else:
+            document = {"trace_id": trace_id, "pid": os.getpid(), "spans": [s.as_dict() for s in spans]}
+        return json.dumps(document, default=str) + "\n"
+
+
+exporter = FileExporter()
+
+
+def parse_traceparent(value: Optional[str]):
+    """(trace_id, parent span id, sampled) from a W3C traceparent header, or None"""
+    match = _TRACEPARENT.match((value or "").strip().lower())
+    if not match:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == _INVALID_TRACE_ID or parent_id == _INVALID_SPAN_ID:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class TracingMiddleware:
+    """Added by main.py when TRACING_ENABLED is set"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = parse_traceparent(Headers(scope=scope).get("traceparent"))
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = random.random() < settings.tracing_sample_rate
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        route = route_template(scope)
+        server_span = Span(
+            Trace(trace_id), f"{scope['method']} {route}", parent_id, KIND_SERVER,
+            **{"http.method": scope["method"], "http.route": route, "http.target": scope["path"]}
+        )
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                server_span.set(**{"http.status_code": message["status"]})
+                MutableHeaders(scope=message)[TRACE_ID_HEADER] = trace_id
+            await send(message)
+
+        token = _current_span.set(server_span)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            server_span.fail(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            server_span.end(root=True)
+
+
+def _traced_route_app(app: ASGIApp, name: str) -> ASGIApp:
+    async def traced_app(scope: Scope, receive: Receive, send: Send):
+        with span(f"handler {name}"):
+            await app(scope, receive, send)
+    return traced_app
+
+
+def instrument_routes(routes) -> int:
+    """Wrap every API route in a handler span (request parsing, dependencies, endpoint, response)"""
+    count = 0
+    for route in routes:
+        if isinstance(route, APIRoute):
+            route.app = _traced_route_app(route.app, route.name)
+            count += 1
+    return count
@@ -0,0 +1,258 @@
+"""Bulk data generator for load tests (PostgreSQL COPY).
+
+Loads doctors, macro periods (with their units), selections and audit events
+at production-like volumes. Statuses, priorities and response times follow
+the distributions below; answered periods get selections that satisfy their
+units' day counts, and every period gets the audit trail its status implies.
+Run seed_data.py first: the periods are spread over the existing units.
+
+Usage (from backend/, DATABASE_URL pointing at the target database):
+    python benchmarks/generate_data.py --periods 50000 --doctors 300 \\
+        --fixtures benchmarks/fixtures.json
+    python benchmarks/generate_data.py --purge
+
+Generated rows are marked (created_by "loadgen", doctor emails
+@loadgen.example) so --purge removes exactly them. --fixtures writes the
+tokens and ids load_suite.py drives, grouped by status.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import secrets
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import text  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.models.audit import EventType  # noqa: E402
+from app.models.macro_period import MacroPeriodStatus, Priority  # noqa: E402
+from app.models.selection import PartOfDay  # noqa: E402
+
+CREATED_BY = "loadgen"
+EMAIL_DOMAIN = "loadgen.example"
+
+STATUS_WEIGHTS = {
+    MacroPeriodStatus.AGUARDANDO: 25,
+    MacroPeriodStatus.RESPONDIDO: 38,
+    MacroPeriodStatus.CONFIRMADO: 20,
+    MacroPeriodStatus.EDICAO_LIBERADA: 3,
+    MacroPeriodStatus.CANCELADO: 6,
+    MacroPeriodStatus.EXPIRADO: 8,
+}
+PRIORITY_WEIGHTS = {Priority.BAIXA: 15, Priority.NORMAL: 60, Priority.ALTA: 18, Priority.URGENTE: 7}
+PART_OF_DAY_WEIGHTS = {PartOfDay.FULL_DAY: 45, PartOfDay.MORNING: 25, PartOfDay.AFTERNOON: 25, PartOfDay.CUSTOM: 5}
+ANSWERED = {MacroPeriodStatus.RESPONDIDO, MacroPeriodStatus.CONFIRMADO, MacroPeriodStatus.EDICAO_LIBERADA}
+DRAFT_SHARE = 0.2  # Open periods where the doctor already saved a draft
+
+
+def _choice(rng, weights: dict):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _reserve_ids(cursor, table: str, count: int) -> range:
+    """Take `count` consecutive ids from the table's sequence"""
+    cursor.execute(
+        "SELECT setval(pg_get_serial_sequence(%s, 'id'), nextval(pg_get_serial_sequence(%s, 'id')) + %s - 1)",
+        (table, table, count)
+    )
+    last = cursor.fetchone()[0]
+    return range(last - count + 1, last + 1)
+
+
+def _copy(cursor, table: str, columns, rows) -> int:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow(["\\N" if value is None else value for value in row])
+        count += 1
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    return count
+
+
+def _pick_days(rng, start: date, end: date, count: int):
+    length = (end - start).days + 1
+    return sorted(start + timedelta(days=offset) for offset in rng.sample(range(length), count))
+
+
+class Generator:
+    def __init__(self, cursor, rng: random.Random, days_back: int):
+        self.cursor = cursor
+        self.rng = rng
+        self.now = datetime.now(timezone.utc)
+        self.days_back = days_back
+        self.fixtures = {status.value: [] for status in MacroPeriodStatus}
+
+    def doctors(self, count: int):
+        ids = _reserve_ids(self.cursor, "doctors", count)
+        run = secrets.token_hex(3)
+        _copy(self.cursor, "doctors", ["id", "name", "email", "active"], (
+            (doctor_id, f"MEDICO CARGA {doctor_id}", f"medico{doctor_id}.{run}@{EMAIL_DOMAIN}", self.rng.random() > 0.05)
+            for doctor_id in ids
+        ))
+
+    def periods(self, count: int, doctor_ids, unit_ids):
+        rng = self.rng
+        period_ids = _reserve_ids(self.cursor, "macro_periods", count)
+        periods, period_units = [], []
+        for period_id in period_ids:
+            created_at = self.now - timedelta(seconds=rng.randint(0, self.days_back * 86400))
+            status = _choice(rng, STATUS_WEIGHTS)
+            start = (created_at + timedelta(days=rng.randint(7, 45))).date()
+            end = start + timedelta(days=rng.randint(13, 44))
+            deadline = (created_at + timedelta(days=rng.randint(3, 14))).date() if rng.random() < 0.8 else None
+            responded_at = None
+            if status in ANSWERED:
+                # Most doctors answer within a day or two, some take weeks
+                responded_at = min(created_at + timedelta(hours=rng.lognormvariate(3, 1.2)), self.now)
+            token = secrets.token_urlsafe(32)
+            periods.append((
+                period_id, rng.choice(doctor_ids), start, end, status.value, _choice(rng, PRIORITY_WEIGHTS).value,
+                deadline, token, created_at.isoformat(), CREATED_BY,
+                responded_at.isoformat() if responded_at else None
+            ))
+            units = rng.sample(unit_ids, k=min(len(unit_ids), rng.choices([1, 2, 3], weights=[60, 30, 10])[0]))
+            days_left = (end - start).days + 1
+            for position, unit_id in enumerate(units, 1):
+                total_days = rng.randint(1, min(5, days_left - (len(units) - position)))
+                days_left -= total_days
+                period_units.append([period_id, unit_id, total_days, position])
+            self.fixtures[status.value].append({"id": period_id, "token": token})
+
+        _copy(self.cursor, "macro_periods", [
+            "id", "doctor_id", "start_date", "end_date", "status", "priority", "deadline", "public_token",
+            "created_at", "created_by", "responded_at"
+        ], periods)
+        unit_ids_range = _reserve_ids(self.cursor, "macro_period_units", len(period_units))
+        for row, unit_row_id in zip(period_units, unit_ids_range):
+            row.insert(0, unit_row_id)
+        _copy(self.cursor, "macro_period_units",
+              ["id", "macro_period_id", "unit_id", "total_days", "order_position"], period_units)
+        return periods, period_units
+
+    def selections(self, periods, period_units) -> int:
+        rng = self.rng
+        units_by_period = {}
+        for unit_row_id, period_id, _, total_days, _ in period_units:
+            units_by_period.setdefault(period_id, []).append((unit_row_id, total_days))
+
+        answered = {status.value for status in ANSWERED}
+
+        def rows():
+            for period_id, _, start, end, status, *_ in periods:
+                if status not in answered and not (
+                    status == MacroPeriodStatus.AGUARDANDO.value and rng.random() < DRAFT_SHARE
+                ):
+                    continue
+                units = units_by_period[period_id]
+                days = _pick_days(rng, start, end, sum(total for _, total in units))
+                for unit_row_id, total_days in units:
+                    unit_days, days = days[:total_days], days[total_days:]
+                    consecutive = (unit_days[-1] - unit_days[0]).days == len(unit_days) - 1
+                    block_id = secrets.token_hex(4) if consecutive and len(unit_days) > 1 else None
+                    for day in unit_days:
+                        part = _choice(rng, PART_OF_DAY_WEIGHTS)
+                        custom = ("09:00", "15:00") if part == PartOfDay.CUSTOM else (None, None)
+                        yield (period_id, unit_row_id, day, part.value, *custom, block_id)
+
+        return _copy(self.cursor, "macro_period_selections", [
+            "macro_period_id", "macro_period_unit_id", "date", "part_of_day", "custom_start", "custom_end", "block_id"
+        ], rows())
+
+    def audit_events(self, periods) -> int:
+        rng = self.rng
+        follow_up = {
+            MacroPeriodStatus.CONFIRMADO.value: EventType.CONFIRMED,
+            MacroPeriodStatus.EDICAO_LIBERADA.value: EventType.UNLOCKED,
+            MacroPeriodStatus.CANCELADO.value: EventType.CANCELLED,
+            MacroPeriodStatus.EXPIRADO.value: EventType.EXPIRED,
+        }
+
+        def event(period_id, event_type, at, created_by, payload=None):
+            return (period_id, event_type.value, json.dumps(payload) if payload else None, at.isoformat(), created_by)
+
+        def rows():
+            for period_id, _, _, _, status, _, _, _, created_at, _, responded_at in periods:
+                created_at = datetime.fromisoformat(created_at)
+                last = min(datetime.fromisoformat(responded_at) if responded_at else self.now, self.now)
+                yield event(period_id, EventType.CREATED, created_at, "admin@example.com", {"units": 1})
+                for _ in range(rng.choices([0, 1, 2, 3, 4], weights=[15, 40, 25, 12, 8])[0]):
+                    yield event(period_id, EventType.LINK_VIEWED, created_at + (last - created_at) * rng.random(), "doctor")
+                if responded_at:
+                    yield event(period_id, EventType.RESPONDED, last, "doctor", {"total_selections": 1})
+                if status in follow_up:
+                    at = min(last + timedelta(hours=rng.randint(1, 72)), self.now)
+                    yield event(period_id, follow_up[status], at, "system" if status == MacroPeriodStatus.EXPIRADO.value else "admin@example.com")
+
+        return _copy(self.cursor, "audit_events", ["macro_period_id", "event_type", "payload", "created_at", "created_by"], rows())
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("SELECT id FROM units ORDER BY id")
+        unit_ids = [row[0] for row in cursor.fetchall()]
+        if not unit_ids:
+            raise SystemExit("No units found: run seed_data.py first")
+        generator = Generator(cursor, rng, args.days)
+        generator.doctors(args.doctors)
+        cursor.execute("SELECT id FROM doctors WHERE active")
+        doctor_ids = [row[0] for row in cursor.fetchall()]
+        periods, period_units = generator.periods(args.periods, doctor_ids, unit_ids)
+        selections = generator.selections(periods, period_units)
+        events = generator.audit_events(periods)
+        raw.commit()
+    finally:
+        raw.close()
+    with engine.connect() as conn:
+        # Fresh statistics, so the plans match what production would use
+        conn.exec_driver_sql("ANALYZE doctors, macro_periods, macro_period_units, macro_period_selections, audit_events")
+    print(f"doctors:      {args.doctors}")
+    print(f"periods:      {len(periods)} ({len(period_units)} period units)")
+    print(f"selections:   {selections}")
+    print(f"audit events: {events}")
+    print(f"loaded in {time.perf_counter() - started:.1f} s")
+    if args.fixtures:
+        with open(args.fixtures, "w") as f:
+            json.dump({"tokens_by_status": generator.fixtures}, f)
+        print(f"fixtures written to {args.fixtures}")
+
+
+def purge():
+    periods = "SELECT id FROM macro_periods WHERE created_by = :created_by"
+    with engine.begin() as conn:
+        for table in ("macro_period_selections", "audit_events", "admin_edit_evidences"):
+            conn.execute(text(f"DELETE FROM {table} WHERE macro_period_id IN ({periods})"), {"created_by": CREATED_BY})
+        deleted = conn.execute(
+            text("DELETE FROM macro_periods WHERE created_by = :created_by"), {"created_by": CREATED_BY}
+        ).rowcount
+        conn.execute(text(
+            "DELETE FROM doctors d WHERE email LIKE :pattern "
+            "AND NOT EXISTS (SELECT 1 FROM macro_periods m WHERE m.doctor_id = d.id)"
+        ), {"pattern": f"%@{EMAIL_DOMAIN}"})
+    print(f"purged {deleted} generated periods")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--periods", type=int, default=20000)
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365, help="spread creation dates over this many past days")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for the distributions (tokens are always new)")
+    parser.add_argument("--fixtures", help="write tokens and ids by status to this JSON file")
+    parser.add_argument("--purge", action="store_true", help="delete previously generated rows instead")
+    args = parser.parse_args()
+    if args.purge:
+        purge()
+    else:
+        generate(args)
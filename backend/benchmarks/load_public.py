@@ -0,0 +1,72 @@
+"""Load test for the public (doctor link) routes.
+
+Drives the public view and calendar feed for a set of tokens at a fixed
+concurrency and reports requests per second and latency percentiles.
+
+Usage:
+    python benchmarks/load_public.py --base-url http://localhost:8000 \\
+        --tokens TOKEN1 TOKEN2 --concurrency 50 --duration 20
+
+Start the server with PUBLIC_RATE_LIMIT_ENABLED=false, otherwise the per-IP
+and per-token buckets answer most of the load with 429.
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def worker(client, paths, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        path = next(paths)
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(base_url, tokens, concurrency, duration):
+    paths = itertools.cycle(
+        [f"/public/macro-period/{token}" for token in tokens]
+        + [f"/public/macro-period/{token}/calendar-feed" for token in tokens]
+    )
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        # Warm-up
+        await client.get(f"/public/macro-period/{tokens[0]}")
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(worker(client, paths, deadline, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"requests:    {len(latencies)} ({len(errors)} errors)")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency p50: {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"latency p99: {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"latency avg: {statistics.mean(latencies) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--tokens", nargs="+", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.tokens, args.concurrency, args.duration))
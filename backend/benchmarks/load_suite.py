@@ -0,0 +1,182 @@
+"""End-to-end load suite for the key endpoints.
+
+Each scenario is driven at every concurrency level for --duration seconds,
+and throughput and p50/p95/p99 latency are reported per scenario and level.
+Save a run with --output and pass it to a later run's --compare to see the
+change between builds.
+
+Scenarios:
+    public_view    GET  /public/macro-period/{token}      (any status)
+    submit         POST /public/macro-period/{token}/response (draft save, open periods)
+    calendar_feed  GET  /public/macro-period/{token}/calendar-feed (answered periods)
+    list           GET  /macro-periods?skip=...&limit=50
+    dashboard      GET  /macro-periods/metrics/dashboard
+    export         GET  /macro-periods/{id}/export.csv
+    export_batch   POST /macro-periods/export-batch.csv  (50 periods)
+
+Tokens and ids come from the fixtures written by generate_data.py:
+    python benchmarks/generate_data.py --periods 20000 --fixtures benchmarks/fixtures.json
+    python benchmarks/load_suite.py --fixtures benchmarks/fixtures.json \\
+        --concurrency 1 10 50 --duration 15 --output before.json
+    python benchmarks/load_suite.py ... --compare before.json
+
+Start the server with PUBLIC_RATE_LIMIT_ENABLED=false, otherwise the per-IP
+and per-token buckets answer most of the public load with 429.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import httpx
+
+from load_public import percentile
+
+ANSWERED = ("RESPONDIDO", "CONFIRMADO", "EDICAO_LIBERADA")
+SCENARIOS = ("public_view", "submit", "calendar_feed", "list", "dashboard", "export", "export_batch")
+SUBMIT_PERIODS = 200  # Open periods prepared for the submit scenario
+
+
+async def login(client, email, password) -> dict:
+    response = await client.post("/auth/login", params={"email": email, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def draft_payload(view: dict) -> dict:
+    """Selections that pass the submit validations: each unit's day count, distinct FULL_DAY dates"""
+    day = date.fromisoformat(view["start_date"])
+    selections = []
+    for unit in view["units"]:
+        for _ in range(unit["total_days"]):
+            selections.append({"date": day.isoformat(), "part_of_day": "FULL_DAY", "macro_period_unit_id": unit["id"]})
+            day += timedelta(days=1)
+    return {"selections": selections, "confirm": False}
+
+
+async def build_scenarios(client, fixtures: dict, admin: dict) -> dict:
+    by_status = fixtures["tokens_by_status"]
+    every = [period for periods in by_status.values() for period in periods]
+    answered = [period for status in ANSWERED for period in by_status.get(status, [])]
+    rng = random.Random(7)
+    rng.shuffle(every)
+    rng.shuffle(answered)
+
+    submits = []
+    for period in by_status.get("AGUARDANDO", [])[:SUBMIT_PERIODS]:
+        view = await client.get(f"/public/macro-period/{period['token']}")
+        if view.status_code == 200:
+            submits.append((period["token"], draft_payload(view.json())))
+
+    def cycle(items, make):
+        items = itertools.cycle(items)
+        return lambda: make(next(items))
+
+    return {
+        "public_view": cycle(every, lambda p: ("GET", f"/public/macro-period/{p['token']}", {})),
+        "submit": cycle(submits, lambda s: ("POST", f"/public/macro-period/{s[0]}/response", {"json": s[1]})),
+        "calendar_feed": cycle(answered, lambda p: ("GET", f"/public/macro-period/{p['token']}/calendar-feed", {})),
+        "list": lambda: (
+            "GET", "/macro-periods", {"params": {"skip": rng.randrange(0, 2000, 50), "limit": 50}, "headers": admin}
+        ),
+        "dashboard": lambda: ("GET", "/macro-periods/metrics/dashboard", {"headers": admin}),
+        "export": cycle(answered, lambda p: ("GET", f"/macro-periods/{p['id']}/export.csv", {"headers": admin})),
+        "export_batch": lambda: (
+            "POST", "/macro-periods/export-batch.csv",
+            {"json": [p["id"] for p in rng.sample(answered, min(50, len(answered)))], "headers": admin}
+        ),
+    }
+
+
+async def worker(client, next_request, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        method, path, kwargs = next_request()
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            if response.status_code >= 400:
+                errors[response.status_code] += 1
+        except httpx.HTTPError as e:
+            errors[type(e).__name__] += 1
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_level(client, next_request, concurrency, duration) -> dict:
+    method, path, kwargs = next_request()
+    try:
+        await client.request(method, path, **kwargs)  # Warm-up
+    except httpx.HTTPError:
+        pass  # Counted in the run itself
+    latencies, errors = [], Counter()
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(worker(client, next_request, deadline, latencies, errors) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": dict((str(key), n) for key, n in errors.items()),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def print_result(name, concurrency, result, baseline=None):
+    line = (
+        f"{name:<14} {concurrency:>5} {result['requests']:>8} {sum(result['errors'].values()):>6} "
+        f"{result['throughput']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f}"
+    )
+    if baseline:
+        def change(key):
+            return (result[key] / baseline[key] - 1) * 100 if baseline[key] else 0.0
+        line += f"   req/s {change('throughput'):+.0f}%  p95 {change('p95_ms'):+.0f}%"
+    if result["errors"]:
+        line += f"   errors: {result['errors']}"
+    print(line)
+
+
+async def main(args):
+    with open(args.fixtures) as f:
+        fixtures = json.load(f)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    results = {}
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        admin = await login(client, args.admin_email, args.admin_password)
+        scenarios = await build_scenarios(client, fixtures, admin)
+        print(f"{'scenario':<14} {'conc':>5} {'requests':>8} {'errors':>6} {'req/s':>9} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                result = await run_level(client, scenarios[name], concurrency, args.duration)
+                results.setdefault(name, {})[str(concurrency)] = result
+                print_result(name, concurrency, result, baseline.get(name, {}).get(str(concurrency)))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"label": args.label, "duration": args.duration, "results": results}, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--fixtures", required=True, help="JSON written by generate_data.py --fixtures")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=15, help="seconds per scenario and concurrency level")
+    parser.add_argument("--admin-email", default="admin@example.com")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--label", default="", help="build name stored with --output")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="results JSON of an earlier run to compare against")
+    asyncio.run(main(parser.parse_args()))
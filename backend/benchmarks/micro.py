@@ -0,0 +1,247 @@
+"""Micro-benchmarks for pure hot functions (no database).
+
+Each case times one function on synthetic inputs of increasing size and
+reports the time per call and per item. Two checks catch regressions:
+
+- scaling: the exponent of time against input size (log-log fit over the
+  sizes) must stay within SCALING_TOLERANCE of the case's expected
+  complexity, so a validator that goes quadratic fails on any machine;
+- baseline: with --compare, per-item times slower than --threshold times
+  the stored baseline fail. Baselines are machine-specific; re-save them
+  (--save) when the benchmark machine changes.
+
+Usage (from backend/):
+    python benchmarks/micro.py                        # run and check scaling
+    python benchmarks/micro.py --compare benchmarks/baselines/micro.json
+    python benchmarks/micro.py --save benchmarks/baselines/micro.json
+    python benchmarks/micro.py --cases weekly_trend export_csv_rows
+
+Exits with status 1 when a check fails.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.api.macro_periods import (  # noqa: E402
+    batch_export_csv_rows, calculate_dias_em_aberto, export_csv_rows, weekly_trend
+)
+from app.api.public import (  # noqa: E402
+    _generate_calendar, validate_consecutive_blocks, validate_time_overlap, validate_unit_requirements
+)
+from app.models.macro_period import MacroPeriodStatus, Priority  # noqa: E402
+from app.models.selection import PartOfDay  # noqa: E402
+from app.schemas.selection import MacroPeriodSelectionCreate  # noqa: E402
+
+SCALING_TOLERANCE = 0.35  # Allowed excess of the fitted exponent over the expected one
+MIN_RUN_SECONDS = 0.05  # Calls per measurement are raised until one measurement takes this long
+START = date(2026, 1, 5)  # A Monday
+
+
+class Case(NamedTuple):
+    setup: Callable[[int], Tuple]  # size -> arguments
+    func: Callable
+    sizes: Tuple[int, ...]
+    exponent: float  # Expected complexity: 1.0 linear, ~1.1 for n log n
+
+
+def _selections(n: int, units: int = 1, block_days: int = 0) -> List[MacroPeriodSelectionCreate]:
+    """Morning and afternoon slots on consecutive days, spread over `units` period units"""
+    selections = []
+    for i in range(n):
+        day = START + timedelta(days=i // 2)
+        selections.append(MacroPeriodSelectionCreate(
+            date=day,
+            part_of_day=PartOfDay.MORNING if i % 2 == 0 else PartOfDay.AFTERNOON,
+            macro_period_unit_id=1 + (i // 2) % units,
+            block_id=f"block-{(i // 2) // block_days}" if block_days else None,
+        ))
+    return selections
+
+
+def _unit_requirements(n: int):
+    units = 4
+    selections = _selections(n, units=units)
+    days_by_unit = {}
+    for selection in selections:
+        days_by_unit.setdefault(selection.macro_period_unit_id, set()).add(selection.date)
+    mp_units = [
+        SimpleNamespace(id=unit_id, total_days=len(days), unit=SimpleNamespace(name=f"Unidade {unit_id}"))
+        for unit_id, days in days_by_unit.items()
+    ]
+    return selections, mp_units
+
+
+def _stored_selections(n: int, units: int = 3):
+    rng = random.Random(n)
+    parts = list(PartOfDay)
+    selections = []
+    for i in range(n):
+        part = rng.choice(parts)
+        custom = part == PartOfDay.CUSTOM
+        selections.append(SimpleNamespace(
+            id=i + 1,
+            date=START + timedelta(days=i // 2),
+            part_of_day=part,
+            custom_start=datetime(2026, 1, 1, 9).time() if custom else None,
+            custom_end=datetime(2026, 1, 1, 15).time() if custom else None,
+            macro_period_unit_id=1 + i % units,
+        ))
+    return selections
+
+
+def _calendar_period(n: int):
+    units = [
+        SimpleNamespace(id=i, unit=SimpleNamespace(name=f"Unidade {i}", city="FLORIANÓPOLIS")) for i in (1, 2, 3)
+    ]
+    return (SimpleNamespace(
+        id=1, doctor=SimpleNamespace(name="MEDICO TESTE"), units=units, selections=_stored_selections(n)
+    ),)
+
+
+def _batch_period(n: int):
+    period = SimpleNamespace(
+        id=1, start_date=START, end_date=START + timedelta(days=n), status=MacroPeriodStatus.RESPONDIDO,
+        priority=Priority.NORMAL
+    )
+    return period, "MEDICO TESTE", _stored_selections(n), {1: "Unidade 1", 2: "Unidade 2", 3: "Unidade 3"}
+
+
+def _open_periods(n: int):
+    rng = random.Random(n)
+    now = datetime.now(timezone.utc)
+    statuses = list(MacroPeriodStatus)
+    return ([
+        SimpleNamespace(status=rng.choice(statuses), created_at=now - timedelta(hours=rng.randint(1, 5000)))
+        for _ in range(n)
+    ],)
+
+
+def _hours_open(periods):
+    return [calculate_dias_em_aberto(period) for period in periods]
+
+
+def _selected_dates(n: int):
+    rng = random.Random(n)
+    return ([START + timedelta(days=rng.randint(0, 365)) for _ in range(n)],)
+
+
+CASES: Dict[str, Case] = {
+    "validate_time_overlap": Case(lambda n: (_selections(n),), validate_time_overlap, (100, 1000, 10000), 1.0),
+    "validate_consecutive_blocks": Case(
+        lambda n: (_selections(n, block_days=5),), validate_consecutive_blocks, (100, 1000, 10000), 1.1
+    ),
+    "validate_unit_requirements": Case(_unit_requirements, validate_unit_requirements, (100, 1000, 10000), 1.0),
+    "generate_calendar": Case(_calendar_period, _generate_calendar, (10, 100, 1000), 1.0),
+    "export_csv_rows": Case(
+        lambda n: (_stored_selections(n), {1: "Unidade 1", 2: "Unidade 2", 3: "Unidade 3"}),
+        export_csv_rows, (100, 1000, 10000), 1.0
+    ),
+    "batch_export_csv_rows": Case(_batch_period, batch_export_csv_rows, (100, 1000, 10000), 1.0),
+    "calculate_dias_em_aberto": Case(_open_periods, _hours_open, (100, 1000, 10000), 1.0),
+    "weekly_trend": Case(_selected_dates, weekly_trend, (100, 1000, 10000, 100000), 1.1),
+}
+
+
+def measure(func: Callable, args: Tuple, repeat: int) -> float:
+    """Best seconds per call over `repeat` measurements (like timeit's autorange)"""
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            func(*args)
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_RUN_SECONDS:
+            break
+        calls *= 2
+    best = elapsed / calls
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(calls):
+            func(*args)
+        best = min(best, (time.perf_counter() - started) / calls)
+    return best
+
+
+def fitted_exponent(sizes, seconds) -> float:
+    """Slope of log(time) against log(size), by least squares"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(value) for value in seconds]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum((x - mean_x) ** 2 for x in xs)
+
+
+def run_case(name: str, case: Case, repeat: int) -> dict:
+    sizes = {}
+    for size in case.sizes:
+        seconds = measure(case.func, case.setup(size), repeat)
+        sizes[str(size)] = {"seconds": seconds, "ns_per_item": seconds / size * 1e9}
+    exponent = fitted_exponent(case.sizes, [sizes[str(size)]["seconds"] for size in case.sizes])
+    return {"sizes": sizes, "exponent": exponent, "expected_exponent": case.exponent}
+
+
+def report(name: str, result: dict, baseline: dict, threshold: float) -> List[str]:
+    failures = []
+    for size, timing in result["sizes"].items():
+        line = f"{name:<28} {size:>7} {timing['seconds'] * 1000:>10.3f} ms {timing['ns_per_item']:>10.0f} ns/item"
+        previous = baseline.get("sizes", {}).get(size)
+        if previous:
+            ratio = timing["ns_per_item"] / previous["ns_per_item"]
+            line += f"   x{ratio:.2f} vs baseline"
+            if ratio > threshold:
+                line += "  REGRESSION"
+                failures.append(f"{name} at n={size} is {ratio:.2f}x its baseline")
+        print(line)
+    limit = result["expected_exponent"] + SCALING_TOLERANCE
+    verdict = "ok" if result["exponent"] <= limit else "TOO STEEP"
+    print(f"{name:<28} scaling exponent {result['exponent']:.2f} (expected ~{result['expected_exponent']:.1f}) {verdict}")
+    if result["exponent"] > limit:
+        failures.append(f"{name} scales as n^{result['exponent']:.2f} (expected ~n^{result['expected_exponent']:.1f})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write the results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.5, help="allowed slowdown ratio against the baseline")
+    args = parser.parse_args()
+
+    machine = {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()}
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            stored = json.load(f)
+        baseline = stored["cases"]
+        if stored.get("machine") != machine:
+            print(f"note: baseline recorded on {stored.get('machine')}, this is {machine}")
+
+    results, failures = {}, []
+    for name in args.cases:
+        results[name] = run_case(name, CASES[name], args.repeat)
+        failures += report(name, results[name], baseline.get(name, {}), args.threshold)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"machine": machine, "cases": results}, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.save}")
+    if failures:
+        print("\n".join(["", "FAILED:"] + failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
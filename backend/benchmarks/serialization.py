@@ -0,0 +1,127 @@
+"""Serialization benchmark: response_model path vs the orjson fast path.
+
+Builds a synthetic 1,000-item macro period list page (no database) and times
+what happens after the query in each version of list_macro_periods:
+
+- models:   one MacroPeriodListItem per row, then FastAPI's serialize_response
+            (validation against List[MacroPeriodListItem] + JSON mode dump)
+            and JSONResponse rendering, as with response_model=...;
+- fast:     list_item_dict per row and FastJSONResponse (orjson).
+
+Usage:
+    python benchmarks/serialization.py [--items 1000] [--repeat 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from app.api.macro_periods import calculate_dias_em_aberto, calculate_tempo_ate_resposta, list_item_dict  # noqa: E402
+from app.models.macro_period import MacroPeriodStatus, Priority  # noqa: E402
+from app.responses import FastJSONResponse  # noqa: E402
+from app.schemas.macro_period import MacroPeriodListItem  # noqa: E402
+
+Row = namedtuple("Row", [
+    "id", "doctor_name", "start_date", "end_date", "status", "priority", "deadline",
+    "public_token", "created_at", "responded_at"
+])
+
+
+def make_page(n_items: int):
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    rows, units = [], {}
+    for i in range(n_items):
+        created_at = now - timedelta(hours=rng.randint(1, 2000))
+        status = rng.choice(list(MacroPeriodStatus))
+        start = date(2026, 1, 1) + timedelta(days=rng.randint(0, 300))
+        rows.append(Row(
+            id=i + 1,
+            doctor_name=f"DOCTOR {i:04d} DE SOUZA",
+            start_date=start,
+            end_date=start + timedelta(days=60),
+            status=status,
+            priority=rng.choice(list(Priority)),
+            deadline=start - timedelta(days=10),
+            public_token=f"{i:043d}",
+            created_at=created_at,
+            responded_at=created_at + timedelta(days=2) if status == MacroPeriodStatus.RESPONDIDO else None,
+        ))
+        units[i + 1] = [
+            {"unit_name": f"0{k} - CLÍNICA SC", "unit_city": "FLORIANÓPOLIS", "total_days": 5}
+            for k in range(rng.randint(1, 3))
+        ]
+    return rows, units
+
+
+_loop = asyncio.new_event_loop()
+
+
+def models_path(rows, units, field) -> bytes:
+    items = [
+        MacroPeriodListItem(
+            id=row.id,
+            doctor_name=row.doctor_name,
+            units=units[row.id],
+            start_date=row.start_date,
+            end_date=row.end_date,
+            status=row.status,
+            priority=row.priority,
+            deadline=row.deadline,
+            public_token=row.public_token,
+            dias_em_aberto=calculate_dias_em_aberto(row),
+            tempo_ate_resposta=calculate_tempo_ate_resposta(row),
+            created_at=row.created_at,
+            responded_at=row.responded_at
+        )
+        for row in rows
+    ]
+    content = _loop.run_until_complete(serialize_response(field=field, response_content=items, is_coroutine=True))
+    return JSONResponse(content).body
+
+
+def fast_path(rows, units) -> bytes:
+    return FastJSONResponse([list_item_dict(row, units[row.id]) for row in rows]).body
+
+
+def bench(label, func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<8} median {statistics.median(timings):7.2f} ms   min {min(timings):7.2f} ms   {len(body)} bytes")
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rows, units = make_page(args.items)
+    field = create_response_field(name="Response_list_macro_periods", type_=List[MacroPeriodListItem])
+
+    assert json.loads(models_path(rows, units, field)) == json.loads(fast_path(rows, units)), "outputs differ"
+
+    print(f"{args.items} items, {args.repeat} runs")
+    slow = bench("models", lambda: models_path(rows, units, field), args.repeat)
+    fast = bench("fast", lambda: fast_path(rows, units), args.repeat)
+    print(f"speedup  {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Compare the development server (uvicorn --reload) with the production launcher.
+
+For each mode it starts the server, measures the time until /health answers,
+the CPU the idle server burns over a few seconds (the reload file watcher),
+and then runs load_public.py's load against the public routes.
+
+Usage (from backend/, Linux only: CPU time is read from /proc):
+    python benchmarks/server_modes.py --tokens TOKEN1 TOKEN2 --concurrency 50 --duration 20
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from load_public import run as run_load
+
+MODES = {
+    "reload": ["uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", "{port}", "--reload"],
+    "production": ["gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+}
+
+
+def process_tree(pid):
+    pids = [pid]
+    for child in pids:
+        try:
+            with open(f"/proc/{child}/task/{child}/children") as f:
+                pids.extend(int(p) for p in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def cpu_seconds(pid) -> float:
+    total = 0
+    for child in process_tree(pid):
+        try:
+            with open(f"/proc/{child}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += int(fields[11]) + int(fields[12])  # utime + stime
+        except OSError:
+            pass
+    return total / os.sysconf("SC_CLK_TCK")
+
+
+def wait_healthy(base_url, timeout=60.0) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError("server did not become healthy")
+
+
+def bench_mode(mode, port, args):
+    env = {**os.environ, "WEB_BIND": f"127.0.0.1:{port}", "PUBLIC_RATE_LIMIT_ENABLED": "false"}
+    command = [part.format(port=port) for part in MODES[mode]]
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        startup = wait_healthy(base_url)
+        before = cpu_seconds(server.pid)
+        time.sleep(args.idle)
+        idle_cpu = (cpu_seconds(server.pid) - before) / args.idle * 100
+        print(f"== {mode}: {' '.join(command)}")
+        print(f"startup:     {startup:.2f} s to first healthy response")
+        print(f"idle CPU:    {idle_cpu:.1f}% of one core")
+        asyncio.run(run_load(base_url, args.tokens, args.concurrency, args.duration))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", nargs="+", required=True)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--idle", type=float, default=10, help="seconds to sample idle CPU")
+    args = parser.parse_args()
+    for offset, mode in enumerate(args.modes):
+        bench_mode(mode, args.port + offset, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
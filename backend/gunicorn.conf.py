@@ -0,0 +1,75 @@
+"""Gunicorn configuration for production (uvicorn workers).
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+- The worker count comes from the CPUs this container may use (affinity and
+  cgroup quota), unless WEB_CONCURRENCY is set.
+- preload_app imports the app once in the master. Workers fork with the code
+  already loaded, so they start (and restart) in milliseconds. Nothing
+  connects to the database at import time. post_fork still drops any
+  inherited pool connections.
+- On SIGTERM the workers stop accepting connections and let in-flight
+  requests (and their background tasks) finish for up to
+  WEB_GRACEFUL_TIMEOUT_SECONDS. Then the lifespan shutdown stops the
+  scheduler and the thumbnail pool.
+
+Migrations and seed data are not run here; see the `migrate` service in
+docker-compose.yml.
+"""
+import math
+import os
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS
+        cpus = os.cpu_count() or 1
+    try:
+        # cgroup v2 quota, e.g. "200000 100000" for --cpus=2
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def worker_count() -> int:
+    if settings.web_concurrency > 0:
+        return settings.web_concurrency
+    # One event loop per CPU: I/O waits are already overlapped inside each worker (async
+    # routes, threadpool for sync ones), so extra processes only add contention and DB pools
+    return min(available_cpus(), settings.web_max_workers)
+
+
+bind = settings.web_bind
+workers = worker_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+backlog = settings.web_backlog
+keepalive = settings.web_keepalive_seconds
+timeout = settings.web_timeout_seconds
+graceful_timeout = settings.web_graceful_timeout_seconds
+max_requests = settings.web_max_requests
+max_requests_jitter = settings.web_max_requests // 10  # Don't recycle every worker at once
+# The heartbeat file is touched constantly; keep it off the container's overlay filesystem
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    server.log.info("Serving with %d workers (%d CPUs available)", workers, available_cpus())
+
+
+def post_fork(server, worker):
+    # Connections must not be shared across processes; close=False leaves the parent's sockets alone
+    from app.database import engine, async_engine, replica_engine, async_replica_engine
+
+    for _engine in {engine, async_engine.sync_engine, replica_engine, async_replica_engine.sync_engine}:
+        _engine.dispose(close=False)
@@ -0,0 +1,44 @@
+"""Shared fixtures.
+
+Tests that need the app run against DATABASE_URL with migrations applied
+(alembic upgrade head) and log in as ADMIN_EMAIL/ADMIN_PASSWORD; they are
+skipped when that database can't be reached. The scheduler is off so jobs
+don't write while tests count statements.
+"""
+import os
+
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.config import get_settings
+from app.database import engine
+
+
+@pytest.fixture(scope="session")
+def database():
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except OperationalError as e:
+        pytest.skip(f"Database not reachable: {e.orig}")
+    return engine
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    from app.main import app
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    settings = get_settings()
+    response = client.post(
+        "/auth/login", params={"email": settings.admin_email, "password": settings.admin_password}
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
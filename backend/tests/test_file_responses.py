@@ -0,0 +1,38 @@
+import pytest
+from app.file_responses import RangeNotSatisfiable, etag_matches, parse_range_header
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),  # Clamped to the file
+    ("bytes=-100", (900, 999)),  # Last 100 bytes
+    ("bytes=-5000", (0, 999)),
+    (" bytes=5-5 ", (5, 5)),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [None, "", "bytes=-", "items=0-10", "bytes=0-10,20-30", "bytes=abc"])
+def test_parse_range_header_sends_whole_file(header):
+    assert parse_range_header(header, 1000) is None
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1000-", 1000),
+    ("bytes=50-10", 1000),
+    ("bytes=-0", 1000),
+    ("bytes=-10", 0),
+])
+def test_parse_range_header_not_satisfiable(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header(header, size)
+
+
+def test_etag_matches_weakly():
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', 'W/"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
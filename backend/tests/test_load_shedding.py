@@ -0,0 +1,81 @@
+import asyncio
+from app.load_shedding import ConcurrencyLimiter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_admits_up_to_limit_then_queues_then_rejects():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1)
+        assert await limiter.acquire(timeout=1) is None
+        waiter = asyncio.create_task(limiter.acquire(timeout=1))
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        assert await limiter.acquire(timeout=1) == "queue_full"
+
+        limiter.release()  # The slot goes to the waiter
+        assert await waiter is None
+        assert (limiter.active, limiter.queued) == (1, 0)
+        limiter.release()
+        assert limiter.active == 0
+    run(scenario())
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=5)
+        await limiter.acquire(timeout=1)
+        admitted = []
+
+        async def request(name):
+            await limiter.acquire(timeout=1)
+            admitted.append(name)
+            await asyncio.sleep(0)
+            limiter.release()
+
+        tasks = [asyncio.create_task(request(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+        assert admitted == ["a", "b", "c"]
+        assert limiter.active == 0
+    run(scenario())
+
+
+def test_queue_timeout():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1)
+        await limiter.acquire(timeout=1)
+        assert await limiter.acquire(timeout=0.01) == "timeout"
+        assert (limiter.active, limiter.queued) == (1, 0)
+    run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1)
+        await limiter.acquire(timeout=1)
+        waiter = asyncio.create_task(limiter.acquire(timeout=1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert limiter.queued == 0
+
+        limiter.release()
+        assert limiter.active == 0  # Nothing was handed to the cancelled waiter
+    run(scenario())
+
+
+def test_cancelled_after_handover_gives_the_slot_back():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1)
+        await limiter.acquire(timeout=1)
+        waiter = asyncio.create_task(limiter.acquire(timeout=1))
+        await asyncio.sleep(0)
+        limiter.release()  # Hands the slot over before the waiter wakes up
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert (limiter.active, limiter.queued) == (0, 0)
+    run(scenario())
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import text
+from app.query_inspector import QueryBudgetExceeded, QueryRecorder, capture_queries, statement_shape
+from app.testing import assert_max_queries
+
+
+def test_statement_shape_collapses_literals_and_in_lists():
+    assert statement_shape("SELECT *\n  FROM doctors\tWHERE id = 42") == "SELECT * FROM doctors WHERE id = N"
+    assert (
+        statement_shape("SELECT * FROM units WHERE id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s)")
+        == statement_shape("SELECT * FROM units WHERE id IN ($1, $2)")
+        == "SELECT * FROM units WHERE id IN (...)"
+    )
+
+
+def test_repeated_applies_threshold_most_frequent_first():
+    recorder = QueryRecorder()
+    for doctor_id in (1, 2, 3):
+        recorder.record(f"SELECT * FROM macro_periods WHERE doctor_id = {doctor_id}")
+    recorder.record("SELECT * FROM units WHERE id = 1")
+    recorder.record("SELECT * FROM units WHERE id = 2")
+    recorder.record("SELECT count(*) FROM doctors")
+
+    assert recorder.repeated(3) == [("SELECT * FROM macro_periods WHERE doctor_id = N", 3)]
+    assert [n for _, n in recorder.repeated(2)] == [3, 2]
+    assert recorder.repeated(4) == []
+    assert "3x SELECT * FROM macro_periods" in recorder.report()
+
+
+def test_strict_budget_raises_on_the_statement_over_budget():
+    recorder = QueryRecorder("GET /doctors", budget=2, strict=True)
+    recorder.record("SELECT 1")
+    recorder.record("SELECT 2")
+    with pytest.raises(QueryBudgetExceeded, match="GET /doctors exceeded its SQL budget of 2"):
+        recorder.record("SELECT 3")
+
+
+def test_lenient_budget_only_records():
+    recorder = QueryRecorder(budget=1)
+    recorder.record("SELECT 1")
+    recorder.record("SELECT 2")
+    assert recorder.count == 2
+
+
+def test_capture_queries_records_real_statements(database):
+    with capture_queries() as recorder:
+        with database.connect() as conn:
+            for n in range(3):
+                conn.execute(text("SELECT :n"), {"n": n})
+    assert recorder.count == 3
+
+    with database.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert recorder.count == 3  # Stopped recording with the block
+
+
+def test_assert_max_queries(database):
+    with assert_max_queries(2):
+        with database.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    with pytest.raises(AssertionError, match="Expected at most 1 SQL statements"):
+        with assert_max_queries(1):
+            with database.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+    with pytest.raises(AssertionError, match="N\\+1"):
+        with assert_max_queries(10, max_repeats=3):
+            with database.connect() as conn:
+                for doctor_id in (1, 2, 3):
+                    conn.execute(text(f"SELECT * FROM doctors WHERE id = {doctor_id}"))
+
+
+def test_dashboard_query_budget(client, auth_headers):
+    url = "/macro-periods/metrics/dashboard"
+    client.get(url, headers=auth_headers)  # Warms the role cache
+
+    # The dashboard's 8 queries (periods loaded once, status counts in one GROUP BY)
+    # plus conditional_get's cache version check
+    with assert_max_queries(8 + 1, max_repeats=3):
+        response = client.get(url, headers=auth_headers)
+    assert response.status_code == 200
+
+    with assert_max_queries(1):
+        response = client.get(url, headers={**auth_headers, "If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
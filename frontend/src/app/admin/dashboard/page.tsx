@@ -366,6 +366,7 @@ export default function DashboardPage() {
                 EDICAO_LIBERADA: "Edição Liberada",
                 CONFIRMADO: "Confirmado",
                 CANCELADO: "Cancelado",
+                EXPIRADO: "Expirado",
               };
               const statusColors: Record<string, string> = {
                 AGUARDANDO: "bg-yellow-500",
@@ -373,6 +374,7 @@ export default function DashboardPage() {
                 EDICAO_LIBERADA: "bg-blue-500",
                 CONFIRMADO: "bg-gray-500",
                 CANCELADO: "bg-red-500",
+                EXPIRADO: "bg-gray-300",
               };
               return (
                 <div key={status}>
@@ -120,7 +120,11 @@ export interface AdminEditEvidence {
   file_path: string;
   original_filename?: string;
   file_size?: number;
+  sha256?: string;
   mime_type?: string;
+  thumbnail_url?: string;
+  thumbnail_width?: number;
+  thumbnail_height?: number;
   notes?: string;
   uploaded_by: string;
   uploaded_at: string;